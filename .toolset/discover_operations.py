@@ -2,49 +2,80 @@
 """
 Operations Discovery Script
 Query available operations in the Electric Sheep toolset.
+
+Reads the same catalog as the MCP server (manifests plus operations.json),
+so both always agree on what exists.
 """
 
+import importlib.util
 import json
 import sys
 from pathlib import Path
 
-def load_operations():
-    """Load operations registry."""
-    ops_file = Path(__file__).parent / "operations.json"
-    with open(ops_file, 'r', encoding='utf-8') as f:
-        return json.load(f)
+ROOT = Path(__file__).resolve().parent.parent
 
-def list_all_operations(operations_data):
-    """List all operations."""
-    print("Available Operations:\n")
-    for op in operations_data['operations']:
+def load_tool_registry_module():
+    """Import mcp/server/tool_registry.py by file path.
+
+    An installed MCP SDK is a regular `mcp` package that shadows this repo's
+    mcp/ directory, so `from mcp.server.tool_registry import ...` fails there.
+    """
+    path = ROOT / "mcp" / "server" / "tool_registry.py"
+    spec = importlib.util.spec_from_file_location("electric_sheep_tool_registry", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# The catalog lives in the MCP server package
+ToolRegistry = load_tool_registry_module().ToolRegistry
+
+def load_registry():
+    """Load the operation catalog."""
+    return ToolRegistry(str(ROOT))
+
+def print_operations(registry, codes):
+    """Print code, name and description of each operation."""
+    for code in codes:
+        op = registry.get_operation(code)
         print(f"  {op['code']:<35} {op['name']}")
         print(f"    {op['description']}")
         print()
 
-def list_by_category(operations_data, category=None):
+def list_all_operations(registry):
+    """List all operations."""
+    print("Available Operations:\n")
+    print_operations(registry, registry.catalog.codes)
+
+def list_by_category(registry, category=None):
     """List operations by category."""
     if category:
-        ops = [op for op in operations_data['operations'] if op['category'] == category]
         print(f"Operations in category '{category}':\n")
-    else:
-        print("Operations by Category:\n")
-        for cat_name, cat_info in operations_data['categories'].items():
-            print(f"  {cat_name.upper()}: {cat_info['description']}")
-            ops = [op for op in operations_data['operations'] if op['category'] == cat_name]
-            for op in ops:
-                print(f"    - {op['code']}: {op['name']}")
-            print()
+        print_operations(registry, registry.catalog.filter(category=category))
         return
     
-    for op in ops:
-        print(f"  {op['code']:<35} {op['name']}")
-        print(f"    {op['description']}")
+    print("Operations by Category:\n")
+    for cat_name, cat_info in registry.get_categories().items():
+        print(f"  {cat_name.upper()}: {cat_info['description']}")
+        for code in registry.catalog.by_category[cat_name]:
+            print(f"    - {code}: {registry.get_operation(code)['name']}")
         print()
 
-def get_operation(operations_data, code):
+def list_by_tag(registry, tag):
+    """List operations with a tag."""
+    print(f"Operations tagged '{tag}':\n")
+    print_operations(registry, registry.catalog.filter(tag=tag))
+
+def search_operations(registry, query):
+    """List operations matching a free-text query, best first."""
+    print(f"Operations matching '{query}':\n")
+    for result in registry.search(query)['results']:
+        print(f"  {result['code']:<35} {result['name']}  (score {result['score']})")
+        print(f"    {result['description']}")
+        print()
+
+def get_operation(registry, code):
     """Get detailed information about a specific operation."""
-    op = next((o for o in operations_data['operations'] if o['code'] == code), None)
+    op = registry.get_operation(code)
     if not op:
         print(f"Operation '{code}' not found.", file=sys.stderr)
         return
@@ -52,48 +83,68 @@ def get_operation(operations_data, code):
     print(f"Operation: {op['name']}")
     print(f"Code: {op['code']}")
     print(f"Description: {op['description']}")
-    print(f"Category: {op['category']}")
-    print(f"Tool: {op['tool']}")
+    print(f"Category: {op.get('category')}")
+    print(f"Tool: {op['tool_id']}")
     print(f"Entry Point: {op['entry_point']}")
-    print(f"Privacy: {op['privacy']}")
-    print(f"Tags: {', '.join(op['tags'])}")
+    print(f"Privacy: {op.get('privacy', 'unspecified')}")
+    print(f"Tags: {', '.join(op.get('tags', []))}")
     print("\nParameters:")
-    for param_name, param_info in op['parameters'].items():
+    for param_info in op.get('parameters', []):
         req = "required" if param_info.get('required', False) else "optional"
         param_type = param_info.get('type', 'unknown')
         source = param_info.get('source', 'parameter')
-        print(f"  {param_name} ({param_type}, {req}, source: {source})")
+        print(f"  {param_info['name']} ({param_type}, {req}, source: {source})")
         if 'description' in param_info:
             print(f"    {param_info['description']}")
 
 def main():
     """Main entry point."""
-    operations_data = load_operations()
+    registry = load_registry()
     
     if len(sys.argv) == 1:
         # No arguments - list all
-        list_all_operations(operations_data)
+        list_all_operations(registry)
     elif sys.argv[1] == "--category" or sys.argv[1] == "-c":
         # List by category
         category = sys.argv[2] if len(sys.argv) > 2 else None
-        list_by_category(operations_data, category)
+        list_by_category(registry, category)
+    elif sys.argv[1] == "--tag" or sys.argv[1] == "-t":
+        if len(sys.argv) < 3:
+            print("Usage: discover_operations.py --tag <tag>", file=sys.stderr)
+            sys.exit(1)
+        list_by_tag(registry, sys.argv[2])
+    elif sys.argv[1] == "--search" or sys.argv[1] == "-s":
+        if len(sys.argv) < 3:
+            print("Usage: discover_operations.py --search <words>", file=sys.stderr)
+            sys.exit(1)
+        search_operations(registry, " ".join(sys.argv[2:]))
     elif sys.argv[1] == "--code" or sys.argv[1] == "-o":
         # Get specific operation
         code = sys.argv[2] if len(sys.argv) > 2 else None
         if not code:
             print("Usage: discover_operations.py --code <operation_code>", file=sys.stderr)
             sys.exit(1)
-        get_operation(operations_data, code)
+        get_operation(registry, code)
+    elif sys.argv[1] == "--json":
+        # Machine-readable catalog for scripts
+        print(json.dumps({
+            'operations': list(registry.catalog.by_code.values()),
+            'categories': registry.get_categories()
+        }, indent=2))
     elif sys.argv[1] == "--help" or sys.argv[1] == "-h":
         print("Operations Discovery Tool")
         print("\nUsage:")
         print("  python discover_operations.py                    # List all operations")
         print("  python discover_operations.py --category        # List by category")
         print("  python discover_operations.py --category system  # List system operations")
+        print("  python discover_operations.py --tag <tag>        # List operations with a tag")
+        print("  python discover_operations.py --search <words>   # Ranked keyword search")
         print("  python discover_operations.py --code <code>       # Get operation details")
+        print("  python discover_operations.py --json             # Full catalog as JSON")
         print("\nExamples:")
         print("  python discover_operations.py --code bambu-lab:launch")
         print("  python discover_operations.py --category ai")
+        print("  python discover_operations.py --search cpu affinity")
     else:
         print(f"Unknown option: {sys.argv[1]}", file=sys.stderr)
         print("Use --help for usage information.", file=sys.stderr)
@@ -101,4 +152,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,71 @@
+"""Benchmark: server startup with and without the registry snapshot
+
+Usage:
+    python mcp/benchmarks/bench_startup.py                  # this workspace
+    python mcp/benchmarks/bench_startup.py --iterations 50
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from mcp.server.tool_registry import ToolRegistry
+
+
+def time_loads(workspace: Path, use_snapshot: bool, iterations: int):
+    """Construct the registry repeatedly and return latencies in ms"""
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        ToolRegistry(str(workspace), use_snapshot=use_snapshot)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def time_interpreter(iterations: int):
+    """Cost of the interpreter launch that start_server.py no longer pays twice"""
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def summarize(latencies):
+    """Mean and median latencies"""
+    return {
+        'mean_ms': round(statistics.mean(latencies), 2),
+        'p50_ms': round(statistics.median(latencies), 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time registry loading and interpreter startup")
+    parser.add_argument("--workspace", type=str, default=str(project_root))
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+    
+    workspace = Path(args.workspace)
+    # Make sure a fresh snapshot exists before timing snapshot loads
+    registry = ToolRegistry(str(workspace))
+    
+    print(json.dumps({
+        'workspace': str(workspace),
+        'operations': len(registry.catalog),
+        'registry_cold': summarize(time_loads(workspace, False, args.iterations)),
+        'registry_snapshot': summarize(time_loads(workspace, True, args.iterations)),
+        'extra_interpreter_hop': summarize(time_interpreter(min(args.iterations, 10)))
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""Benchmark suite: registry loading, tool listing and execution paths
+
+Builds a synthetic workspace with hundreds of tools, times each stage and
+compares the medians against baselines.json. A benchmark slower than its
+baseline by more than the tolerance fails the run (exit code 1).
+
+Usage:
+    python mcp/benchmarks/bench_suite.py                     # compare with baselines.json
+    python mcp/benchmarks/bench_suite.py --update-baseline   # record new baselines
+    python mcp/benchmarks/bench_suite.py --only registry_cold,list_tools
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from mcp.server.batch import BATCH_TOOLS
+from mcp.server.cache import CACHE_TOOLS
+from mcp.server.config import load_server_config
+from mcp.server.executor import OperationExecutor, execute_operation_sync
+from mcp.server.jobs import JOB_TOOLS
+from mcp.server.metrics import METRICS_TOOLS
+from mcp.server.tool_registry import CATALOG_TOOLS, OperationCatalog, ToolRegistry
+
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines.json"
+
+# Stages faster than this many ms over baseline are treated as noise
+MIN_REGRESSION_MS = 0.5
+
+
+def make_synthetic_workspace(root: Path, tool_count: int, scripts_per_tool: int = 4, parameter_count: int = 6) -> Path:
+    """Workspace with tool_count tools whose first tool has runnable Python stubs"""
+    tools = []
+    curated = []
+    for index in range(tool_count):
+        tool_id = f"synthetic-{index:04d}"
+        category = ("system", "ai", "media", "dev")[index % 4]
+        tool_path = root / "tools" / category / tool_id
+        scripts = [f"scripts/step-{step}.py" for step in range(scripts_per_tool)]
+        
+        (tool_path / "scripts").mkdir(parents=True)
+        if index == 0:
+            for script in scripts:
+                (tool_path / script).write_text("import sys\nprint(' '.join(sys.argv[1:]) or 'ok')\n", encoding='utf-8')
+        
+        manifest = {
+            "id": tool_id,
+            "name": f"Synthetic Tool {index}",
+            "description": f"Synthetic {category} tool number {index} for benchmarking the registry",
+            "category": category,
+            "tags": [category, f"group-{index % 10}", "synthetic"],
+            "entry_points": {"primary": scripts[0], "alternatives": scripts[1:]},
+            "parameters": [
+                {
+                    "name": f"Param{param}",
+                    "type": ("string", "int", "boolean", "array")[param % 4],
+                    "required": param == 0,
+                    "description": f"Parameter {param} of tool {index}"
+                }
+                for param in range(parameter_count)
+            ]
+        }
+        (tool_path / "MANIFEST.json").write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+        tools.append({"id": tool_id, "category": category, "path": f"tools/{category}/{tool_id}", "status": "active"})
+        
+        if index % 10 == 0:
+            curated.append({
+                "code": f"{tool_id}:run",
+                "name": f"Run synthetic tool {index}",
+                "description": "Hand-written operation from operations.json",
+                "category": category,
+                "tool": tool_id,
+                "entry_point": scripts[0],
+                "parameters": {"Message": {"type": "string", "required": False}},
+                "tags": ["curated"]
+            })
+    
+    (root / ".toolset").mkdir(parents=True, exist_ok=True)
+    (root / ".toolset" / "registry.json").write_text(json.dumps({"tools": tools}, indent=2), encoding='utf-8')
+    (root / ".toolset" / "operations.json").write_text(json.dumps({"operations": curated}, indent=2), encoding='utf-8')
+    
+    config_dir = root / "mcp" / "config"
+    config_dir.mkdir(parents=True, exist_ok=True)
+    (config_dir / "server.json").write_text(json.dumps({
+        "execution": {"interpreter": [sys.executable], "timeout": 60},
+        "reload": {"enabled": False},
+        "metrics": {"export_path": None}
+    }), encoding='utf-8')
+    return root
+
+
+def time_calls(fn: Callable[[], Any], iterations: int, warmup: int = 1) -> List[float]:
+    """Call fn repeatedly and return per-call latencies in ms"""
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Median, mean and minimum latency"""
+    return {
+        'median_ms': round(statistics.median(latencies), 3),
+        'mean_ms': round(statistics.mean(latencies), 3),
+        'min_ms': round(min(latencies), 3),
+        'samples': len(latencies)
+    }
+
+
+def list_tools_payload(registry: ToolRegistry) -> str:
+    """What tools/list puts on the wire: one entry per operation plus the server's own tools"""
+    catalog = registry.catalog
+    tools = [
+        {'name': code, 'description': op.get('description', op.get('name', '')), 'inputSchema': catalog.schemas[code]}
+        for code, op in catalog.by_code.items()
+    ]
+    tools.extend(JOB_TOOLS + BATCH_TOOLS + CACHE_TOOLS + CATALOG_TOOLS + METRICS_TOOLS)
+    return json.dumps({'tools': tools})
+
+
+async def _time_async_executions(executor: OperationExecutor, code: str, iterations: int) -> List[float]:
+    """Latencies of OperationExecutor.execute on one event loop"""
+    await executor.execute(code, {})
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await executor.execute(code, {})
+        latencies.append((time.perf_counter() - started) * 1000)
+    await executor.close()
+    return latencies
+
+
+class StdioClient:
+    """Minimal JSON-RPC client speaking MCP to a server subprocess over stdio"""
+    
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.next_id = 0
+    
+    async def notify(self, method: str, params: Optional[Dict[str, Any]] = None):
+        """Send a notification (no response expected)"""
+        message = {'jsonrpc': '2.0', 'method': method, **({'params': params} if params else {})}
+        self.process.stdin.write((json.dumps(message) + "\n").encode('utf-8'))
+        await self.process.stdin.drain()
+    
+    async def request(self, method: str, params: Optional[Dict[str, Any]] = None, timeout: float = 30) -> Dict[str, Any]:
+        """Send a request and wait for its response, skipping notifications"""
+        self.next_id += 1
+        request_id = self.next_id
+        message = {'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params or {}}
+        self.process.stdin.write((json.dumps(message) + "\n").encode('utf-8'))
+        await self.process.stdin.drain()
+        
+        while True:
+            line = await asyncio.wait_for(self.process.stdout.readline(), timeout=timeout)
+            if not line:
+                raise ConnectionError("server closed stdout")
+            response = json.loads(line)
+            if response.get('id') == request_id:
+                if 'error' in response:
+                    raise RuntimeError(response['error'])
+                return response['result']
+
+
+async def stdio_round_trip(workspace: Path, iterations: int) -> Dict[str, Any]:
+    """Start the real server over stdio and time initialize, tools/list and tools/call"""
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, str(project_root / "mcp" / "start_server.py"), str(workspace),
+        cwd=str(project_root),
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        limit=64 * 1024 * 1024
+    )
+    client = StdioClient(process)
+    
+    try:
+        try:
+            await client.request('initialize', {
+                'protocolVersion': '2024-11-05',
+                'capabilities': {},
+                'clientInfo': {'name': 'bench-suite', 'version': '1.0.0'}
+            })
+        except (ConnectionError, asyncio.TimeoutError, json.JSONDecodeError) as e:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            stderr = (await process.stderr.read()).decode('utf-8', errors='replace').strip()
+            reason = stderr.splitlines()[-1] if stderr else str(e) or type(e).__name__
+            return {'skipped': f"server did not start: {reason}"}
+        startup = (time.perf_counter() - started) * 1000
+        await client.notify('notifications/initialized')
+        
+        list_latencies = []
+        call_latencies = []
+        for _ in range(iterations):
+            begin = time.perf_counter()
+            await client.request('tools/list')
+            list_latencies.append((time.perf_counter() - begin) * 1000)
+            
+            begin = time.perf_counter()
+            await client.request('tools/call', {'name': 'synthetic-0000:step-0', 'arguments': {}})
+            call_latencies.append((time.perf_counter() - begin) * 1000)
+        
+        return {
+            'stdio_startup': summarize([startup]),
+            'stdio_tools_list': summarize(list_latencies),
+            'stdio_tools_call': summarize(call_latencies)
+        }
+    finally:
+        if process.returncode is None:
+            process.stdin.close()
+            try:
+                await asyncio.wait_for(process.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+
+
+def run_suite(workspace: Path, iterations: int, only: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """Run every benchmark (or just those named in only) and return their summaries"""
+    def wanted(name: str) -> bool:
+        return only is None or name in only
+    
+    results: Dict[str, Dict[str, Any]] = {}
+    ToolRegistry(str(workspace))  # writes the snapshot used by registry_snapshot
+    registry = ToolRegistry(str(workspace))
+    code = 'synthetic-0000:step-0'
+    
+    if wanted('registry_cold'):
+        results['registry_cold'] = summarize(time_calls(lambda: ToolRegistry(str(workspace), use_snapshot=False), iterations))
+    if wanted('registry_snapshot'):
+        results['registry_snapshot'] = summarize(time_calls(lambda: ToolRegistry(str(workspace)), iterations))
+    if wanted('get_operations'):
+        results['get_operations'] = summarize(time_calls(registry.get_operations, iterations * 10))
+    if wanted('catalog_build'):
+        results['catalog_build'] = summarize(time_calls(
+            lambda: OperationCatalog(registry._build_operations(registry.tools), registry.tools),
+            iterations
+        ))
+    if wanted('list_tools'):
+        results['list_tools'] = summarize(time_calls(lambda: list_tools_payload(registry), iterations))
+    if wanted('catalog_search'):
+        results['catalog_search'] = summarize(time_calls(lambda: registry.search("synthetic group 7 media"), iterations * 10))
+    
+    config = load_server_config(workspace)
+    if wanted('execute_sync'):
+        results['execute_sync'] = summarize(time_calls(
+            lambda: execute_operation_sync(registry, code, {}, config),
+            iterations
+        ))
+    if wanted('execute_async'):
+        executor = OperationExecutor(registry, config)
+        results['execute_async'] = summarize(asyncio.run(_time_async_executions(executor, code, iterations)))
+    
+    if any(wanted(name) for name in ('stdio_startup', 'stdio_tools_list', 'stdio_tools_call')):
+        stdio = asyncio.run(stdio_round_trip(workspace, iterations))
+        if 'skipped' in stdio:
+            results['stdio_round_trip'] = stdio
+        else:
+            results.update({name: summary for name, summary in stdio.items() if wanted(name)})
+    
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baselines: Dict[str, Dict[str, Any]], tolerance: float) -> Dict[str, str]:
+    """Status of each benchmark relative to its baseline: ok, regressed, new or skipped"""
+    statuses = {}
+    for name, summary in results.items():
+        baseline = baselines.get(name)
+        if 'skipped' in summary:
+            statuses[name] = 'skipped'
+        elif baseline is None:
+            statuses[name] = 'new'
+        else:
+            limit = baseline['median_ms'] * (1 + tolerance)
+            regressed = summary['median_ms'] > limit and summary['median_ms'] - baseline['median_ms'] > MIN_REGRESSION_MS
+            statuses[name] = 'regressed' if regressed else 'ok'
+    return statuses
+
+
+def environment(tool_count: int, iterations: int) -> Dict[str, Any]:
+    """Parameters that must match for a baseline comparison to mean anything"""
+    return {
+        'tools': tool_count,
+        'iterations': iterations,
+        'python': platform.python_version(),
+        'platform': platform.system()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark registry loading, tool listing and execution")
+    parser.add_argument("--tools", type=int, default=300, help="Number of synthetic tools")
+    parser.add_argument("--iterations", type=int, default=15)
+    parser.add_argument("--only", type=str, help="Comma-separated benchmark names")
+    parser.add_argument("--baseline", type=str, default=str(BASELINE_PATH))
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown over baseline (0.5 = 50%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    args = parser.parse_args()
+    
+    only = args.only.split(',') if args.only else None
+    with tempfile.TemporaryDirectory() as tmp:
+        workspace = make_synthetic_workspace(Path(tmp), args.tools)
+        results = run_suite(workspace, args.iterations, only)
+    
+    env = environment(args.tools, args.iterations)
+    baseline_path = Path(args.baseline)
+    
+    if args.update_baseline:
+        stored = json.loads(baseline_path.read_text(encoding='utf-8')) if baseline_path.exists() else {}
+        merged = stored.get('results', {}) if stored.get('environment') == env else {}
+        merged.update({name: summary for name, summary in results.items() if 'skipped' not in summary})
+        baseline_path.write_text(json.dumps({'environment': env, 'results': merged}, indent=2) + "\n", encoding='utf-8')
+        print(json.dumps({'environment': env, 'results': results, 'baseline_written': str(baseline_path)}, indent=2))
+        return
+    
+    statuses: Dict[str, str] = {}
+    note = None
+    if baseline_path.exists():
+        stored = json.loads(baseline_path.read_text(encoding='utf-8'))
+        if stored.get('environment') == env:
+            statuses = compare(results, stored.get('results', {}), args.tolerance)
+        else:
+            note = f"baseline recorded with {stored.get('environment')}, not comparable; run with --update-baseline"
+    else:
+        note = f"no baseline at {baseline_path}; run with --update-baseline"
+    
+    print(json.dumps({'environment': env, 'results': results, 'status': statuses, 'note': note}, indent=2))
+    
+    regressed = sorted(name for name, status in statuses.items() if status == 'regressed')
+    if regressed:
+        print(f"Regressed beyond {args.tolerance:.0%} of baseline: {', '.join(regressed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Benchmark: warm worker pool vs spawn-per-call execution
+
+Usage:
+    python mcp/benchmarks/bench_worker_pool.py                      # Python stub workers
+    python mcp/benchmarks/bench_worker_pool.py --interpreter pwsh \\
+        --operation cpu-affinity:check                              # real PowerShell scripts
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from mcp.server.config import load_server_config
+from mcp.server.executor import OperationExecutor
+from mcp.server.tool_registry import ToolRegistry
+
+
+INTERPRETERS = {
+    'python': {
+        'spawn': [sys.executable],
+        'worker': [sys.executable, "{worker_dir}/worker.py"]
+    },
+    'pwsh': {
+        'spawn': ['pwsh', '-NoLogo', '-NoProfile', '-File'],
+        'worker': ['pwsh', '-NoLogo', '-NoProfile', '-File', "{worker_dir}/worker.ps1"]
+    },
+    'powershell': {
+        'spawn': ['powershell.exe', '-NoLogo', '-NoProfile', '-ExecutionPolicy', 'Bypass', '-File'],
+        'worker': ['powershell.exe', '-NoLogo', '-NoProfile', '-ExecutionPolicy', 'Bypass', '-File', "{worker_dir}/worker.ps1"]
+    }
+}
+
+
+def make_stub_workspace(root: Path) -> Path:
+    """Workspace with one quick Python operation, bench:quick"""
+    tool_path = root / "tools" / "bench"
+    (tool_path / "scripts").mkdir(parents=True)
+    (tool_path / "scripts" / "quick.py").write_text("print('ok')\n", encoding='utf-8')
+    (tool_path / "MANIFEST.json").write_text(json.dumps({
+        "id": "bench",
+        "name": "Bench",
+        "entry_points": {"primary": "scripts/quick.py"}
+    }), encoding='utf-8')
+    (root / ".toolset").mkdir()
+    (root / ".toolset" / "registry.json").write_text(json.dumps({
+        "tools": [{"id": "bench", "category": "dev", "path": "tools/bench"}]
+    }), encoding='utf-8')
+    return root
+
+
+async def time_calls(executor: OperationExecutor, operation: str, iterations: int):
+    """Run an operation sequentially and return per-call latencies in ms"""
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await executor.execute(operation, {})
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def summarize(latencies):
+    """Mean and percentile latencies"""
+    ordered = sorted(latencies)
+    return {
+        'mean_ms': round(statistics.mean(ordered), 2),
+        'p50_ms': round(ordered[len(ordered) // 2], 2),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2)
+    }
+
+
+async def run_benchmark(workspace: Path, interpreter: str, operation: str, iterations: int):
+    """Time the same operation through both execution paths"""
+    registry = ToolRegistry(str(workspace))
+    commands = INTERPRETERS[interpreter]
+    
+    config = load_server_config(workspace)
+    config['execution']['interpreter'] = commands['spawn']
+    spawn = OperationExecutor(registry, config)
+    
+    pooled_config = load_server_config(workspace)
+    pooled_config['execution']['worker_pool'].update({
+        'enabled': True,
+        'command': commands['worker'],
+        'size': 1,
+        'max_runs': iterations + 1,
+        'operations': [operation]
+    })
+    pooled = OperationExecutor(registry, pooled_config)
+    
+    try:
+        # Warm the pool so the comparison measures steady state
+        await pooled.execute(operation, {})
+        return {
+            'operation': operation,
+            'interpreter': interpreter,
+            'iterations': iterations,
+            'spawn_per_call': summarize(await time_calls(spawn, operation, iterations)),
+            'worker_pool': summarize(await time_calls(pooled, operation, iterations))
+        }
+    finally:
+        await pooled.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare worker pool and spawn-per-call latency")
+    parser.add_argument("--interpreter", choices=sorted(INTERPRETERS), default="python")
+    parser.add_argument("--workspace", type=str, help="Workspace root (default: stub workspace for python)")
+    parser.add_argument("--operation", type=str, default="bench:quick")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        workspace = Path(args.workspace) if args.workspace else make_stub_workspace(Path(tmp))
+        result = asyncio.run(run_benchmark(workspace, args.interpreter, args.operation, args.iterations))
+    
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
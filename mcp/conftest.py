@@ -0,0 +1,116 @@
+"""Shared pytest fixtures for MCP server tests"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+from start_server import use_repo_server_package
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# With the MCP SDK installed, mcp.server is the SDK's package
+use_repo_server_package()
+
+
+STUB_SCRIPTS = {
+    "echo.py": (
+        "import sys\n"
+        "print(' '.join(sys.argv[1:]) or 'hello')\n"
+    ),
+    "fail.py": (
+        "import sys\n"
+        "print('bad things', file=sys.stderr)\n"
+        "sys.exit(3)\n"
+    ),
+    "chatty.py": (
+        "import sys\n"
+        "for i in range(2000):\n"
+        "    print(f'line {i:04d} ' + 'x' * 40, flush=(i % 100 == 0))\n"
+        "print('progress 50%\\rprogress 100%', file=sys.stderr)\n"
+    ),
+    "crash.py": (
+        "import os\n"
+        "print('about to crash', flush=True)\n"
+        "os._exit(5)\n"
+    ),
+    "counter.py": (
+        "import pathlib\n"
+        "marker = pathlib.Path('counter.txt')\n"
+        "count = int(marker.read_text()) + 1 if marker.exists() else 1\n"
+        "marker.write_text(str(count))\n"
+        "print(f'run {count}')\n"
+    ),
+    "sleep.py": (
+        "import sys, time\n"
+        "time.sleep(float(sys.argv[1].split('\"')[1]) if len(sys.argv) > 1 else 0.5)\n"
+        "print('slept')\n"
+    ),
+    "spawn.py": (
+        "import pathlib, subprocess, sys, time\n"
+        "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+        "pathlib.Path('child.pid').write_text(str(child.pid))\n"
+        "time.sleep(30)\n"
+    ),
+}
+
+
+def write_stub_workspace(root: Path, tool_ids=("stub-tool",)) -> Path:
+    """Create a minimal workspace whose operations are Python stub scripts"""
+    tools = []
+    for tool_id in tool_ids:
+        tool_path = root / "tools" / "stub" / tool_id
+        scripts = tool_path / "scripts"
+        scripts.mkdir(parents=True)
+        for name, body in STUB_SCRIPTS.items():
+            (scripts / name).write_text(body, encoding='utf-8')
+        
+        manifest = {
+            "id": tool_id,
+            "name": f"Stub {tool_id}",
+            "description": "Stub tool for tests",
+            "category": "dev",
+            "entry_points": {
+                "primary": "scripts/echo.py",
+                "alternatives": ["scripts/fail.py", "scripts/sleep.py", "scripts/chatty.py", "scripts/crash.py", "scripts/counter.py", "scripts/spawn.py"]
+            },
+            "parameters": [
+                {"name": "Message", "type": "string", "required": False, "description": "Text to echo"}
+            ],
+            "operation_settings": {
+                f"{tool_id}:counter": {"cache_ttl": 60}
+            }
+        }
+        (tool_path / "MANIFEST.json").write_text(json.dumps(manifest), encoding='utf-8')
+        tools.append({
+            "id": tool_id,
+            "name": f"Stub {tool_id}",
+            "category": "dev",
+            "path": f"tools/stub/{tool_id}",
+            "status": "active"
+        })
+    
+    (root / ".toolset").mkdir(parents=True, exist_ok=True)
+    (root / ".toolset" / "registry.json").write_text(json.dumps({"tools": tools}), encoding='utf-8')
+    
+    config_dir = root / "mcp" / "config"
+    config_dir.mkdir(parents=True, exist_ok=True)
+    (config_dir / "server.json").write_text(json.dumps({
+        "execution": {
+            "interpreter": [sys.executable],
+            "timeout": 30,
+            "max_concurrent": 4,
+            "per_tool_limit": 2
+        }
+    }), encoding='utf-8')
+    
+    return root
+
+
+@pytest.fixture
+def stub_workspace(tmp_path):
+    """Workspace with a single stub tool runnable by the current interpreter"""
+    return write_stub_workspace(tmp_path)
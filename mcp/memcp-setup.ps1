@@ -189,7 +189,7 @@ Add to your Cursor MCP configuration (`%APPDATA%\Cursor\mcp.json`):
   "mcpServers": {
     "electric-sheep": {
       "command": "python",
-      "args": ["-m", "mcp.server.server"],
+      "args": ["mcp/start_server.py"],
       "cwd": "YOUR_WORKSPACE_ROOT"
     },
     "MemCP": {
@@ -0,0 +1,138 @@
+"""CPU core scheduler giving concurrent operations disjoint core sets"""
+
+import asyncio
+import bisect
+import contextlib
+import itertools
+import os
+import shutil
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+
+# Processes are pinned by running them under taskset (util-linux); without
+# it reservations are still tracked (so exclusive work queues) but
+# processes are not pinned
+TASKSET = shutil.which('taskset') if hasattr(os, 'sched_setaffinity') else None
+CAN_PIN = TASKSET is not None
+
+
+def available_cores() -> List[int]:
+    """Cores this server process may run on"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def pinned_command(cmd: List[str], cores: Optional[List[int]]) -> List[str]:
+    """Command that runs cmd (and everything it starts) on cores"""
+    if not cores or not CAN_PIN:
+        return list(cmd)
+    # taskset sets the affinity before exec, so threads and grandchildren
+    # inherit it; a preexec_fn would do the same but is unsafe with threads
+    return [TASKSET, '-c', ','.join(str(core) for core in cores), *cmd]
+
+
+class CoreScheduler:
+    """Hands out disjoint core sets to operations that ask for them
+    
+    An operation opts in through "operation_settings" in its manifest:
+    {"cores": N} reserves N cores no other reserving operation may use
+    while it runs, and {"exclusive": true} additionally keeps operations
+    without a hint off those cores. Operations without a hint run on the
+    cores not held exclusively. Requests are served in rank order (first
+    come, first served unless ranks say otherwise); one that cannot get its
+    cores waits.
+    """
+    
+    def __init__(self, cores: Optional[List[int]] = None, min_shared_cores: int = 1, enabled: bool = True):
+        self.cores: List[int] = sorted(cores) if cores else available_cores()
+        self.min_shared_cores = min(min_shared_cores, len(self.cores))
+        self.enabled = enabled
+        self.reserved: Dict[int, Set[int]] = {}
+        self.exclusive: Set[int] = set()
+        self.waited = 0
+        self._queue: List[Tuple[float, int]] = []
+        self._tickets = itertools.count(1)
+        self._changed = asyncio.Condition()
+    
+    def _free(self) -> List[int]:
+        """Cores not reserved by any running operation"""
+        taken = set().union(*self.reserved.values()) if self.reserved else set()
+        return [core for core in self.cores if core not in taken]
+    
+    def shared_cores(self) -> List[int]:
+        """Cores available to operations without a hint"""
+        return [core for core in self.cores if core not in self.exclusive]
+    
+    def _clamp(self, count: int, exclusive: bool) -> int:
+        """Largest request that can ever be satisfied, so nothing waits forever"""
+        limit = len(self.cores) - (self.min_shared_cores if exclusive else 0)
+        return max(1, min(count, limit))
+    
+    def _can_take(self, count: int, exclusive: bool) -> bool:
+        """Whether enough free cores exist, leaving the shared minimum for exclusive requests"""
+        if len(self._free()) < count:
+            return False
+        if exclusive:
+            return len(self.shared_cores()) - count >= self.min_shared_cores
+        return True
+    
+    @contextlib.asynccontextmanager
+    async def reserve(
+        self,
+        count: Optional[int] = None,
+        exclusive: bool = False,
+        rank: Optional[float] = None
+    ) -> AsyncIterator[Optional[List[int]]]:
+        """Hold a core set for the duration of a run
+        
+        Yields the cores to pin the process to, or None when it should
+        not be pinned (no hint and nothing is held exclusively). Waiting
+        requests are served lowest rank first (default: arrival time).
+        """
+        if not self.enabled or not count:
+            shared = self.shared_cores()
+            yield shared if self.enabled and len(shared) < len(self.cores) else None
+            return
+        
+        count = self._clamp(int(count), exclusive)
+        ticket = next(self._tickets)
+        entry = (time.monotonic() if rank is None else rank, ticket)
+        async with self._changed:
+            bisect.insort(self._queue, entry)
+            if not (self._queue[0] == entry and self._can_take(count, exclusive)):
+                self.waited += 1
+            try:
+                await self._changed.wait_for(
+                    lambda: self._queue[0] == entry and self._can_take(count, exclusive)
+                )
+            finally:
+                self._queue.remove(entry)
+                # The next request in line may be satisfiable now
+                self._changed.notify_all()
+            
+            cores = self._free()[:count]
+            self.reserved[ticket] = set(cores)
+            if exclusive:
+                self.exclusive.update(cores)
+        
+        try:
+            yield cores
+        finally:
+            async with self._changed:
+                self.reserved.pop(ticket, None)
+                self.exclusive.difference_update(cores)
+                self._changed.notify_all()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Current reservations, for diagnostics"""
+        return {
+            'enabled': self.enabled,
+            'pinning': CAN_PIN,
+            'cores': self.cores,
+            'reserved': sorted(sorted(cores) for cores in self.reserved.values()),
+            'exclusive': sorted(self.exclusive),
+            'queued': len(self._queue),
+            'waited': self.waited
+        }
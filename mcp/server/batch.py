@@ -0,0 +1,193 @@
+"""Batch meta-tool: run a DAG of operations in one call"""
+
+import asyncio
+import time
+from typing import Any, Dict, List
+
+from .executor import OperationExecutor
+
+
+BATCH_TOOLS: List[Dict[str, Any]] = [
+    {
+        'name': 'batch',
+        'description': (
+            'Run several operations in one call. Steps without a dependency between them run in '
+            'parallel (within the server\'s concurrency limits); a step whose dependency fails is '
+            'skipped. Returns one summary per step.'
+        ),
+        'inputSchema': {
+            'type': 'object',
+            'properties': {
+                'steps': {
+                    'type': 'array',
+                    'description': 'Steps to run',
+                    'items': {
+                        'type': 'object',
+                        'properties': {
+                            'id': {'type': 'string', 'description': 'Unique step name (default: the operation code)'},
+                            'operation_code': {'type': 'string', 'description': 'Operation to run (e.g. musubi-tuner:wan:train)'},
+                            'arguments': {'type': 'object', 'description': 'Arguments for the operation'},
+                            'depends_on': {'type': 'array', 'items': {'type': 'string'}, 'description': 'IDs of steps that must succeed first'}
+                        },
+                        'required': ['operation_code']
+                    }
+                },
+                'fail_fast': {'type': 'boolean', 'description': 'Cancel every unfinished step as soon as one fails', 'default': False},
+                'output_chars': {'type': 'integer', 'description': 'Characters of output kept per step (the tail)', 'default': 2000}
+            },
+            'required': ['steps']
+        }
+    }
+]
+
+
+class BatchError(Exception):
+    """Raised when a batch's steps do not form a valid DAG"""
+
+
+def plan_steps(steps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Normalize steps and check ids, dependencies and cycles"""
+    if not steps:
+        raise BatchError("A batch needs at least one step")
+    
+    planned = []
+    for index, step in enumerate(steps):
+        if not isinstance(step, dict) or not step.get('operation_code'):
+            raise BatchError(f"Step {index} has no operation_code")
+        planned.append({
+            'id': str(step.get('id') or step['operation_code']),
+            'operation_code': step['operation_code'],
+            'arguments': step.get('arguments') or {},
+            'depends_on': [str(dep) for dep in step.get('depends_on') or []]
+        })
+    
+    ids = [step['id'] for step in planned]
+    duplicates = sorted({step_id for step_id in ids if ids.count(step_id) > 1})
+    if duplicates:
+        raise BatchError(f"Duplicate step ids: {', '.join(duplicates)} (give repeated operations an 'id')")
+    
+    known = set(ids)
+    for step in planned:
+        missing = [dep for dep in step['depends_on'] if dep not in known]
+        if missing:
+            raise BatchError(f"Step '{step['id']}' depends on unknown steps: {', '.join(missing)}")
+    
+    # Kahn's algorithm - whatever cannot be ordered sits on a cycle
+    remaining = {step['id']: set(step['depends_on']) for step in planned}
+    while True:
+        ready = [step_id for step_id, deps in remaining.items() if not deps]
+        if not ready:
+            break
+        for step_id in ready:
+            del remaining[step_id]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    if remaining:
+        raise BatchError(f"Dependency cycle between steps: {', '.join(sorted(remaining))}")
+    
+    return planned
+
+
+class BatchRunner:
+    """Runs a batch of operations as a dependency graph
+    
+    Every step starts as soon as its dependencies have succeeded and then
+    queues for executor slots like any other call, so the global and
+    per-tool limits still apply. When a step fails its dependents are
+    skipped while unrelated branches keep going (or, with fail_fast,
+    everything unfinished is cancelled).
+    """
+    
+    def __init__(self, executor: OperationExecutor):
+        self.executor = executor
+    
+    async def run(
+        self,
+        steps: List[Dict[str, Any]],
+        fail_fast: bool = False,
+        output_chars: int = 2000
+    ) -> Dict[str, Any]:
+        """Run a batch and return per-step summaries in input order"""
+        try:
+            planned = plan_steps(steps)
+        except BatchError as e:
+            return {'error': str(e)}
+        
+        started = time.monotonic()
+        summaries: Dict[str, Dict[str, Any]] = {
+            step['id']: {
+                'id': step['id'],
+                'operation_code': step['operation_code'],
+                'depends_on': step['depends_on'],
+                'status': 'pending'
+            }
+            for step in planned
+        }
+        done: Dict[str, asyncio.Future] = {step['id']: asyncio.get_running_loop().create_future() for step in planned}
+        
+        async def run_step(step: Dict[str, Any]):
+            summary = summaries[step['id']]
+            try:
+                for dep in step['depends_on']:
+                    if not await done[dep]:
+                        summary['status'] = 'skipped'
+                        summary['reason'] = f"dependency '{dep}' did not succeed"
+                        done[step['id']].set_result(False)
+                        return
+                
+                summary['status'] = 'running'
+                step_started = time.monotonic()
+                result = await self.executor.run_operation(step['operation_code'], step['arguments'])
+                summary['duration_seconds'] = round(time.monotonic() - step_started, 3)
+                summary['exit_code'] = result.exit_code
+                summary['status'] = 'succeeded' if result.exit_code == 0 else 'failed'
+                summary['output'] = _tail(result.text, output_chars)
+                done[step['id']].set_result(result.exit_code == 0)
+                
+                if fail_fast and result.exit_code != 0:
+                    for task in tasks:
+                        if task is not asyncio.current_task():
+                            task.cancel()
+            except asyncio.CancelledError:
+                if summary['status'] in ('pending', 'running'):
+                    summary['status'] = 'cancelled'
+                if not done[step['id']].done():
+                    done[step['id']].set_result(False)
+                raise
+            except Exception as e:
+                # Never leave dependents waiting on a step that blew up
+                summary['status'] = 'failed'
+                summary['error'] = str(e)
+                if not done[step['id']].done():
+                    done[step['id']].set_result(False)
+        
+        tasks = [asyncio.create_task(run_step(step)) for step in planned]
+        await asyncio.gather(*tasks, return_exceptions=True)
+        
+        nodes = [summaries[step['id']] for step in planned]
+        return {
+            'status': 'succeeded' if all(node['status'] == 'succeeded' for node in nodes) else 'failed',
+            'duration_seconds': round(time.monotonic() - started, 3),
+            'counts': {
+                status: sum(1 for node in nodes if node['status'] == status)
+                for status in ('succeeded', 'failed', 'skipped', 'cancelled')
+            },
+            'steps': nodes
+        }
+    
+    async def call(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Dispatch one of the BATCH_TOOLS by name"""
+        if name == 'batch':
+            return await self.run(
+                arguments.get('steps') or [],
+                arguments.get('fail_fast', False),
+                arguments.get('output_chars', 2000)
+            )
+        return {'error': f"Unknown batch tool '{name}'"}
+
+
+def _tail(text: str, limit: int) -> str:
+    """Last limit characters of a step's output"""
+    if limit <= 0 or len(text) <= limit:
+        return text
+    return f"[... {len(text) - limit} characters omitted ...]\n" + text[-limit:]
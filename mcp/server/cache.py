@@ -0,0 +1,112 @@
+"""Result cache for idempotent, read-only operations"""
+
+import json
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+CACHE_TOOLS: List[Dict[str, Any]] = [
+    {
+        'name': 'cache:invalidate',
+        'description': 'Drop cached results for one operation, or for all operations when no code is given',
+        'inputSchema': {
+            'type': 'object',
+            'properties': {
+                'operation_code': {'type': 'string', 'description': 'Operation whose cached results to drop'}
+            },
+            'required': []
+        }
+    },
+    {
+        'name': 'cache:stats',
+        'description': 'Show result cache size and hit/miss counters',
+        'inputSchema': {
+            'type': 'object',
+            'properties': {},
+            'required': []
+        }
+    }
+]
+
+
+CacheKey = Tuple[str, str, int, int]
+
+
+class ResultCache:
+    """Bounded LRU cache of operation results with per-entry TTL
+    
+    Operations opt in through "operation_settings" in their tool's
+    MANIFEST.json ({"<code>": {"cache_ttl": seconds}}). Keys include the
+    entry point's mtime and size, so editing a script invalidates its
+    cached results.
+    """
+    
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[CacheKey, Tuple[float, str]]' = OrderedDict()
+    
+    @staticmethod
+    def make_key(operation_code: str, arguments: Dict[str, Any], script_path: Path) -> CacheKey:
+        """Key on the code, normalized arguments and script version"""
+        stat = script_path.stat()
+        normalized = json.dumps(
+            {name: value for name, value in arguments.items() if name != 'operation_code'},
+            sort_keys=True,
+            default=str
+        )
+        return (operation_code, normalized, stat.st_mtime_ns, stat.st_size)
+    
+    def get(self, key: CacheKey) -> Optional[str]:
+        """Return a live cached result, counting the hit or miss"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+    
+    def put(self, key: CacheKey, result: str, ttl: float):
+        """Store a result, evicting the least recently used entries"""
+        self._entries[key] = (time.monotonic() + ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, operation_code: Optional[str] = None) -> int:
+        """Drop entries for one operation (or all) and return how many"""
+        if operation_code is None:
+            count = len(self._entries)
+            self._entries.clear()
+            return count
+        
+        stale = [key for key in self._entries if key[0] == operation_code]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Size and hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None
+        }
+    
+    def call(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Dispatch one of the CACHE_TOOLS by name"""
+        if name == 'cache:invalidate':
+            return {'invalidated': self.invalidate(arguments.get('operation_code')), **self.stats()}
+        if name == 'cache:stats':
+            return self.stats()
+        return {'error': f"Unknown cache tool '{name}'"}
@@ -0,0 +1,114 @@
+"""Server configuration loader for MCP server"""
+
+import copy
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+
+DEFAULT_CONFIG: Dict[str, Any] = {
+    "execution": {
+        # Command prefix used to run an operation's entry point script
+        "interpreter": ["powershell.exe", "-ExecutionPolicy", "Bypass", "-File"],
+        "timeout": 3600,
+        "max_concurrent": 4,
+        "per_tool_limit": 2,
+        "tool_limits": {},
+        # Per-stream cap on output kept in memory; beyond it output is spilled
+        # to disk (or, with spilling disabled, older lines are dropped)
+        "max_output_bytes": 1048576,
+        "spill": {
+            "enabled": True,
+            # Relative to the workspace root
+            "dir": "logs/mcp/output",
+            # Head and tail kept in the response once output is spilled
+            "excerpt_bytes": 8192,
+            "retention_hours": 72
+        },
+        # Warm interpreters for quick operations; {worker_dir} is mcp/server/workers
+        "worker_pool": {
+            "enabled": False,
+            "command": [
+                "powershell.exe", "-NoLogo", "-NoProfile",
+                "-ExecutionPolicy", "Bypass", "-File", "{worker_dir}/worker.ps1"
+            ],
+            "size": 2,
+            "max_runs": 50,
+            "operations": ["cpu-affinity:check", "bambu-lab:find-installation"]
+        }
+    },
+    "scheduler": {
+        # Give operations with a "cores" setting in their manifest's
+        # operation_settings disjoint core sets (pinned on Linux)
+        "enabled": True,
+        # Cores to schedule on; null means every core the server may use
+        "cores": None,
+        # Exclusive reservations never leave fewer shared cores than this
+        "min_shared_cores": 1
+    },
+    "reload": {
+        # Poll registry.json and manifests for changes while running
+        "enabled": True,
+        "interval": 2.0
+    },
+    "cache": {
+        # Results of operations with a cache_ttl in their manifest's operation_settings
+        "max_entries": 256
+    },
+    "history": {
+        # SQLite run history (relative to the workspace root) used to estimate
+        # durations and run short jobs first; null disables both
+        "path": "logs/mcp/history.sqlite3",
+        # Runs kept per operation and argument fingerprint
+        "max_runs_per_key": 50
+    },
+    "metrics": {
+        # Periodically written Prometheus text (or JSON) file, relative to the
+        # workspace root; null disables the file and keeps the metrics:get tool
+        "export_path": "logs/mcp/metrics.prom",
+        "export_format": "prometheus",
+        "export_interval": 15
+    },
+    "http": {
+        # Used with --transport http; bind to loopback and tunnel for remote use
+        "host": "127.0.0.1",
+        "port": 8765,
+        "path": "/mcp",
+        # Seconds an idle keep-alive connection stays open
+        "keep_alive": 75,
+        # Per client (MCP session, or address before one exists)
+        "max_concurrent_per_client": 4,
+        "max_requests_per_minute": 240
+    },
+    "jobs": {
+        # Relative to the workspace root
+        "state_dir": "logs/mcp/jobs",
+        "timeout": 86400,
+        # Seconds between SIGTERM and SIGKILL when cancelling
+        "kill_grace": 5
+    }
+}
+
+
+def _merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """Recursively merge override into a copy of base"""
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def load_server_config(workspace_root: Path) -> Dict[str, Any]:
+    """Load mcp/config/server.json merged over the built-in defaults"""
+    config_path = Path(workspace_root) / "mcp" / "config" / "server.json"
+    
+    if not config_path.exists():
+        return copy.deepcopy(DEFAULT_CONFIG)
+    
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    
+    return _merge(DEFAULT_CONFIG, config)
@@ -0,0 +1,563 @@
+"""Operation execution engine for MCP server"""
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import json
+import subprocess
+import time
+import traceback
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .affinity import CoreScheduler, pinned_command
+from .cache import ResultCache
+from .config import load_server_config
+from .history import RunHistory
+from .metrics import MetricsRecorder
+from .output import BoundedOutput, OutputStore, iter_lines
+from .process import kill_process_group, process_group_kwargs
+from .tool_registry import ToolRegistry
+from .worker_pool import WorkerCrashed, WorkerPool
+
+
+# Called with the stream name ('stdout' or 'stderr') and each decoded line
+OutputCallback = Callable[[str, str], Awaitable[None]]
+
+
+class RunResult(NamedTuple):
+    """Text returned to the client plus the exit code (None if it did not finish)"""
+    text: str
+    exit_code: Optional[int]
+    # Seconds to start the process (None when a warm worker ran it)
+    spawn_seconds: Optional[float] = None
+    output_bytes: int = 0
+
+
+class OperationError(Exception):
+    """Raised when an operation cannot be prepared for execution"""
+
+
+def resolve_operation(
+    registry: ToolRegistry,
+    operation_code: str
+) -> Tuple[Dict[str, Any], Path]:
+    """Find an operation and the script that implements it"""
+    operation = registry.get_operation(operation_code)
+    
+    if not operation:
+        raise OperationError(json.dumps({
+            "error": f"Operation '{operation_code}' not found",
+            "available_operations": list(registry.catalog.codes)
+        }, indent=2))
+    
+    tool_id = operation['tool_id']
+    script_path = registry.catalog.script_paths.get(operation_code)
+    
+    if script_path is None:
+        raise OperationError(f"Error: Tool '{tool_id}' not found")
+    
+    if not script_path.exists():
+        raise OperationError(f"Error: Script not found: {script_path}")
+    
+    return operation, script_path
+
+
+def format_arguments(arguments: Dict[str, Any]) -> List[str]:
+    """Format tool arguments as PowerShell parameters"""
+    ps_args = []
+    for param_name, param_value in arguments.items():
+        if param_name == 'operation_code':
+            continue
+        
+        if isinstance(param_value, bool):
+            if param_value:
+                ps_args.append(f"-{param_name}")
+        elif isinstance(param_value, list):
+            # Convert array to PowerShell array format
+            array_str = ','.join(str(v) for v in param_value)
+            ps_args.append(f"-{param_name} @({array_str})")
+        else:
+            # Escape quotes in string values
+            escaped_value = str(param_value).replace('"', '`"')
+            ps_args.append(f"-{param_name} \"{escaped_value}\"")
+    
+    return ps_args
+
+
+def build_command(
+    interpreter: List[str],
+    script_path: Path,
+    arguments: Dict[str, Any]
+) -> List[str]:
+    """Build the full command line for an operation"""
+    return [*interpreter, str(script_path), *format_arguments(arguments)]
+
+
+def format_result(stdout: str, stderr: str, returncode: int) -> str:
+    """Format process output as the text returned to the client"""
+    output_parts = []
+    
+    if stdout:
+        output_parts.append(f"Output:\n{stdout}")
+    
+    if stderr:
+        output_parts.append(f"Errors:\n{stderr}")
+    
+    if returncode != 0:
+        output_parts.append(f"Exit code: {returncode}")
+    
+    if not output_parts:
+        output_parts.append("Operation completed successfully")
+    
+    return "\n".join(output_parts)
+
+
+def format_timeout(timeout: float) -> str:
+    """Describe a timeout in the error returned to the client"""
+    if timeout % 3600 == 0:
+        hours = int(timeout // 3600)
+        return f"Error: Operation timed out after {hours} hour{'s' if hours != 1 else ''}"
+    return f"Error: Operation timed out after {timeout:g} seconds"
+
+
+def execute_operation_sync(
+    registry: ToolRegistry,
+    operation_code: str,
+    arguments: Dict[str, Any],
+    config: Optional[Dict[str, Any]] = None,
+    metrics: Optional[MetricsRecorder] = None
+) -> str:
+    """Execute an operation synchronously
+    
+    subprocess.run does not separate process start from run time, so only
+    run time, output size and the exit code are recorded in metrics.
+    """
+    execution = (config or load_server_config(registry.workspace_root))['execution']
+    started = time.perf_counter()
+    
+    try:
+        operation, script_path = resolve_operation(registry, operation_code)
+        cmd = build_command(execution['interpreter'], script_path, arguments)
+        
+        result = subprocess.run(
+            cmd,
+            cwd=str(registry.workspace_root),
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            timeout=execution['timeout']
+        )
+        
+        if metrics is not None:
+            output_bytes = len(result.stdout.encode('utf-8')) + len(result.stderr.encode('utf-8'))
+            metrics.record_run(operation_code, 0.0, None, time.perf_counter() - started, output_bytes, result.returncode)
+        return format_result(result.stdout, result.stderr, result.returncode)
+    
+    except OperationError as e:
+        return str(e)
+    except subprocess.TimeoutExpired:
+        if metrics is not None:
+            metrics.record_run(operation_code, 0.0, None, time.perf_counter() - started, 0, None)
+        return format_timeout(execution['timeout'])
+    except Exception as e:
+        if metrics is not None:
+            metrics.record_error(operation_code)
+        return f"Error executing operation: {str(e)}\n{traceback.format_exc()}"
+
+
+class PrioritySemaphore:
+    """Semaphore whose waiters get a released slot lowest rank first
+    
+    Ranks are arrival time plus estimated duration, so short runs overtake
+    long ones that are still queued, but a long run is never overtaken by
+    anything predicted to finish after it would have.
+    """
+    
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters: List[List[Any]] = []
+        self._sequence = itertools.count()
+    
+    @contextlib.asynccontextmanager
+    async def hold(self, rank: float = 0.0) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block"""
+        await self.acquire(rank)
+        try:
+            yield
+        finally:
+            self.release()
+    
+    async def acquire(self, rank: float = 0.0):
+        """Take a slot, waiting behind lower-ranked waiters"""
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return
+        
+        entry = [rank, next(self._sequence), asyncio.get_running_loop().create_future()]
+        heapq.heappush(self._waiters, entry)
+        try:
+            await entry[2]
+        except asyncio.CancelledError:
+            if entry[2].done() and not entry[2].cancelled():
+                # Handed a slot just as we were cancelled - pass it on
+                self.release()
+            elif entry in self._waiters:
+                # A release() between the cancel and now has already popped it
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+    
+    def release(self):
+        """Give a slot to the lowest-ranked waiter, or back to the pool"""
+        while self._waiters:
+            waiter = heapq.heappop(self._waiters)[2]
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._value += 1
+
+
+class OperationExecutor:
+    """Runs operations as asyncio subprocesses under concurrency limits
+    
+    A global semaphore caps the number of processes running at once and a
+    per-tool semaphore keeps one tool (e.g. musubi-tuner training) from
+    occupying every slot, so short operations can run next to long ones
+    without blocking the event loop. Queued runs are served shortest
+    predicted duration first, using the run history.
+    """
+    
+    def __init__(self, registry: ToolRegistry, config: Optional[Dict[str, Any]] = None):
+        self.registry = registry
+        self.config = config or load_server_config(registry.workspace_root)
+        
+        execution = self.config['execution']
+        self.interpreter: List[str] = list(execution['interpreter'])
+        self.timeout: float = execution['timeout']
+        self.per_tool_limit: int = execution['per_tool_limit']
+        self.tool_limits: Dict[str, int] = dict(execution.get('tool_limits', {}))
+        self.max_output_bytes: int = execution['max_output_bytes']
+        
+        self._global_slots = PrioritySemaphore(execution['max_concurrent'])
+        self._tool_slots: Dict[str, PrioritySemaphore] = {}
+        
+        scheduler_config = self.config['scheduler']
+        self.scheduler = CoreScheduler(
+            scheduler_config['cores'],
+            scheduler_config['min_shared_cores'],
+            scheduler_config['enabled']
+        )
+        self.cache = ResultCache(self.config['cache']['max_entries'])
+        
+        history_config = self.config['history']
+        self.history: Optional[RunHistory] = None
+        if history_config['path']:
+            self.history = RunHistory(
+                Path(registry.workspace_root) / history_config['path'],
+                history_config['max_runs_per_key']
+            )
+        
+        metrics_config = self.config['metrics']
+        export_path = metrics_config['export_path']
+        self.metrics = MetricsRecorder(
+            Path(registry.workspace_root) / export_path if export_path else None,
+            metrics_config['export_format'],
+            metrics_config['export_interval']
+        )
+        
+        spill_config = execution['spill']
+        self.output_store: Optional[OutputStore] = None
+        if spill_config['enabled']:
+            self.output_store = OutputStore(
+                Path(registry.workspace_root) / spill_config['dir'],
+                self.max_output_bytes,
+                spill_config['excerpt_bytes'],
+                spill_config['retention_hours']
+            )
+            self.output_store.prune()
+        
+        pool_config = execution['worker_pool']
+        self.worker_pool: Optional[WorkerPool] = None
+        self.pool_operations = set(pool_config['operations'])
+        if pool_config['enabled']:
+            self.worker_pool = WorkerPool(
+                pool_config['command'],
+                size=pool_config['size'],
+                max_runs=pool_config['max_runs'],
+                cwd=str(registry.workspace_root)
+            )
+    
+    def _tool_semaphore(self, tool_id: str) -> PrioritySemaphore:
+        """Get (or lazily create) the semaphore limiting a single tool"""
+        semaphore = self._tool_slots.get(tool_id)
+        if semaphore is None:
+            limit = self.tool_limits.get(tool_id, self.per_tool_limit)
+            semaphore = PrioritySemaphore(limit)
+            self._tool_slots[tool_id] = semaphore
+        return semaphore
+    
+    def prepare(
+        self,
+        operation_code: str,
+        arguments: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], List[str]]:
+        """Resolve an operation and build its command line"""
+        operation, script_path = resolve_operation(self.registry, operation_code)
+        return operation, build_command(self.interpreter, script_path, arguments)
+    
+    def estimate(self, operation_code: str, arguments: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Predicted duration from the run history, or None when unknown"""
+        if self.history is None:
+            return None
+        return self.history.estimate(operation_code, arguments)
+    
+    def record_history(
+        self,
+        operation_code: str,
+        arguments: Dict[str, Any],
+        duration: float,
+        exit_code: Optional[int],
+        output_bytes: int
+    ):
+        """Add a finished run to the run history"""
+        if self.history is not None:
+            self.history.record(operation_code, arguments, duration, exit_code, output_bytes)
+    
+    @contextlib.asynccontextmanager
+    async def slot(
+        self,
+        tool_id: str,
+        operation: Optional[Dict[str, Any]] = None,
+        estimated_seconds: Optional[float] = None
+    ) -> AsyncIterator[Optional[List[int]]]:
+        """Hold a tool slot, a core set and a global slot for the duration of a run
+        
+        Yields the cores the process should be pinned to, or None. The core
+        set comes from the operation's "cores"/"exclusive" settings. While
+        queued, a run ranks by arrival time plus estimated_seconds.
+        """
+        operation = operation or {}
+        rank = time.monotonic() + (estimated_seconds or 0.0)
+        # Take the tool slot first so a queued tool does not hold a global slot
+        async with self._tool_semaphore(tool_id).hold(rank):
+            async with self.scheduler.reserve(operation.get('cores'), operation.get('exclusive', False), rank) as cores:
+                async with self._global_slots.hold(rank):
+                    yield cores
+    
+    async def execute(
+        self,
+        operation_code: str,
+        arguments: Dict[str, Any],
+        on_output: Optional[OutputCallback] = None
+    ) -> str:
+        """Execute an operation without blocking the event loop
+        
+        on_output, if given, is awaited for every line the script prints
+        while it runs; the returned text holds the retained output.
+        """
+        return (await self.run_operation(operation_code, arguments, on_output)).text
+    
+    async def run_operation(
+        self,
+        operation_code: str,
+        arguments: Dict[str, Any],
+        on_output: Optional[OutputCallback] = None
+    ) -> RunResult:
+        """Like execute, but also report the exit code
+        
+        The exit code is None when the operation could not be started or
+        timed out; cached results report 0 since only successes are cached.
+        """
+        try:
+            operation, script_path = resolve_operation(self.registry, operation_code)
+        except OperationError as e:
+            return RunResult(str(e), None)
+        
+        cache_ttl = operation.get('cache_ttl')
+        cache_key = None
+        if cache_ttl:
+            cache_key = ResultCache.make_key(operation_code, arguments, script_path)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.metrics.record_cache_hit(operation_code)
+                return RunResult(cached, 0)
+        
+        estimate = self.estimate(operation_code, arguments)
+        queued = time.perf_counter()
+        async with self.slot(operation['tool_id'], operation, estimate and estimate['seconds']) as cores:
+            started = time.perf_counter()
+            try:
+                if self._uses_pool(operation_code):
+                    # Warm workers are shared, so they are never pinned
+                    result = await self._run_pooled(script_path, arguments, on_output)
+                else:
+                    cmd = build_command(self.interpreter, script_path, arguments)
+                    result = await self._run(cmd, on_output, cores)
+            except Exception as e:
+                self.metrics.record_error(operation_code)
+                return RunResult(f"Error executing operation: {str(e)}\n{traceback.format_exc()}", None)
+            
+            spawn = result.spawn_seconds
+            run_seconds = time.perf_counter() - started - (spawn or 0.0)
+            self.metrics.record_run(
+                operation_code,
+                queue_wait=started - queued,
+                spawn=spawn,
+                run=run_seconds,
+                output_bytes=result.output_bytes,
+                exit_code=result.exit_code
+            )
+            self.record_history(operation_code, arguments, run_seconds, result.exit_code, result.output_bytes)
+        
+        # Only successful runs are worth replaying
+        if cache_key is not None and result.exit_code == 0:
+            self.cache.put(cache_key, result.text, cache_ttl)
+        
+        return result
+    
+    def _new_buffers(self) -> Tuple[Any, Any]:
+        """stdout/stderr buffers - spilling to disk when enabled, else tail-only"""
+        if self.output_store is not None:
+            stdout, stderr = self.output_store.new_buffers()
+            return stdout, stderr
+        return BoundedOutput(self.max_output_bytes), BoundedOutput(self.max_output_bytes)
+    
+    def _uses_pool(self, operation_code: str) -> bool:
+        """Whether an operation should run on a warm worker"""
+        return self.worker_pool is not None and (
+            '*' in self.pool_operations or operation_code in self.pool_operations
+        )
+    
+    async def _run_pooled(
+        self,
+        script_path: Path,
+        arguments: Dict[str, Any],
+        on_output: Optional[OutputCallback]
+    ) -> RunResult:
+        """Run a script on a warm worker instead of spawning an interpreter"""
+        stdout, stderr = self._new_buffers()
+        
+        async def on_line(stream: str, line: str):
+            buffer = stderr if stream == 'stderr' else stdout
+            buffer.append(line, len(line.encode('utf-8')))
+            if on_output is not None:
+                try:
+                    await on_output(stream, line)
+                except Exception:
+                    pass
+        
+        params = {name: value for name, value in arguments.items() if name != 'operation_code'}
+        request = {
+            'script': str(script_path),
+            'cwd': str(self.registry.workspace_root),
+            'params': params,
+            'argv': format_arguments(arguments)
+        }
+        
+        try:
+            exit_code = await self.worker_pool.run(request, on_line, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            return RunResult(format_timeout(self.timeout), None, output_bytes=stdout.total_bytes + stderr.total_bytes)
+        except WorkerCrashed as e:
+            stderr.append(str(e), len(str(e)))
+            exit_code = -1
+        finally:
+            _close_buffers(stdout, stderr)
+        
+        return RunResult(
+            format_result(stdout.text(), stderr.text(), exit_code),
+            exit_code,
+            output_bytes=stdout.total_bytes + stderr.total_bytes
+        )
+    
+    async def close(self):
+        """Release long-lived resources such as warm workers and the run history"""
+        self.metrics.export()
+        if self.worker_pool is not None:
+            await self.worker_pool.close()
+        if self.history is not None:
+            history, self.history = self.history, None
+            history.close()
+    
+    async def _run(
+        self,
+        cmd: List[str],
+        on_output: Optional[OutputCallback],
+        cores: Optional[List[int]] = None
+    ) -> RunResult:
+        """Run a command, streaming its output line by line"""
+        spawn_started = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            *pinned_command(cmd, cores),
+            cwd=str(self.registry.workspace_root),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            **process_group_kwargs()
+        )
+        spawn_seconds = time.perf_counter() - spawn_started
+        
+        stdout, stderr = self._new_buffers()
+        
+        gathered = asyncio.gather(
+            _pump(process.stdout, 'stdout', stdout, on_output),
+            _pump(process.stderr, 'stderr', stderr, on_output),
+            process.wait()
+        )
+        try:
+            await asyncio.wait_for(gathered, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            await _kill(process)
+            return RunResult(format_timeout(self.timeout), None, spawn_seconds, stdout.total_bytes + stderr.total_bytes)
+        except asyncio.CancelledError:
+            # Client cancelled the request - do not leave the script running
+            await _kill(process)
+            if gathered.done() and not gathered.cancelled():
+                gathered.exception()  # mark the pumps' cancellation as retrieved
+            raise
+        finally:
+            _close_buffers(stdout, stderr)
+        
+        return RunResult(
+            format_result(stdout.text(), stderr.text(), process.returncode),
+            process.returncode,
+            spawn_seconds,
+            stdout.total_bytes + stderr.total_bytes
+        )
+
+
+def _close_buffers(*buffers: Any):
+    """Flush spill files of buffers that support it"""
+    for buffer in buffers:
+        close = getattr(buffer, 'close', None)
+        if close is not None:
+            close()
+
+
+async def _pump(
+    stream: asyncio.StreamReader,
+    name: str,
+    buffer: Any,
+    on_output: Optional[OutputCallback]
+):
+    """Copy lines from a process stream into a buffer and the callback"""
+    async for raw_line in iter_lines(stream):
+        line = raw_line.decode('utf-8', errors='replace')
+        buffer.append(line, len(raw_line))
+        
+        if on_output is not None:
+            try:
+                await on_output(name, line)
+            except Exception:
+                # A dropped client must not abort the running operation
+                pass
+
+
+async def _kill(process: asyncio.subprocess.Process):
+    """Kill a process with everything it started, and reap it"""
+    # The script may have exited while a child it started still holds the pipes
+    await kill_process_group(process.pid)
+    await process.wait()
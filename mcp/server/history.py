@@ -0,0 +1,106 @@
+"""Run history store used to predict operation durations"""
+
+import hashlib
+import json
+import sqlite3
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    operation TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    duration REAL NOT NULL,
+    exit_code INTEGER,
+    output_bytes INTEGER NOT NULL,
+    finished_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_key ON runs (operation, fingerprint, id);
+"""
+
+# Recent runs considered for an estimate
+ESTIMATE_WINDOW = 20
+
+
+def fingerprint(arguments: Dict[str, Any]) -> str:
+    """Stable short hash of an operation's arguments"""
+    normalized = json.dumps(
+        {name: value for name, value in arguments.items() if name != 'operation_code'},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+class RunHistory:
+    """SQLite log of past runs per operation code and argument fingerprint
+    
+    Estimates are the median duration of recent successful runs with the
+    same arguments, falling back to recent successful runs of the operation
+    with any arguments; a run that failed or timed out early says little
+    about how long a real one takes. Only the last max_runs runs per key are kept, so the file
+    stays small however long the server runs.
+    """
+    
+    def __init__(self, db_path: Path, max_runs: int = 50):
+        self.db_path = db_path
+        self.max_runs = max_runs
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection for the server's lifetime; isolation_level=None autocommits
+        self._db = sqlite3.connect(str(db_path), isolation_level=None, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+    
+    def record(
+        self,
+        operation_code: str,
+        arguments: Dict[str, Any],
+        duration: float,
+        exit_code: Optional[int],
+        output_bytes: int
+    ):
+        """Add one finished run and drop the key's oldest runs beyond max_runs"""
+        key = (operation_code, fingerprint(arguments))
+        try:
+            self._db.execute(
+                "INSERT INTO runs (operation, fingerprint, duration, exit_code, output_bytes, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, duration, exit_code, output_bytes, time.time())
+            )
+            self._db.execute(
+                "DELETE FROM runs WHERE operation = ? AND fingerprint = ? AND id NOT IN "
+                "(SELECT id FROM runs WHERE operation = ? AND fingerprint = ? ORDER BY id DESC LIMIT ?)",
+                (*key, *key, self.max_runs)
+            )
+        except sqlite3.Error:
+            # History is advisory - never fail an operation over it
+            pass
+    
+    def estimate(self, operation_code: str, arguments: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Predicted duration in seconds, or None for an operation never run"""
+        queries = [
+            ('arguments', "WHERE operation = ? AND fingerprint = ? AND exit_code = 0", (operation_code, fingerprint(arguments))),
+            ('operation', "WHERE operation = ? AND exit_code = 0", (operation_code,))
+        ]
+        try:
+            for basis, where, params in queries:
+                durations = [row[0] for row in self._db.execute(
+                    f"SELECT duration FROM runs {where} ORDER BY id DESC LIMIT ?",
+                    (*params, ESTIMATE_WINDOW)
+                )]
+                if durations:
+                    return {
+                        'seconds': round(statistics.median(durations), 3),
+                        'samples': len(durations),
+                        'basis': basis
+                    }
+        except sqlite3.Error:
+            pass
+        return None
+    
+    def close(self):
+        """Close the database connection"""
+        self._db.close()
@@ -0,0 +1,165 @@
+"""Streamable HTTP transport: many remote clients sharing one server process"""
+
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+# ASGI types, spelled out to avoid depending on starlette here
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+
+class ClientLimiter:
+    """Per-client cap on in-flight requests plus a requests-per-minute budget
+    
+    Clients are told apart by their remote address. The mcp-session-id
+    header is not used: this middleware runs before the SDK validates it,
+    so a client could send a fresh ID with every request to dodge its
+    limits. The per-minute budget is a token bucket, so short bursts are
+    fine as long as the average holds.
+    """
+    
+    def __init__(self, max_concurrent: int = 4, max_per_minute: int = 240):
+        self.max_concurrent = max_concurrent
+        self.max_per_minute = max_per_minute
+        self.rejected = 0
+        self._in_flight: Dict[str, int] = {}
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+    
+    @staticmethod
+    def client_key(scope: Scope) -> str:
+        """The remote host"""
+        client = scope.get('client') or ('unknown', 0)
+        return f"addr:{client[0]}"
+    
+    def try_acquire(self, key: str) -> Optional[str]:
+        """Take a request slot, or return why the request must be refused"""
+        if self._in_flight.get(key, 0) >= self.max_concurrent:
+            self.rejected += 1
+            return f"Too many concurrent requests (limit {self.max_concurrent} per client)"
+        
+        now = time.monotonic()
+        tokens = self._tokens(key, now)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            self.rejected += 1
+            return f"Rate limit exceeded ({self.max_per_minute} requests per minute per client)"
+        
+        self._buckets[key] = (tokens - 1, now)
+        self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        return None
+    
+    def release(self, key: str):
+        """Return a request slot"""
+        remaining = self._in_flight.get(key, 0) - 1
+        if remaining > 0:
+            self._in_flight[key] = remaining
+        else:
+            self._in_flight.pop(key, None)
+            # Forget idle clients whose bucket has refilled
+            if self._tokens(key, time.monotonic()) >= self.max_per_minute:
+                self._buckets.pop(key, None)
+    
+    def _tokens(self, key: str, now: float) -> float:
+        """Requests left in a client's bucket after refilling it up to now"""
+        tokens, updated = self._buckets.get(key, (float(self.max_per_minute), now))
+        return min(float(self.max_per_minute), tokens + (now - updated) * self.max_per_minute / 60)
+    
+    def stats(self) -> Dict[str, Any]:
+        """In-flight requests per client and the number of refusals"""
+        return {'in_flight': dict(self._in_flight), 'rejected': self.rejected}
+
+
+class ClientLimitMiddleware:
+    """ASGI middleware applying a ClientLimiter to JSON-RPC POSTs
+    
+    Only POSTs carry requests; the long-lived GET event stream and session
+    DELETEs pass straight through so they never use up a client's slots.
+    A POST's slot is held until its response (possibly an SSE stream that
+    ends with the tool result) is complete.
+    """
+    
+    def __init__(self, app: ASGIApp, limiter: ClientLimiter):
+        self.app = app
+        self.limiter = limiter
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http' or scope.get('method') != 'POST':
+            await self.app(scope, receive, send)
+            return
+        
+        key = self.limiter.client_key(scope)
+        refusal = self.limiter.try_acquire(key)
+        if refusal is not None:
+            await _send_refusal(send, refusal)
+            return
+        
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release(key)
+
+
+async def _send_refusal(send: Send, message: str):
+    """Answer 429 with a JSON-RPC error body"""
+    body = json.dumps({
+        'jsonrpc': '2.0',
+        'id': None,
+        'error': {'code': -32000, 'message': message}
+    }).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': 429,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode('ascii')),
+            (b'retry-after', b'1')
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def build_http_app(server: Any, path: str) -> ASGIApp:
+    """ASGI app serving a low-level MCP Server over streamable HTTP at path
+    
+    Needs the MCP SDK's HTTP extras (starlette, uvicorn), which are imported
+    here so stdio-only installs do not need them.
+    """
+    import contextlib
+    
+    from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+    from starlette.applications import Starlette
+    from starlette.routing import Route
+    
+    manager = StreamableHTTPSessionManager(app=server)
+    
+    class Endpoint:
+        """Plain ASGI callable: starlette would wrap a bound method as a request handler"""
+        
+        async def __call__(self, scope: Scope, receive: Receive, send: Send):
+            await manager.handle_request(scope, receive, send)
+    
+    @contextlib.asynccontextmanager
+    async def lifespan(_app: Any):
+        async with manager.run():
+            yield
+    
+    # A Route matches path exactly; a Mount would redirect POST /mcp to /mcp/
+    return Starlette(routes=[Route(path, endpoint=Endpoint())], lifespan=lifespan)
+
+
+async def serve_http(app: ASGIApp, http_config: Dict[str, Any], limiter: ClientLimiter):
+    """Serve app with uvicorn, applying per-client limits and keep-alive"""
+    import uvicorn
+    
+    config = uvicorn.Config(
+        ClientLimitMiddleware(app, limiter),
+        host=http_config['host'],
+        port=http_config['port'],
+        timeout_keep_alive=http_config['keep_alive'],
+        log_level='warning'
+    )
+    await uvicorn.Server(config).serve()
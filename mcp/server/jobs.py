@@ -0,0 +1,376 @@
+"""Background job manager for long-running operations"""
+
+import asyncio
+import contextlib
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from .affinity import pinned_command
+from .executor import OperationError, OperationExecutor
+from .process import kill_process_group, pid_alive, process_group_kwargs, process_start_time
+
+
+# Terminal states - a job in any of these will not change again
+FINISHED_STATES = {'succeeded', 'failed', 'cancelled', 'timed_out', 'lost', 'finished'}
+
+
+JOB_TOOLS: List[Dict[str, Any]] = [
+    {
+        'name': 'jobs:submit',
+        'description': (
+            'Start an operation in the background and return a job ID immediately, with a duration '
+            'estimate from past runs. Queued jobs start shortest estimated job first.'
+        ),
+        'inputSchema': {
+            'type': 'object',
+            'properties': {
+                'operation_code': {'type': 'string', 'description': 'Operation to run (e.g. musubi-tuner:wan:train)'},
+                'arguments': {'type': 'object', 'description': 'Arguments for the operation'}
+            },
+            'required': ['operation_code']
+        }
+    },
+    {
+        'name': 'jobs:status',
+        'description': 'Get the status of a background job, or list all jobs when no job_id is given',
+        'inputSchema': {
+            'type': 'object',
+            'properties': {
+                'job_id': {'type': 'string', 'description': 'Job ID returned by jobs:submit'}
+            },
+            'required': []
+        }
+    },
+    {
+        'name': 'jobs:tail',
+        'description': 'Read job output from a byte offset, or the last max_bytes when no offset is given',
+        'inputSchema': {
+            'type': 'object',
+            'properties': {
+                'job_id': {'type': 'string', 'description': 'Job ID returned by jobs:submit'},
+                'offset': {'type': 'integer', 'description': 'Byte offset to read from (use next_offset from the previous call)'},
+                'max_bytes': {'type': 'integer', 'description': 'Maximum number of bytes to return', 'default': 65536}
+            },
+            'required': ['job_id']
+        }
+    },
+    {
+        'name': 'jobs:cancel',
+        'description': 'Cancel a background job, killing its whole process group',
+        'inputSchema': {
+            'type': 'object',
+            'properties': {
+                'job_id': {'type': 'string', 'description': 'Job ID returned by jobs:submit'}
+            },
+            'required': ['job_id']
+        }
+    }
+]
+
+
+class JobManager:
+    """Runs operations in the background and tracks them on disk
+    
+    Job processes write straight to a log file in their own process group
+    rather than through a pipe, and job records are persisted as JSON, so a
+    job keeps running and stays queryable across client reconnects and
+    server restarts.
+    """
+    
+    def __init__(self, executor: OperationExecutor, config: Optional[Dict[str, Any]] = None):
+        self.executor = executor
+        jobs_config = (config or executor.config)['jobs']
+        
+        self.state_dir = Path(executor.registry.workspace_root) / jobs_config['state_dir']
+        self.timeout: float = jobs_config['timeout']
+        self.kill_grace: float = jobs_config['kill_grace']
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Jobs whose process is being spawned; cancelling their task could leak the process
+        self._starting: Set[str] = set()
+        
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self._load_jobs()
+    
+    def _load_jobs(self):
+        """Restore job records left by a previous server process"""
+        for state_file in sorted(self.state_dir.glob('*.json')):
+            try:
+                with open(state_file, 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            
+            if job['status'] == 'queued':
+                # The queue lived in the old process's memory
+                self._finish(job, 'lost', error='Server restarted before the job started')
+            elif job['status'] == 'running':
+                job['detached'] = True
+            
+            self.jobs[job['id']] = job
+    
+    def _save(self, job: Dict[str, Any]):
+        """Atomically persist a job record"""
+        state_file = self.state_dir / f"{job['id']}.json"
+        tmp_file = state_file.with_suffix('.json.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(job, f, indent=2)
+        os.replace(tmp_file, state_file)
+    
+    def _finish(self, job: Dict[str, Any], status: str, exit_code: Optional[int] = None, error: Optional[str] = None):
+        """Move a job to a terminal state"""
+        job['status'] = status
+        job['exit_code'] = exit_code
+        job['finished_at'] = time.time()
+        if error:
+            job['error'] = error
+        self._save(job)
+    
+    def _log_path(self, job: Dict[str, Any]) -> Path:
+        """Path of the file a job's output is written to"""
+        return self.state_dir / job['log']
+    
+    def submit(self, operation_code: str, arguments: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Queue an operation and return its job record without waiting"""
+        arguments = arguments or {}
+        try:
+            operation, cmd = self.executor.prepare(operation_code, arguments)
+        except OperationError as e:
+            return {'error': str(e)}
+        
+        job_id = uuid.uuid4().hex[:12]
+        estimate = self.executor.estimate(operation_code, arguments)
+        job = {
+            'id': job_id,
+            'operation': operation_code,
+            'arguments': arguments,
+            'status': 'queued',
+            'submitted_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'exit_code': None,
+            'pid': None,
+            'process_start': None,
+            'estimate': estimate,
+            'log': f"{job_id}.log"
+        }
+        self.jobs[job_id] = job
+        self._save(job)
+        
+        task = asyncio.create_task(self._run(job, operation, cmd))
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+        self._tasks[job_id] = task
+        return self._public(job)
+    
+    async def _run(self, job: Dict[str, Any], operation: Dict[str, Any], cmd: List[str]):
+        """Wait for a slot, start the process and record how it ended
+        
+        Whatever goes wrong, the job ends in a terminal state rather than
+        being left 'queued' or 'running' with nothing behind it.
+        """
+        queued = time.perf_counter()
+        estimate = job.get('estimate')
+        process = None
+        try:
+            async with self.executor.slot(operation['tool_id'], operation, estimate and estimate['seconds']) as cores:
+                if job['status'] != 'queued':
+                    return  # cancelled while waiting for a slot
+                if cores:
+                    job['cores'] = cores
+                
+                started = time.perf_counter()
+                self._starting.add(job['id'])
+                try:
+                    with open(self._log_path(job), 'ab') as log_file:
+                        try:
+                            process = await asyncio.create_subprocess_exec(
+                                *pinned_command(cmd, cores),
+                                cwd=str(self.executor.registry.workspace_root),
+                                stdin=asyncio.subprocess.DEVNULL,
+                                stdout=log_file,
+                                stderr=asyncio.subprocess.STDOUT,
+                                **process_group_kwargs()
+                            )
+                        except Exception as e:
+                            self.executor.metrics.record_error(job['operation'])
+                            self._finish(job, 'failed', error=f"Failed to start: {e}")
+                            return
+                finally:
+                    self._starting.discard(job['id'])
+                spawn = time.perf_counter() - started
+                
+                if job['status'] == 'cancelled':
+                    # cancel() arrived while the process was starting
+                    await kill_process_group(process.pid, self.kill_grace)
+                    await process.wait()
+                    self._finish(job, 'cancelled', exit_code=process.returncode)
+                    return
+                
+                job['status'] = 'running'
+                job['pid'] = process.pid
+                # Identifies the process after a restart, when the PID alone may have been reused
+                job['process_start'] = process_start_time(process.pid)
+                job['started_at'] = time.time()
+                self._save(job)
+                
+                try:
+                    exit_code = await asyncio.wait_for(process.wait(), timeout=self.timeout)
+                except asyncio.TimeoutError:
+                    await kill_process_group(process.pid, self.kill_grace)
+                    await process.wait()
+                    self._record(job, queued, started, spawn, None)
+                    self._finish(job, 'timed_out', exit_code=process.returncode)
+                    return
+                
+                self._record(job, queued, started, spawn, exit_code)
+                if job['status'] == 'cancelled':
+                    self._finish(job, 'cancelled', exit_code=exit_code)
+                    return
+                self._finish(job, 'succeeded' if exit_code == 0 else 'failed', exit_code=exit_code)
+        except Exception as e:
+            self.executor.metrics.record_error(job['operation'])
+            if process is not None and process.returncode is None:
+                with contextlib.suppress(Exception):
+                    process.kill()
+            self._finish(
+                job,
+                'failed',
+                exit_code=process.returncode if process is not None else None,
+                error=f"Job failed: {type(e).__name__}: {e}"
+            )
+    
+    def _record(self, job: Dict[str, Any], queued: float, started: float, spawn: float, exit_code: Optional[int]):
+        """Add a finished job run to the executor's metrics and run history"""
+        log_path = self._log_path(job)
+        run_seconds = time.perf_counter() - started - spawn
+        output_bytes = log_path.stat().st_size if log_path.exists() else 0
+        self.executor.metrics.record_run(
+            job['operation'],
+            queue_wait=started - queued,
+            spawn=spawn,
+            run=run_seconds,
+            output_bytes=output_bytes,
+            exit_code=exit_code
+        )
+        if job['status'] != 'cancelled':
+            # A cancelled run's duration says nothing about the operation
+            self.executor.record_history(job['operation'], job['arguments'], run_seconds, exit_code, output_bytes)
+    
+    def _process_alive(self, job: Dict[str, Any]) -> bool:
+        """Whether a detached job's process is still running
+        
+        A PID reused by another process does not count; records without
+        a start time can only be checked by PID.
+        """
+        if job.get('process_start') is None:
+            return pid_alive(job['pid'])
+        return process_start_time(job['pid']) == job['process_start']
+    
+    def _refresh(self, job: Dict[str, Any]):
+        """Update a job started by a previous server process"""
+        if job.get('detached') and job['status'] == 'running' and not self._process_alive(job):
+            # Not our child, so the exit code is unknown
+            job['status'] = 'finished'
+            job['finished_at'] = time.time()
+            job.pop('detached')
+            self._save(job)
+    
+    def _public(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Job record as returned to clients"""
+        log_path = self._log_path(job)
+        info = {key: value for key, value in job.items() if key != 'log'}
+        info['output_bytes'] = log_path.stat().st_size if log_path.exists() else 0
+        return info
+    
+    def status(self, job_id: Optional[str] = None) -> Dict[str, Any]:
+        """Get one job's status, or a summary of all jobs"""
+        if job_id is None:
+            for job in self.jobs.values():
+                self._refresh(job)
+            return {'jobs': [self._public(job) for job in self.jobs.values()]}
+        
+        job = self.jobs.get(job_id)
+        if job is None:
+            return {'error': f"Job '{job_id}' not found"}
+        
+        self._refresh(job)
+        return self._public(job)
+    
+    def tail(self, job_id: str, offset: Optional[int] = None, max_bytes: int = 65536) -> Dict[str, Any]:
+        """Read a window of a job's output without loading the whole log"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return {'error': f"Job '{job_id}' not found"}
+        
+        self._refresh(job)
+        log_path = self._log_path(job)
+        size = log_path.stat().st_size if log_path.exists() else 0
+        
+        if offset is None:
+            offset = max(0, size - max_bytes)
+        offset = min(max(0, offset), size)
+        
+        data = b''
+        if size > offset:
+            with open(log_path, 'rb') as f:
+                f.seek(offset)
+                data = f.read(max_bytes)
+        
+        return {
+            'job_id': job_id,
+            'status': job['status'],
+            'offset': offset,
+            'next_offset': offset + len(data),
+            'size': size,
+            'eof': offset + len(data) >= size and job['status'] in FINISHED_STATES,
+            'data': data.decode('utf-8', errors='replace')
+        }
+    
+    async def cancel(self, job_id: str) -> Dict[str, Any]:
+        """Cancel a queued job or kill a running job's process group"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return {'error': f"Job '{job_id}' not found"}
+        
+        self._refresh(job)
+        if job['status'] == 'queued':
+            self._finish(job, 'cancelled')
+            task = self._tasks.get(job_id)
+            if task is not None:
+                if job_id not in self._starting:
+                    # Stop waiting for a slot; a starting job kills its own process
+                    task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+        elif job['status'] == 'running':
+            task = self._tasks.get(job_id)
+            if task is None and not (job.get('process_start') and self._process_alive(job)):
+                # Started by an earlier server and its PID cannot be tied to
+                # the job any more, so killing it could hit an unrelated process
+                self._finish(job, 'lost', error='Process could not be verified, so it was not killed')
+                return self._public(job)
+            
+            job['status'] = 'cancelled'
+            await kill_process_group(job['pid'], self.kill_grace)
+            if task is not None:
+                await task
+            else:
+                self._finish(job, 'cancelled')
+        
+        return self._public(job)
+    
+    async def call(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Dispatch one of the JOB_TOOLS by name"""
+        if name == 'jobs:submit':
+            return self.submit(arguments['operation_code'], arguments.get('arguments'))
+        if name == 'jobs:status':
+            return self.status(arguments.get('job_id'))
+        if name == 'jobs:tail':
+            return self.tail(arguments['job_id'], arguments.get('offset'), arguments.get('max_bytes', 65536))
+        if name == 'jobs:cancel':
+            return await self.cancel(arguments['job_id'])
+        return {'error': f"Unknown job tool '{name}'"}
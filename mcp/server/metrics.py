@@ -0,0 +1,255 @@
+"""Per-operation latency and output metrics for MCP server"""
+
+import json
+import os
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+METRICS_TOOLS: List[Dict[str, Any]] = [
+    {
+        'name': 'metrics:get',
+        'description': 'Show per-operation latency histograms and counters (queue wait, spawn, run time, output bytes, timeouts, exit codes)',
+        'inputSchema': {
+            'type': 'object',
+            'properties': {
+                'operation_code': {'type': 'string', 'description': 'Only this operation (default: all)'},
+                'format': {'type': 'string', 'enum': ['json', 'prometheus'], 'default': 'json'}
+            },
+            'required': []
+        }
+    }
+]
+
+
+# Upper bounds (seconds) of latency buckets, Prometheus style
+SECONDS_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 1800, 3600
+)
+
+# Upper bounds of output size buckets
+BYTES_BUCKETS: Tuple[float, ...] = tuple(float(1024 * 4 ** power) for power in range(9))
+
+
+class Histogram:
+    """Fixed-bucket histogram with a running sum, cheap enough for every call"""
+    
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # One count per bound plus the +Inf bucket, not cumulative
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        """Add one observation"""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+    
+    def summary(self) -> Dict[str, Any]:
+        """Count, sum, mean and bucket-resolution p50/p95"""
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95)
+        }
+    
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, cumulative count) pairs for Prometheus exposition"""
+        pairs = []
+        running = 0
+        for bound, count in zip(self.bounds, self.counts):
+            running += count
+            pairs.append((f"{bound:g}", running))
+        pairs.append(('+Inf', self.count))
+        return pairs
+
+
+class OperationStats:
+    """Histograms and counters for a single operation code"""
+    
+    def __init__(self):
+        self.queue_wait = Histogram(SECONDS_BUCKETS)
+        self.spawn = Histogram(SECONDS_BUCKETS)
+        self.run = Histogram(SECONDS_BUCKETS)
+        self.output_bytes = Histogram(BYTES_BUCKETS)
+        self.calls = 0
+        self.cache_hits = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.exit_codes: Dict[str, int] = {}
+    
+    def histograms(self) -> Dict[str, Histogram]:
+        """Histograms by exported metric name"""
+        return {
+            'queue_wait_seconds': self.queue_wait,
+            'spawn_seconds': self.spawn,
+            'run_seconds': self.run,
+            'output_bytes': self.output_bytes
+        }
+
+
+class MetricsRecorder:
+    """Collects per-operation metrics and exports them as JSON or Prometheus text
+    
+    Recording is a few list increments per call. When export_path is set the
+    metrics are also written there (atomically, at most every interval
+    seconds) so an external scraper can pick them up without talking MCP.
+    """
+    
+    def __init__(self, export_path: Optional[Path] = None, export_format: str = 'prometheus', interval: float = 15.0):
+        self.export_path = export_path
+        self.export_format = export_format
+        self.interval = interval
+        self.started_at = time.time()
+        self.operations: Dict[str, OperationStats] = {}
+        self._last_export = 0.0
+    
+    def _stats(self, operation_code: str) -> OperationStats:
+        """Get (or lazily create) the stats of one operation"""
+        stats = self.operations.get(operation_code)
+        if stats is None:
+            stats = self.operations[operation_code] = OperationStats()
+        return stats
+    
+    def record_cache_hit(self, operation_code: str):
+        """Count a call answered from the result cache"""
+        stats = self._stats(operation_code)
+        stats.calls += 1
+        stats.cache_hits += 1
+        self.maybe_export()
+    
+    def record_error(self, operation_code: str):
+        """Count a call that failed before or while starting its script"""
+        stats = self._stats(operation_code)
+        stats.calls += 1
+        stats.errors += 1
+        self.maybe_export()
+    
+    def record_run(
+        self,
+        operation_code: str,
+        queue_wait: float,
+        spawn: Optional[float],
+        run: float,
+        output_bytes: int,
+        exit_code: Optional[int]
+    ):
+        """Record one finished run; exit_code None means it timed out"""
+        stats = self._stats(operation_code)
+        stats.calls += 1
+        stats.queue_wait.observe(queue_wait)
+        if spawn is not None:
+            stats.spawn.observe(spawn)
+        stats.run.observe(run)
+        stats.output_bytes.observe(output_bytes)
+        if exit_code is None:
+            stats.timeouts += 1
+        else:
+            stats.exit_codes[str(exit_code)] = stats.exit_codes.get(str(exit_code), 0) + 1
+        self.maybe_export()
+    
+    def to_dict(self, operation_code: Optional[str] = None) -> Dict[str, Any]:
+        """Summaries per operation, suitable for JSON"""
+        operations = {}
+        for code, stats in sorted(self.operations.items()):
+            if operation_code is not None and code != operation_code:
+                continue
+            operations[code] = {
+                'calls': stats.calls,
+                'cache_hits': stats.cache_hits,
+                'timeouts': stats.timeouts,
+                'errors': stats.errors,
+                'exit_codes': dict(stats.exit_codes),
+                **{name: histogram.summary() for name, histogram in stats.histograms().items()}
+            }
+        return {'uptime_seconds': round(time.time() - self.started_at, 1), 'operations': operations}
+    
+    def to_prometheus(self, operation_code: Optional[str] = None) -> str:
+        """Prometheus text exposition format"""
+        selected = [
+            (code, stats) for code, stats in sorted(self.operations.items())
+            if operation_code is None or code == operation_code
+        ]
+        lines = []
+        
+        counters = [
+            ('calls', 'Operation calls, including cache hits and errors', lambda s: s.calls),
+            ('cache_hits', 'Calls answered from the result cache', lambda s: s.cache_hits),
+            ('timeouts', 'Runs killed for exceeding the timeout', lambda s: s.timeouts),
+            ('errors', 'Calls that failed to start', lambda s: s.errors)
+        ]
+        for name, help_text, value in counters:
+            metric = f"electric_sheep_operation_{name}_total"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for code, stats in selected:
+                lines.append(f'{metric}{{operation="{code}"}} {value(stats)}')
+        
+        metric = "electric_sheep_operation_exit_codes_total"
+        lines.append(f"# HELP {metric} Finished runs by exit code")
+        lines.append(f"# TYPE {metric} counter")
+        for code, stats in selected:
+            for exit_code, count in sorted(stats.exit_codes.items()):
+                lines.append(f'{metric}{{operation="{code}",exit_code="{exit_code}"}} {count}')
+        
+        for name in ('queue_wait_seconds', 'spawn_seconds', 'run_seconds', 'output_bytes'):
+            metric = f"electric_sheep_operation_{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            for code, stats in selected:
+                histogram = stats.histograms()[name]
+                for le, count in histogram.cumulative():
+                    lines.append(f'{metric}_bucket{{operation="{code}",le="{le}"}} {count}')
+                lines.append(f'{metric}_sum{{operation="{code}"}} {histogram.sum:g}')
+                lines.append(f'{metric}_count{{operation="{code}"}} {histogram.count}')
+        
+        return "\n".join(lines) + "\n"
+    
+    def maybe_export(self):
+        """Write the export file if the interval has passed since the last write"""
+        if self.export_path is not None and time.monotonic() - self._last_export >= self.interval:
+            self.export()
+    
+    def export(self):
+        """Atomically write the export file"""
+        if self.export_path is None:
+            return
+        if self.export_format == 'json':
+            text = json.dumps(self.to_dict(), indent=2)
+        else:
+            text = self.to_prometheus()
+        
+        tmp_path = self.export_path.with_name(self.export_path.name + '.tmp')
+        try:
+            self.export_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(text, encoding='utf-8')
+            os.replace(tmp_path, self.export_path)
+        except OSError:
+            # Metrics are best-effort - never fail an operation over them
+            pass
+        self._last_export = time.monotonic()
+    
+    def call(self, name: str, arguments: Dict[str, Any]) -> Any:
+        """Dispatch one of the METRICS_TOOLS by name"""
+        if name == 'metrics:get':
+            if arguments.get('format') == 'prometheus':
+                return self.to_prometheus(arguments.get('operation_code'))
+            return self.to_dict(arguments.get('operation_code'))
+        return {'error': f"Unknown metrics tool '{name}'"}
@@ -0,0 +1,463 @@
+"""Streaming output helpers for MCP server"""
+
+import asyncio
+import contextlib
+import itertools
+import json
+import re
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+
+# Split on \n, \r\n and bare \r so progress bars that redraw with \r stream too
+_LINE_BREAK = re.compile(rb'\r\n|\r|\n')
+
+# A byte offset is recorded every this many lines of a spill file
+LINE_INDEX_STRIDE = 1000
+
+# Expired spill files are looked for at most this often (seconds)
+PRUNE_INTERVAL = 600
+
+_HANDLE_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+OUTPUT_TOOLS: List[Dict[str, Any]] = [
+    {
+        'name': 'output:read',
+        'description': (
+            'Read part of a large operation output that was spilled to disk. '
+            'Give either a byte range (offset, length) or a line range (start_line, line_count).'
+        ),
+        'inputSchema': {
+            'type': 'object',
+            'properties': {
+                'handle': {'type': 'string', 'description': 'Output handle from the truncated result'},
+                'stream': {'type': 'string', 'description': 'stdout or stderr', 'default': 'stdout'},
+                'offset': {'type': 'integer', 'description': 'Byte offset to start reading from'},
+                'length': {'type': 'integer', 'description': 'Number of bytes to read', 'default': 65536},
+                'start_line': {'type': 'integer', 'description': 'First line to read (0-based)'},
+                'line_count': {'type': 'integer', 'description': 'Number of lines to read', 'default': 200}
+            },
+            'required': ['handle']
+        }
+    }
+]
+
+
+async def iter_lines(
+    stream: asyncio.StreamReader,
+    chunk_size: int = 65536,
+    max_line_bytes: int = 65536
+) -> AsyncIterator[bytes]:
+    """Yield lines from a stream as they arrive, without line terminators
+    
+    Lines longer than max_line_bytes are yielded in pieces so a script that
+    never prints a newline cannot grow the pending buffer without limit.
+    """
+    pending = b''
+    carried_cr = False
+    while True:
+        chunk = await stream.read(chunk_size)
+        if not chunk:
+            break
+        
+        # A chunk ending in \r may be the first half of \r\n split across reads
+        if carried_cr and chunk.startswith(b'\n'):
+            chunk = chunk[1:]
+        carried_cr = chunk.endswith(b'\r')
+        
+        pending += chunk
+        parts = _LINE_BREAK.split(pending)
+        pending = parts.pop()
+        
+        for line in parts:
+            yield line
+        
+        while len(pending) > max_line_bytes:
+            yield pending[:max_line_bytes]
+            pending = pending[max_line_bytes:]
+    
+    if pending:
+        yield pending
+
+
+class OutputNotifier:
+    """Forward streamed output lines to a client in batches
+    
+    Lines are queued without waiting on the client, and a background task
+    sends them every interval seconds as one log message per run of
+    same-stream lines, followed by a single progress notification. A chatty
+    script then costs a few notifications a second instead of two per line,
+    and a slow client never stalls the output pump: past max_pending queued
+    lines the oldest are dropped and the next batch says how many.
+    Use as an async context manager so the last lines are sent on exit.
+    """
+    
+    def __init__(
+        self,
+        send_log: Callable[[str, str], Awaitable[None]],
+        send_progress: Callable[[int], Awaitable[None]],
+        interval: float = 0.25,
+        max_lines: int = 500,
+        max_pending: int = 10000
+    ):
+        self.send_log = send_log
+        self.send_progress = send_progress
+        self.interval = interval
+        self.max_lines = max_lines
+        self.max_pending = max_pending
+        self.lines_seen = 0
+        self.dropped = 0
+        self._pending: Deque[Tuple[str, str]] = deque()
+        self._closed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+    
+    async def __call__(self, stream: str, line: str):
+        """OutputCallback: queue a line for the next batch"""
+        self.lines_seen += 1
+        if len(self._pending) >= self.max_pending:
+            self._pending.popleft()
+            self.dropped += 1
+        self._pending.append((stream, line))
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._flush_loop())
+    
+    async def __aenter__(self) -> 'OutputNotifier':
+        return self
+    
+    async def __aexit__(self, *exc_info: Any):
+        await self.aclose()
+    
+    async def aclose(self):
+        """Send whatever is still queued and stop the flush task"""
+        self._closed.set()
+        if self._task is not None:
+            await self._task
+        await self.flush()
+    
+    async def _flush_loop(self):
+        while not self._closed.is_set():
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._closed.wait(), self.interval)
+            await self.flush()
+    
+    async def flush(self):
+        """Send the queued lines, then the number of lines seen so far"""
+        if not self._pending:
+            return
+        batch = list(self._pending)
+        self._pending.clear()
+        dropped, self.dropped = self.dropped, 0
+        lines_seen = self.lines_seen
+        
+        try:
+            if dropped:
+                await self.send_log('warning', f"[... {dropped} lines not forwarded, client too slow ...]")
+            for stream, run in itertools.groupby(batch, key=lambda item: item[0]):
+                lines = [line for _, line in run]
+                for start in range(0, len(lines), self.max_lines):
+                    level = 'warning' if stream == 'stderr' else 'info'
+                    await self.send_log(level, '\n'.join(lines[start:start + self.max_lines]))
+            await self.send_progress(lines_seen)
+        except Exception:
+            # A dropped client must not abort the running operation
+            pass
+
+
+class BoundedOutput:
+    """Keeps the most recent lines of a stream within a byte budget"""
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.dropped_bytes = 0
+        self.line_count = 0
+        self._lines: Deque[str] = deque()
+        self._sizes: Deque[int] = deque()
+        self._size = 0
+    
+    def append(self, line: str, size: int):
+        """Add a line, evicting the oldest lines once over budget"""
+        size += 1  # account for the newline
+        self._lines.append(line)
+        self._sizes.append(size)
+        self._size += size
+        self.total_bytes += size
+        self.line_count += 1
+        
+        # Always keep the newest line, even if it alone exceeds the budget
+        while self._size > self.max_bytes and len(self._lines) > 1:
+            self._lines.popleft()
+            dropped = self._sizes.popleft()
+            self._size -= dropped
+            self.dropped_bytes += dropped
+    
+    def text(self) -> str:
+        """Return the retained output, noting how much was discarded"""
+        if not self._lines:
+            return ""
+        
+        body = "\n".join(self._lines) + "\n"
+        if self.dropped_bytes:
+            return f"[... {self.dropped_bytes} bytes of earlier output truncated ...]\n{body}"
+        return body
+
+
+class SpillingOutput:
+    """Holds a stream in memory up to max_bytes, then spills it to disk
+    
+    Once spilled, only head and tail excerpts stay in memory and the full
+    output lives in a file that output:read can page through by bytes or
+    lines. A sparse line index is written next to the file so line ranges
+    can be read without scanning from the start.
+    """
+    
+    def __init__(self, max_bytes: int, spill_path: Path, excerpt_bytes: int, handle: str, stream: str):
+        self.max_bytes = max_bytes
+        self.spill_path = spill_path
+        self.excerpt_bytes = excerpt_bytes
+        self.handle = handle
+        self.stream = stream
+        self.total_bytes = 0
+        self.line_count = 0
+        self._lines: List[str] = []
+        self._sizes: List[int] = []
+        self._size = 0
+        self._file = None
+        self._spilled = False
+        self._written_lines = 0
+        self._offset = 0
+        self._line_index: List[int] = []
+        self._head: List[str] = []
+        self._tail: Deque[str] = deque()
+        self._tail_sizes: Deque[int] = deque()
+        self._tail_size = 0
+    
+    @property
+    def spilled(self) -> bool:
+        """Whether the output has been moved to a spill file"""
+        return self._spilled
+    
+    def append(self, line: str, size: int):
+        """Add a line, spilling everything to disk once over budget"""
+        if self._file is not None:
+            self._write(line)
+            self._keep_tail(line, size + 1)
+            self.line_count += 1
+            self.total_bytes += size + 1
+            return
+        
+        self._lines.append(line)
+        self._sizes.append(size + 1)
+        self._size += size + 1
+        self.line_count += 1
+        self.total_bytes += size + 1
+        
+        if self._size > self.max_bytes:
+            self._start_spill()
+    
+    def _start_spill(self):
+        """Move the in-memory lines to the spill file"""
+        self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.spill_path, 'wb')
+        self._spilled = True
+        
+        # Excerpts are budgeted in encoded bytes, like everything else here
+        head_size = 0
+        for line, size in zip(self._lines, self._sizes):
+            self._write(line)
+            if head_size < self.excerpt_bytes:
+                self._head.append(line)
+                head_size += size
+        
+        for line, size in zip(reversed(self._lines), reversed(self._sizes)):
+            if self._tail_size >= self.excerpt_bytes:
+                break
+            self._tail.appendleft(line)
+            self._tail_sizes.appendleft(size)
+            self._tail_size += size
+        
+        self._lines = []
+        self._sizes = []
+        self._size = 0
+    
+    def _write(self, line: str):
+        """Append one line to the spill file, recording index checkpoints"""
+        if self._written_lines % LINE_INDEX_STRIDE == 0:
+            self._line_index.append(self._offset)
+        data = line.encode('utf-8', errors='replace') + b'\n'
+        self._file.write(data)
+        self._offset += len(data)
+        self._written_lines += 1
+    
+    def _keep_tail(self, line: str, size: int):
+        """Keep the last excerpt_bytes of output in memory"""
+        self._tail.append(line)
+        self._tail_sizes.append(size)
+        self._tail_size += size
+        while self._tail_size > self.excerpt_bytes and len(self._tail) > 1:
+            self._tail.popleft()
+            self._tail_size -= self._tail_sizes.popleft()
+    
+    def close(self):
+        """Flush the spill file and write its line index"""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        index_path = self.spill_path.with_suffix('.idx.json')
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'stride': LINE_INDEX_STRIDE,
+                'offsets': self._line_index,
+                'lines': self.line_count,
+                'bytes': self._offset
+            }, f)
+    
+    def text(self) -> str:
+        """Return the full output, or head and tail excerpts once spilled"""
+        if not self.spilled:
+            return "\n".join(self._lines) + "\n" if self._lines else ""
+        
+        head = "\n".join(self._head) + "\n"
+        tail = "\n".join(self._tail) + "\n"
+        return (
+            f"{head}"
+            f"[... {self.line_count} lines / {self.total_bytes} bytes in total; full output saved - "
+            f"read it with output:read handle={self.handle} stream={self.stream} ...]\n"
+            f"{tail}"
+        )
+
+
+class OutputStore:
+    """Creates spill buffers and serves paged reads from spill files"""
+    
+    def __init__(self, spill_dir: Path, max_bytes: int, excerpt_bytes: int, retention_hours: float):
+        self.spill_dir = spill_dir
+        self.max_bytes = max_bytes
+        self.excerpt_bytes = excerpt_bytes
+        self.retention_hours = retention_hours
+        self._last_prune: Optional[float] = None
+    
+    def new_buffers(self) -> List[SpillingOutput]:
+        """stdout and stderr buffers sharing one handle
+        
+        Expired spill files are pruned here every PRUNE_INTERVAL seconds,
+        so a long-running server does not keep them past retention_hours.
+        """
+        if self._last_prune is None or time.monotonic() - self._last_prune >= PRUNE_INTERVAL:
+            self.prune()
+        handle = uuid.uuid4().hex
+        return [
+            SpillingOutput(
+                self.max_bytes,
+                self._path(handle, stream),
+                self.excerpt_bytes,
+                handle,
+                stream
+            )
+            for stream in ('stdout', 'stderr')
+        ]
+    
+    def _path(self, handle: str, stream: str) -> Path:
+        """Spill file for one stream of one run"""
+        return self.spill_dir / f"{handle}.{stream}.log"
+    
+    def prune(self) -> int:
+        """Delete spill files older than the retention period"""
+        self._last_prune = time.monotonic()
+        if not self.spill_dir.exists():
+            return 0
+        cutoff = time.time() - self.retention_hours * 3600
+        removed = 0
+        for path in self.spill_dir.iterdir():
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                # Deleted meanwhile, or still open on Windows - try again next time
+                continue
+        return removed
+    
+    def read(
+        self,
+        handle: str,
+        stream: str = 'stdout',
+        offset: Optional[int] = None,
+        length: int = 65536,
+        start_line: Optional[int] = None,
+        line_count: int = 200
+    ) -> Dict[str, Any]:
+        """Read a byte range or line range of a spill file"""
+        if not _HANDLE_PATTERN.match(handle) or stream not in ('stdout', 'stderr'):
+            return {'error': 'Invalid handle or stream'}
+        
+        path = self._path(handle, stream)
+        if not path.exists():
+            return {'error': f"No spilled {stream} output for handle '{handle}'"}
+        
+        size = path.stat().st_size
+        with open(path, 'rb') as f:
+            if start_line is not None:
+                return self._read_lines(f, path, handle, stream, size, max(0, start_line), line_count)
+            
+            offset = min(max(0, offset or 0), size)
+            f.seek(offset)
+            data = f.read(max(0, length))
+        
+        return {
+            'handle': handle,
+            'stream': stream,
+            'offset': offset,
+            'next_offset': offset + len(data),
+            'size': size,
+            'data': data.decode('utf-8', errors='replace')
+        }
+    
+    def _read_lines(self, f, path: Path, handle: str, stream: str, size: int, start_line: int, line_count: int) -> Dict[str, Any]:
+        """Seek to the nearest indexed line, then scan forward"""
+        index_path = path.with_suffix('.idx.json')
+        line_no = 0
+        if index_path.exists():
+            with open(index_path, 'r', encoding='utf-8') as idx:
+                index = json.load(idx)
+            checkpoint = min(start_line // index['stride'], len(index['offsets']) - 1)
+            if checkpoint >= 0:
+                f.seek(index['offsets'][checkpoint])
+                line_no = checkpoint * index['stride']
+        
+        while line_no < start_line and f.readline():
+            line_no += 1
+        
+        lines = []
+        while len(lines) < line_count:
+            raw = f.readline()
+            if not raw:
+                break
+            lines.append(raw.rstrip(b'\n').decode('utf-8', errors='replace'))
+        
+        return {
+            'handle': handle,
+            'stream': stream,
+            'start_line': start_line,
+            'next_line': start_line + len(lines),
+            'eof': f.tell() >= size,
+            'lines': lines
+        }
+    
+    def call(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Dispatch one of the OUTPUT_TOOLS by name"""
+        if name == 'output:read':
+            return self.read(
+                arguments['handle'],
+                arguments.get('stream', 'stdout'),
+                arguments.get('offset'),
+                arguments.get('length', 65536),
+                arguments.get('start_line'),
+                arguments.get('line_count', 200)
+            )
+        return {'error': f"Unknown output tool '{name}'"}
@@ -0,0 +1,126 @@
+"""Cross-platform process group helpers for MCP server"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+from typing import Any, Dict, Optional
+
+
+IS_WINDOWS = sys.platform == 'win32'
+
+# OpenProcess access right sufficient for GetProcessTimes
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+
+
+def process_group_kwargs() -> Dict[str, Any]:
+    """Spawn arguments that put a child in its own process group
+    
+    The child then outlives the server (so background jobs survive a
+    restart) and can be killed together with everything it started.
+    """
+    if IS_WINDOWS:
+        return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {'start_new_session': True}
+
+
+def pid_alive(pid: int) -> bool:
+    """Check whether a process with the given PID is still running"""
+    if IS_WINDOWS:
+        # os.kill(pid, 0) would terminate the process on Windows
+        result = subprocess.run(
+            ['tasklist', '/FI', f'PID eq {pid}', '/NH'],
+            capture_output=True,
+            text=True
+        )
+        return str(pid) in result.stdout
+    
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def process_start_time(pid: int) -> Optional[str]:
+    """Opaque token for when the process with this PID started, or None if unknown
+    
+    A PID can be reused once its process has exited; the same PID with
+    the same start time is the same process.
+    """
+    if IS_WINDOWS:
+        return _windows_start_time(pid)
+    
+    try:
+        with open(f'/proc/{pid}/stat', 'r', encoding='ascii', errors='replace') as f:
+            stat = f.read()
+    except FileNotFoundError:
+        if os.path.isdir('/proc/self'):
+            return None  # procfs is mounted, so the process is gone
+    except OSError:
+        return None
+    else:
+        # Field 22, starttime in clock ticks since boot; the command name
+        # (field 2) may contain spaces, so count from its closing paren
+        return stat.rsplit(')', 1)[1].split()[19]
+    
+    result = subprocess.run(['ps', '-o', 'lstart=', '-p', str(pid)], capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def _windows_start_time(pid: int) -> Optional[str]:
+    """Creation time of a Windows process from GetProcessTimes"""
+    import ctypes
+    from ctypes import wintypes
+    
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    kernel32.OpenProcess.restype = wintypes.HANDLE
+    kernel32.OpenProcess.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
+    kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+    kernel32.GetProcessTimes.argtypes = [wintypes.HANDLE] + [ctypes.POINTER(wintypes.FILETIME)] * 4
+    
+    handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+    if not handle:
+        return None
+    try:
+        created, exited, kernel, user = (wintypes.FILETIME() for _ in range(4))
+        if not kernel32.GetProcessTimes(handle, created, exited, kernel, user):
+            return None
+        return str((created.dwHighDateTime << 32) | created.dwLowDateTime)
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+async def kill_process_group(pid: int, grace: float = 5.0):
+    """Terminate a process group, escalating to a hard kill after grace seconds"""
+    if IS_WINDOWS:
+        # taskkill /T walks the process tree, /F forces termination
+        process = await asyncio.create_subprocess_exec(
+            'taskkill', '/PID', str(pid), '/T', '/F',
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        await process.wait()
+        return
+    
+    try:
+        os.killpg(pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + grace
+    while loop.time() < deadline:
+        await asyncio.sleep(0.1)
+        try:
+            os.killpg(pid, 0)
+        except ProcessLookupError:
+            return
+    
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
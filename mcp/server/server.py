@@ -1,238 +1,242 @@
 """MCP Server for Electric Sheep Toolset - Main Entry Point"""
 
+import argparse
 import asyncio
+import contextlib
 import json
-import subprocess
 import sys
-from pathlib import Path
-from typing import Any, Dict, List
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 try:
-    from mcp.server.fastmcp import FastMCP
+    from mcp.server import NotificationOptions, Server
     from mcp.server.models import InitializationOptions
+    from mcp.server.stdio import stdio_server
+    from mcp.types import Tool, TextContent
 except ImportError:
-    try:
-        from mcp.server import Server
-        from mcp.server.stdio import stdio_server
-        from mcp.types import Tool, TextContent
-        FastMCP = None
-    except ImportError:
-        raise ImportError(
-            "MCP SDK not found. Install with: pip install mcp"
-        )
+    raise ImportError(
+        "MCP SDK not found. Install with: pip install mcp"
+    )
 
-from .tool_registry import ToolRegistry
+from .batch import BATCH_TOOLS, BatchRunner
+from .cache import CACHE_TOOLS
+from .executor import OperationExecutor
+from .http_transport import ClientLimiter, build_http_app, serve_http
+from .jobs import JOB_TOOLS, JobManager
+from .metrics import METRICS_TOOLS
+from .output import OUTPUT_TOOLS, OutputNotifier
+from .tool_registry import CATALOG_TOOLS, ToolRegistry
 
 
-def create_server(registry: ToolRegistry):
+class SessionRegistry:
+    """Tracks connected client sessions so they can be sent notifications"""
+    
+    def __init__(self):
+        self._sessions = weakref.WeakSet()
+    
+    def add(self, session: Any):
+        """Remember a session seen in a request"""
+        self._sessions.add(session)
+    
+    async def send_tool_list_changed(self):
+        """Tell every known client to re-fetch tools/list"""
+        for session in list(self._sessions):
+            try:
+                await session.send_tool_list_changed()
+            except Exception:
+                # Session closed - the WeakSet drops it once collected
+                self._sessions.discard(session)
+
+
+def create_server(
+    registry: ToolRegistry,
+    executor: Optional[OperationExecutor] = None,
+    jobs: Optional[JobManager] = None
+):
     """Create MCP server instance"""
     
-    if FastMCP is not None:
-        # Use FastMCP (simpler API)
-        mcp = FastMCP("electric-sheep")
-        
-        # Register operations as tools
-        operations = registry.get_operations()
-        
-        for op in operations:
-            op_code = op['code']
-            op_name = op.get('name', op_code)
-            op_desc = op.get('description', '')
-            
-            # Create dynamic tool handler with proper closure
-            def make_handler(op_code_inner: str, reg: ToolRegistry):
-                def handler(**kwargs: Any) -> str:
-                    """Execute operation"""
-                    return execute_operation_sync(reg, op_code_inner, kwargs)
-                handler.__name__ = op_code_inner.replace(':', '_').replace('-', '_')
-                handler.__doc__ = op_desc
-                return handler
-            
-            tool_handler = make_handler(op_code, registry)
-            mcp.tool(name=op_code, description=op_desc)(tool_handler)
-        
-        return mcp
+    if executor is None:
+        executor = OperationExecutor(registry)
+    if jobs is None:
+        jobs = JobManager(executor)
+    reload_config = executor.config['reload']
+    sessions = SessionRegistry()
+    job_tool_names = {spec['name'] for spec in JOB_TOOLS}
+    cache_tool_names = {spec['name'] for spec in CACHE_TOOLS}
+    catalog_tool_names = {spec['name'] for spec in CATALOG_TOOLS}
+    metrics_tool_names = {spec['name'] for spec in METRICS_TOOLS}
+    batch_tool_names = {spec['name'] for spec in BATCH_TOOLS}
+    batches = BatchRunner(executor)
+    output_tool_names = {spec['name'] for spec in OUTPUT_TOOLS} if executor.output_store else set()
     
-    else:
-        # Use standard MCP SDK
-        server = Server("electric-sheep")
-        
-        @server.list_tools()
-        async def list_tools() -> List[Tool]:
-            """List all available tools"""
-            operations = registry.get_operations()
-            tools = []
-            
-            for op in operations:
-                properties = {}
-                required = []
-                
-                for param in op.get('parameters', []):
-                    param_name = param['name']
-                    param_type = param.get('type', 'string')
-                    
-                    json_type = 'string'
-                    if 'int' in param_type:
-                        json_type = 'integer'
-                    elif 'float' in param_type or 'number' in param_type:
-                        json_type = 'number'
-                    elif 'boolean' in param_type or 'bool' in param_type:
-                        json_type = 'boolean'
-                    elif 'array' in param_type:
-                        json_type = 'array'
-                    
-                    properties[param_name] = {
-                        'type': json_type,
-                        'description': param.get('description', '')
-                    }
-                    
-                    if param.get('default') is not None:
-                        properties[param_name]['default'] = param.get('default')
-                    
-                    if param.get('required', False):
-                        required.append(param_name)
-                
-                tools.append(Tool(
-                    name=op['code'],
+    # Low-level server: operation tools are listed with their catalog
+    # schemas and called with the raw argument dict
+    server = Server(
+        "electric-sheep",
+        lifespan=_registry_lifespan(registry, reload_config, sessions.send_tool_list_changed)
+    )
+    
+    # Tool objects are built once per catalog, not per request
+    tool_cache: Dict[str, Any] = {'catalog': None, 'tools': []}
+    
+    def build_tool_list() -> List[Tool]:
+        catalog = registry.catalog
+        if tool_cache['catalog'] is not catalog:
+            tools = [
+                Tool(
+                    name=code,
                     description=op.get('description', op.get('name', '')),
-                    inputSchema={
-                        'type': 'object',
-                        'properties': properties,
-                        'required': required
-                    }
-                ))
-            
-            return tools
-        
-        @server.call_tool()
-        async def call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
-            """Execute a tool"""
-            result = execute_operation_sync(registry, name, arguments)
-            return [TextContent(type="text", text=result)]
-        
-        return server
+                    inputSchema=catalog.schemas[code]
+                )
+                for code, op in catalog.by_code.items()
+            ]
+            tools.extend(Tool(**spec) for spec in JOB_TOOLS + BATCH_TOOLS + CACHE_TOOLS + CATALOG_TOOLS + METRICS_TOOLS)
+            if output_tool_names:
+                tools.extend(Tool(**spec) for spec in OUTPUT_TOOLS)
+            tool_cache.update(catalog=catalog, tools=tools)
+        return tool_cache['tools']
+    
+    build_tool_list()
+    
+    @server.list_tools()
+    async def list_tools() -> List[Tool]:
+        """List all available tools"""
+        sessions.add(server.request_context.session)
+        return build_tool_list()
+    
+    @server.call_tool()
+    async def call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
+        """Execute a tool"""
+        sessions.add(server.request_context.session)
+        if name in job_tool_names:
+            result = await jobs.call(name, arguments or {})
+            return [TextContent(type="text", text=json.dumps(result, indent=2))]
+        if name in batch_tool_names:
+            result = await batches.call(name, arguments or {})
+            return [TextContent(type="text", text=json.dumps(result, indent=2))]
+        if name in cache_tool_names:
+            result = executor.cache.call(name, arguments or {})
+            return [TextContent(type="text", text=json.dumps(result, indent=2))]
+        if name in catalog_tool_names:
+            result = registry.call(name, arguments or {})
+            return [TextContent(type="text", text=json.dumps(result, indent=2))]
+        if name in metrics_tool_names:
+            result = executor.metrics.call(name, arguments or {})
+            text = result if isinstance(result, str) else json.dumps(result, indent=2)
+            return [TextContent(type="text", text=text)]
+        if name in output_tool_names:
+            result = executor.output_store.call(name, arguments or {})
+            return [TextContent(type="text", text=json.dumps(result, indent=2))]
+        
+        ctx = server.request_context
+        progress_token = ctx.meta.progressToken if ctx.meta else None
+        
+        async def send_log(level: str, line: str):
+            await ctx.session.send_log_message(level=level, data=line, logger=name)
+        
+        async def send_progress(progress: int):
+            if progress_token is not None:
+                await ctx.session.send_progress_notification(progress_token, progress)
+        
+        async with OutputNotifier(send_log, send_progress) as notifier:
+            result = await executor.execute(name, arguments or {}, on_output=notifier)
+        return [TextContent(type="text", text=result)]
+    
+    return server
 
 
-def execute_operation_sync(
+def _registry_lifespan(
     registry: ToolRegistry,
-    operation_code: str,
-    arguments: Dict[str, Any]
-) -> str:
-    """Execute an operation synchronously"""
-    try:
-        # Find the operation
-        operations = registry.get_operations()
-        operation = next((op for op in operations if op['code'] == operation_code), None)
-        
-        if not operation:
-            return json.dumps({
-                "error": f"Operation '{operation_code}' not found",
-                "available_operations": [op['code'] for op in operations]
-            }, indent=2)
-        
-        # Get tool info
-        tool_id = operation['tool_id']
-        tool_info = registry.get_tool(tool_id)
-        
-        if not tool_info:
-            return f"Error: Tool '{tool_id}' not found"
-        
-        # Build script path
-        tool_path = tool_info['path']
-        script_path = tool_path / operation['entry_point']
-        
-        if not script_path.exists():
-            return f"Error: Script not found: {script_path}"
-        
-        # Prepare PowerShell command
-        ps_args = []
-        for param_name, param_value in arguments.items():
-            if param_name == 'operation_code':
-                continue
-            
-            # Format as PowerShell parameter
-            if isinstance(param_value, bool):
-                if param_value:
-                    ps_args.append(f"-{param_name}")
-            elif isinstance(param_value, list):
-                # Convert array to PowerShell array format
-                array_str = ','.join(str(v) for v in param_value)
-                ps_args.append(f"-{param_name} @({array_str})")
-            else:
-                # Escape quotes in string values
-                escaped_value = str(param_value).replace('"', '`"')
-                ps_args.append(f"-{param_name} \"{escaped_value}\"")
-        
-        # Execute PowerShell script
-        cmd = [
-            'powershell.exe',
-            '-ExecutionPolicy', 'Bypass',
-            '-File', str(script_path),
-            *ps_args
-        ]
-        
-        # Change to workspace directory
-        workspace_root = registry.workspace_root
-        cwd = str(workspace_root)
-        
-        # Run the command
-        result = subprocess.run(
-            cmd,
-            cwd=cwd,
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            errors='replace',
-            timeout=3600  # 1 hour timeout
-        )
-        
-        # Return result
-        output_parts = []
-        
-        if result.stdout:
-            output_parts.append(f"Output:\n{result.stdout}")
-        
-        if result.stderr:
-            output_parts.append(f"Errors:\n{result.stderr}")
-        
-        if result.returncode != 0:
-            output_parts.append(f"Exit code: {result.returncode}")
-        
-        if not output_parts:
-            output_parts.append("Operation completed successfully")
-        
-        return "\n".join(output_parts)
-        
-    except subprocess.TimeoutExpired:
-        return "Error: Operation timed out after 1 hour"
-    except Exception as e:
-        import traceback
-        return f"Error executing operation: {str(e)}\n{traceback.format_exc()}"
+    reload_config: Dict[str, Any],
+    on_change: Callable[[], Awaitable[None]]
+):
+    """Server lifespan that hot-reloads the registry while the server runs
+    
+    Over HTTP the lifespan is entered once per client session, so the
+    watcher is shared: the first session starts it, the last one stops it.
+    """
+    state: Dict[str, Any] = {'sessions': 0, 'watcher': None}
+    
+    @contextlib.asynccontextmanager
+    async def lifespan(_server: Any):
+        state['sessions'] += 1
+        if reload_config['enabled'] and state['watcher'] is None:
+            state['watcher'] = asyncio.create_task(registry.watch(reload_config['interval'], on_change))
+        try:
+            yield {}
+        finally:
+            state['sessions'] -= 1
+            if state['sessions'] == 0 and state['watcher'] is not None:
+                state['watcher'].cancel()
+                state['watcher'] = None
+    
+    return lifespan
 
 
-async def main():
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Command line: optional workspace root and transport selection"""
+    parser = argparse.ArgumentParser(description="Electric Sheep MCP server")
+    parser.add_argument('workspace_root', nargs='?', default=None, help="Workspace root (default: auto-detect)")
+    parser.add_argument('--transport', choices=['stdio', 'http'], default='stdio',
+                        help="stdio for a single local client, http for many clients sharing this process")
+    parser.add_argument('--host', help="HTTP bind address (default: http.host in server.json)")
+    parser.add_argument('--port', type=int, help="HTTP port (default: http.port in server.json)")
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[List[str]] = None):
     """Main entry point"""
-    # Get workspace root from command line or use default
-    workspace_root = sys.argv[1] if len(sys.argv) > 1 else None
-    
-    registry = ToolRegistry(workspace_root)
-    server = create_server(registry)
-    
-    if FastMCP is not None:
-        # FastMCP uses run() method
-        server.run()
-    else:
-        # Standard MCP uses stdio_server
-        async with stdio_server() as (read_stream, write_stream):
-            await server.run(
-                read_stream,
-                write_stream,
-                InitializationOptions(
-                    server_name="electric-sheep",
-                    server_version="1.0.0",
-                    capabilities=server.get_capabilities()
-                )
+    args = parse_args(argv)
+    started = time.perf_counter()
+    
+    registry = ToolRegistry(args.workspace_root)
+    executor = OperationExecutor(registry)
+    server = create_server(registry, executor)
+    
+    # stdout carries the protocol, so startup timing goes to stderr
+    stats = registry.load_stats
+    print(
+        f"electric-sheep ready in {(time.perf_counter() - started) * 1000:.1f} ms "
+        f"(registry {stats['load_ms']:.1f} ms, {stats['operations']} operations, "
+        f"{stats['files_parsed']} files parsed, {stats['snapshot_files']} from snapshot)",
+        file=sys.stderr
+    )
+    
+    try:
+        if args.transport == 'http':
+            # Every client shares this registry, executor (worker pool,
+            # scheduler, result cache) and job manager
+            http_config = dict(executor.config['http'])
+            if args.host:
+                http_config['host'] = args.host
+            if args.port:
+                http_config['port'] = args.port
+            limiter = ClientLimiter(
+                http_config['max_concurrent_per_client'],
+                http_config['max_requests_per_minute']
+            )
+            print(
+                f"electric-sheep listening on http://{http_config['host']}:{http_config['port']}{http_config['path']}",
+                file=sys.stderr
             )
+            await serve_http(build_http_app(server, http_config['path']), http_config, limiter)
+        else:
+            async with stdio_server() as (read_stream, write_stream):
+                await server.run(
+                    read_stream,
+                    write_stream,
+                    InitializationOptions(
+                        server_name="electric-sheep",
+                        server_version="1.0.0",
+                        capabilities=server.get_capabilities(
+                            notification_options=NotificationOptions(tools_changed=True),
+                            experimental_capabilities={}
+                        )
+                    )
+                )
+    finally:
+        await executor.close()
 
 
 if __name__ == "__main__":
@@ -1,15 +1,265 @@
 """Tool registry loader for MCP server"""
 
+import asyncio
 import json
 import os
+import re
+import sys
+import time
+from bisect import bisect_left
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+
+# (mtime_ns, size) of a file, or None if it does not exist
+FileStamp = Optional[Tuple[int, int]]
+
+# Bump when the snapshot layout changes so old snapshots are ignored
+SNAPSHOT_VERSION = 1
+
+
+def file_stamp(path: Path) -> FileStamp:
+    """Cheap change detector for a file"""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def json_schema_type(param_type: str) -> str:
+    """Map a manifest parameter type to a JSON Schema type"""
+    if 'int' in param_type:
+        return 'integer'
+    elif 'float' in param_type or 'number' in param_type:
+        return 'number'
+    elif 'boolean' in param_type or 'bool' in param_type:
+        return 'boolean'
+    elif 'array' in param_type:
+        return 'array'
+    return 'string'
+
+
+def build_input_schema(parameters: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build the JSON Schema describing an operation's arguments"""
+    properties = {}
+    required = []
+    
+    for param in parameters:
+        param_name = param['name']
+        properties[param_name] = {
+            'type': json_schema_type(param.get('type', 'string')),
+            'description': param.get('description', '')
+        }
+        
+        if param.get('default') is not None:
+            properties[param_name]['default'] = param.get('default')
+        
+        if param.get('required', False):
+            required.append(param_name)
+    
+    return {
+        'type': 'object',
+        'properties': properties,
+        'required': required
+    }
+
+
+# Relative weight of a query term matching each field of an operation,
+# heaviest first (the index keeps the first field a word is found in)
+SEARCH_WEIGHTS = {'code': 4.0, 'tags': 3.0, 'name': 2.0, 'tool_id': 2.0, 'category': 1.0, 'description': 1.0}
+
+
+CATALOG_TOOLS: List[Dict[str, Any]] = [
+    {
+        'name': 'catalog:search',
+        'description': 'Find operations by keyword, category or tag, best matches first, without listing every tool',
+        'inputSchema': {
+            'type': 'object',
+            'properties': {
+                'query': {'type': 'string', 'description': 'Words to look for in codes, names, tags and descriptions'},
+                'category': {'type': 'string', 'description': 'Only operations in this category (e.g. system, ai)'},
+                'tag': {'type': 'string', 'description': 'Only operations with this tag'},
+                'limit': {'type': 'integer', 'description': 'Maximum number of results', 'default': 10}
+            },
+            'required': []
+        }
+    },
+    {
+        'name': 'catalog:categories',
+        'description': 'List operation categories and tags with the number of operations in each',
+        'inputSchema': {'type': 'object', 'properties': {}, 'required': []}
+    }
+]
+
+
+_WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case words and numbers of a string, for indexing and queries"""
+    return _WORD_PATTERN.findall(text.lower())
+
+
+def curated_operation(op: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert an .toolset/operations.json entry to the registry's operation format"""
+    parameters = op.get('parameters', {})
+    if isinstance(parameters, dict):
+        # operations.json keys parameters by name, manifests list them
+        parameters = [{'name': name, **info} for name, info in parameters.items()]
+    
+    operation = {key: value for key, value in op.items() if key not in ('tool', 'tool_path')}
+    operation['tool_id'] = op['tool']
+    operation['parameters'] = parameters
+    return operation
+
+
+def _index_codes(operations: Tuple[Dict[str, Any], ...], field: str) -> Mapping[str, Tuple[str, ...]]:
+    """Inverted index from each value of a field to the codes having it"""
+    index: Dict[str, List[str]] = {}
+    for op in operations:
+        values = op.get(field) or []
+        for value in [values] if isinstance(values, str) else values:
+            index.setdefault(value, []).append(op['code'])
+    return MappingProxyType({value: tuple(codes) for value, codes in index.items()})
+
+
+class OperationCatalog:
+    """Immutable index of operations built once from the loaded manifests
+    
+    Lookups by code are O(1) and input schemas are computed up front, so
+    serving tools/list or resolving a call does no per-request work.
+    Category, tag and word indexes make filtering and search proportional
+    to the number of matches rather than the catalog size. Replace the
+    whole catalog rather than mutating it.
+    """
+    
+    def __init__(self, operations: List[Dict[str, Any]], tools: Dict[str, Dict[str, Any]]):
+        by_code: Dict[str, Dict[str, Any]] = {}
+        for op in operations:
+            # First definition wins, matching the old linear scan
+            by_code.setdefault(op['code'], op)
+        
+        self.operations: Tuple[Dict[str, Any], ...] = tuple(operations)
+        self.codes: Tuple[str, ...] = tuple(by_code)
+        self.by_code: Mapping[str, Dict[str, Any]] = MappingProxyType(by_code)
+        # Operations of one tool share its parameter list, so build each schema once
+        schemas_by_parameters: Dict[int, Dict[str, Any]] = {}
+        schemas: Dict[str, Dict[str, Any]] = {}
+        for code, op in by_code.items():
+            parameters = op.get('parameters', [])
+            schema = schemas_by_parameters.get(id(parameters))
+            if schema is None:
+                schema = schemas_by_parameters[id(parameters)] = build_input_schema(parameters)
+            schemas[code] = schema
+        self.schemas: Mapping[str, Dict[str, Any]] = MappingProxyType(schemas)
+        self.script_paths: Mapping[str, Path] = MappingProxyType({
+            code: tools[op['tool_id']]['path'] / op['entry_point']
+            for code, op in by_code.items()
+            if op['tool_id'] in tools
+        })
+        
+        unique = tuple(by_code.values())
+        self.by_category = _index_codes(unique, 'category')
+        self.by_tag = _index_codes(unique, 'tags')
+        self.by_tool = _index_codes(unique, 'tool_id')
+        
+        # The word index is only needed for search, so it is built on first use
+        self._words: Optional[Mapping[str, Mapping[str, float]]] = None
+        self._vocabulary: Tuple[str, ...] = ()
+    
+    def __len__(self) -> int:
+        return len(self.operations)
+    
+    @property
+    def words(self) -> Mapping[str, Mapping[str, float]]:
+        """Inverted index from each word to the codes containing it and the field weight"""
+        if self._words is None:
+            words: Dict[str, Dict[str, float]] = {}
+            # A tool's description and tags repeat on each of its operations
+            tokens_by_text: Dict[str, FrozenSet[str]] = {}
+            for op in self.by_code.values():
+                best: Dict[str, float] = {}
+                for field, weight in SEARCH_WEIGHTS.items():
+                    value = op.get(field) or ''
+                    text = value if isinstance(value, str) else ' '.join(value)
+                    tokens = tokens_by_text.get(text)
+                    if tokens is None:
+                        tokens = tokens_by_text[text] = frozenset(tokenize(text))
+                    for word in tokens:
+                        best.setdefault(word, weight)
+                for word, weight in best.items():
+                    words.setdefault(word, {})[op['code']] = weight
+            self._vocabulary = tuple(sorted(words))
+            self._words = MappingProxyType(words)
+        return self._words
+    
+    def get(self, code: str) -> Optional[Dict[str, Any]]:
+        """Get an operation by code"""
+        return self.by_code.get(code)
+    
+    def filter(self, category: Optional[str] = None, tag: Optional[str] = None) -> List[str]:
+        """Codes in a category and/or with a tag, in catalog order"""
+        codes = self.codes
+        if category is not None:
+            codes = self.by_category.get(category, ())
+        if tag is not None:
+            tagged = set(self.by_tag.get(tag, ()))
+            codes = [code for code in codes if code in tagged]
+        return list(codes)
+    
+    def search(
+        self,
+        query: str = '',
+        category: Optional[str] = None,
+        tag: Optional[str] = None,
+        limit: int = 10
+    ) -> List[Tuple[str, float]]:
+        """Rank operations against a free-text query
+        
+        Each query word scores the heaviest field it matches exactly, or
+        half that when it only prefixes a word. Operations matching more
+        query words rank first, then by total score. An empty query returns
+        the filtered codes in catalog order.
+        """
+        allowed = None
+        if category is not None or tag is not None:
+            allowed = set(self.filter(category, tag))
+        
+        terms = tokenize(query)
+        if not terms:
+            codes = self.filter(category, tag)
+            return [(code, 0.0) for code in codes[:limit]]
+        
+        words = self.words
+        scores: Dict[str, List[float]] = {}
+        for term in terms:
+            matched: Dict[str, float] = dict(words.get(term, {}))
+            # Prefix matches, e.g. "affin" -> "affinity"
+            start = bisect_left(self._vocabulary, term)
+            for word in self._vocabulary[start:]:
+                if not word.startswith(term):
+                    break
+                if word == term:
+                    continue
+                for code, weight in words[word].items():
+                    matched[code] = max(matched.get(code, 0.0), weight / 2)
+            
+            for code, weight in matched.items():
+                if allowed is None or code in allowed:
+                    entry = scores.setdefault(code, [0, 0.0])
+                    entry[0] += 1
+                    entry[1] += weight
+        
+        ranked = sorted(scores.items(), key=lambda item: (-item[1][0], -item[1][1], item[0]))
+        return [(code, round(score, 2)) for code, (_, score) in ranked[:limit]]
 
 
 class ToolRegistry:
     """Loads and manages tool definitions from registry and manifests"""
     
-    def __init__(self, workspace_root: Optional[str] = None):
+    def __init__(self, workspace_root: Optional[str] = None, use_snapshot: bool = True):
         if workspace_root is None:
             # Try to find workspace root by looking for .toolset/registry.json
             # Start from current file and go up until we find it
@@ -27,29 +277,106 @@ class ToolRegistry:
         
         self.workspace_root = workspace_root
         self.registry_path = workspace_root / ".toolset" / "registry.json"
-        self.tools: Dict[str, Dict[str, Any]] = {}
-        self._load_registry()
+        self.operations_path = workspace_root / ".toolset" / "operations.json"
+        self.snapshot_path = workspace_root / ".toolset" / "cache" / "registry_snapshot.json"
+        self.use_snapshot = use_snapshot
+        self.manifests_parsed = 0
+        self._json_cache: Dict[Path, Tuple[FileStamp, Any]] = {}
+        self._watched: Dict[Path, FileStamp] = {}
+        
+        started = time.perf_counter()
+        snapshot_files = self._load_snapshot() if use_snapshot else 0
+        self.tools: Dict[str, Dict[str, Any]] = self._load_registry()
+        self.catalog = OperationCatalog(self._build_operations(self.tools), self.tools)
+        if use_snapshot and self.manifests_parsed:
+            self._save_snapshot()
+        
+        self.load_stats: Dict[str, Any] = {
+            'snapshot_files': snapshot_files,
+            'files_parsed': self.manifests_parsed,
+            'operations': len(self.catalog),
+            'load_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
     
-    def _load_registry(self):
+    def _read_json(self, path: Path) -> Any:
+        """Parse a JSON file, reusing the previous result if it is unchanged"""
+        stamp = file_stamp(path)
+        cached = self._json_cache.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self._json_cache[path] = (stamp, data)
+        self.manifests_parsed += 1
+        return data
+    
+    def _load_snapshot(self) -> int:
+        """Seed the parsed-file cache from the last snapshot
+        
+        One read replaces opening registry.json and every manifest. Entries
+        keep their stamps, so _read_json still re-parses any file that has
+        changed since the snapshot was written. Returns the number of files
+        seeded.
+        """
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        
+        if snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('workspace_root') != str(self.workspace_root):
+            return 0
+        
+        for path, entry in snapshot.get('files', {}).items():
+            stamp = tuple(entry['stamp']) if entry.get('stamp') else None
+            self._json_cache[Path(path)] = (stamp, entry['data'])
+        return len(self._json_cache)
+    
+    def _save_snapshot(self):
+        """Persist the parsed-file cache for the next startup"""
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'workspace_root': str(self.workspace_root),
+            'files': {
+                str(path): {'stamp': stamp, 'data': data}
+                for path, (stamp, data) in self._json_cache.items()
+            }
+        }
+        tmp_path = self.snapshot_path.with_suffix('.json.tmp')
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, separators=(',', ':'))
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            # A read-only checkout still works, it just starts a little slower
+            print(f"Could not write registry snapshot: {e}", file=sys.stderr)
+    
+    def _load_registry(self) -> Dict[str, Dict[str, Any]]:
         """Load tool registry and manifests"""
         if not self.registry_path.exists():
             raise FileNotFoundError(f"Registry not found: {self.registry_path}")
         
-        with open(self.registry_path, 'r', encoding='utf-8') as f:
-            registry = json.load(f)
+        registry = self._read_json(self.registry_path)
+        tools: Dict[str, Dict[str, Any]] = {}
+        watched = {
+            self.registry_path: file_stamp(self.registry_path),
+            self.operations_path: file_stamp(self.operations_path)
+        }
         
         # Load each tool's manifest
         for tool_info in registry.get('tools', []):
             tool_id = tool_info['id']
             tool_path = self.workspace_root / tool_info['path']
             manifest_path = tool_path / "MANIFEST.json"
+            watched[manifest_path] = file_stamp(manifest_path)
             
             if manifest_path.exists():
-                with open(manifest_path, 'r', encoding='utf-8') as f:
-                    manifest = json.load(f)
+                manifest = self._read_json(manifest_path)
                 
                 # Merge registry info with manifest
-                self.tools[tool_id] = {
+                tools[tool_id] = {
                     **manifest,
                     'path': tool_path,
                     'category': tool_info.get('category', manifest.get('category')),
@@ -57,10 +384,52 @@ class ToolRegistry:
                 }
             else:
                 # Fallback to registry info only
-                self.tools[tool_id] = {
+                tools[tool_id] = {
                     **tool_info,
                     'path': tool_path
                 }
+        
+        # Forget manifests of tools that were removed from the registry
+        for path in set(self._json_cache) - set(watched):
+            del self._json_cache[path]
+        
+        self._watched = watched
+        return tools
+    
+    def changed(self) -> bool:
+        """Whether registry.json or any manifest changed since the last load"""
+        return any(file_stamp(path) != stamp for path, stamp in self._watched.items())
+    
+    def reload(self) -> bool:
+        """Re-read changed files and swap in a new catalog
+        
+        Only manifests whose mtime or size changed are re-parsed. The new
+        tools and catalog replace the old ones in one step, so callers never
+        see a half-built catalog. Returns True if anything changed.
+        """
+        if not self.changed():
+            return False
+        
+        parsed_before = self.manifests_parsed
+        try:
+            tools = self._load_registry()
+            catalog = OperationCatalog(self._build_operations(tools), tools)
+        except (OSError, ValueError, KeyError) as e:
+            # Typically a file caught mid-save - keep serving the old catalog
+            print(f"Registry reload failed, keeping previous catalog: {e}", file=sys.stderr)
+            return False
+        
+        self.tools, self.catalog = tools, catalog
+        if self.use_snapshot and self.manifests_parsed != parsed_before:
+            self._save_snapshot()
+        return True
+    
+    async def watch(self, interval: float, on_change: Callable[[], Awaitable[None]]):
+        """Poll for changes and call on_change after each successful reload"""
+        while True:
+            await asyncio.sleep(interval)
+            if self.reload():
+                await on_change()
     
     def get_tools(self) -> Dict[str, Dict[str, Any]]:
         """Get all registered tools"""
@@ -79,9 +448,70 @@ class ToolRegistry:
     
     def get_operations(self) -> List[Dict[str, Any]]:
         """Get all operations from all tools"""
+        return list(self.catalog.operations)
+    
+    def get_operation(self, code: str) -> Optional[Dict[str, Any]]:
+        """Get a specific operation by code"""
+        return self.catalog.get(code)
+    
+    def get_input_schema(self, code: str) -> Optional[Dict[str, Any]]:
+        """Get the precomputed JSON Schema for an operation's arguments"""
+        return self.catalog.schemas.get(code)
+    
+    def get_operations_file(self) -> Dict[str, Any]:
+        """Contents of .toolset/operations.json, or an empty dict if absent"""
+        if not self.operations_path.exists():
+            return {}
+        return self._read_json(self.operations_path)
+    
+    def get_categories(self) -> Dict[str, Dict[str, Any]]:
+        """Categories with their description and operation count"""
+        descriptions = self.get_operations_file().get('categories', {})
+        return {
+            category: {
+                'description': descriptions.get(category, {}).get('description', ''),
+                'operations': len(codes)
+            }
+            for category, codes in self.catalog.by_category.items()
+        }
+    
+    def search(self, query: str = '', category: Optional[str] = None, tag: Optional[str] = None, limit: int = 10) -> Dict[str, Any]:
+        """Ranked search results with just enough detail to pick an operation"""
+        results = []
+        for code, score in self.catalog.search(query, category, tag, limit):
+            op = self.catalog.by_code[code]
+            results.append({
+                'code': code,
+                'name': op.get('name', ''),
+                'description': op.get('description', ''),
+                'category': op.get('category'),
+                'tags': op.get('tags', []),
+                'score': score
+            })
+        return {'query': query, 'count': len(results), 'results': results}
+    
+    def call(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Dispatch one of the CATALOG_TOOLS by name"""
+        if name == 'catalog:search':
+            return self.search(
+                arguments.get('query', ''),
+                arguments.get('category'),
+                arguments.get('tag'),
+                arguments.get('limit', 10)
+            )
+        if name == 'catalog:categories':
+            tags = {tag: len(codes) for tag, codes in sorted(self.catalog.by_tag.items())}
+            return {'categories': self.get_categories(), 'tags': tags}
+        return {'error': f"Unknown catalog tool '{name}'"}
+    
+    def _build_operations(self, tools: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Derive operations from the loaded manifests and operations.json"""
         operations = []
+        curated: Dict[str, List[Dict[str, Any]]] = {}
+        for op in self.get_operations_file().get('operations', []):
+            curated.setdefault(op['tool'], []).append(curated_operation(op))
         
-        for tool_id, tool_info in self.tools.items():
+        for tool_id, tool_info in tools.items():
             # Generate operations from entry points
             entry_points = tool_info.get('entry_points', {})
             primary = entry_points.get('primary')
@@ -90,107 +520,56 @@ class ToolRegistry:
             # Create operation for primary entry point
             if primary:
                 # Generate operation code from script name (e.g., "launch-tool.ps1" -> "launch-tool")
-                script_stem = Path(primary).stem.replace('_', '-').replace('.', '-')
+                primary_stem = Path(primary).stem
+                script_stem = primary_stem.replace('_', '-').replace('.', '-')
                 # Remove common prefixes/suffixes for cleaner codes
                 script_stem = script_stem.replace('-script', '').replace('-main', '')
                 op_code = f"{tool_id}:{script_stem}" if script_stem else f"{tool_id}:primary"
                 
                 operations.append({
                     'code': op_code,
-                    'name': f"{tool_info.get('name', tool_id)} - {Path(primary).stem}",
+                    'name': f"{tool_info.get('name', tool_id)} - {primary_stem}",
                     'description': tool_info.get('description', ''),
                     'tool_id': tool_id,
                     'entry_point': primary,
-                    'parameters': tool_info.get('parameters', [])
+                    'parameters': tool_info.get('parameters', []),
+                    'category': tool_info.get('category'),
+                    'tags': tool_info.get('tags', [])
                 })
             
             # Create operations for alternatives
             for idx, alt in enumerate(alternatives):
-                script_stem = Path(alt).stem.replace('_', '-').replace('.', '-')
+                alt_stem = Path(alt).stem
+                script_stem = alt_stem.replace('_', '-').replace('.', '-')
                 script_stem = script_stem.replace('-script', '').replace('-main', '')
                 op_code = f"{tool_id}:{script_stem}" if script_stem else f"{tool_id}:alt{idx+1}"
                 
                 operations.append({
                     'code': op_code,
-                    'name': f"{tool_info.get('name', tool_id)} - {Path(alt).stem}",
+                    'name': f"{tool_info.get('name', tool_id)} - {alt_stem}",
                     'description': tool_info.get('description', ''),
                     'tool_id': tool_id,
                     'entry_point': alt,
-                    'parameters': tool_info.get('parameters', [])
+                    'parameters': tool_info.get('parameters', []),
+                    'category': tool_info.get('category'),
+                    'tags': tool_info.get('tags', [])
                 })
             
-            # Create common operations based on tool type
-            if tool_id == 'bambu-lab-affinity':
-                operations.extend([
-                    {
-                        'code': 'bambu-lab:launch',
-                        'name': 'Launch Bambu Lab',
-                        'description': 'Launch Bambu Lab with automatic CPU affinity fix',
-                        'tool_id': tool_id,
-                        'entry_point': 'scripts/bambulab-launcher.ps1',
-                        'parameters': tool_info.get('parameters', [])
-                    },
-                    {
-                        'code': 'bambu-lab:set-affinity',
-                        'name': 'Set Bambu Lab Affinity',
-                        'description': 'Set CPU affinity for running Bambu Lab process',
-                        'tool_id': tool_id,
-                        'entry_point': 'scripts/set-bambulab-affinity.ps1',
-                        'parameters': tool_info.get('parameters', [])
-                    },
-                    {
-                        'code': 'bambu-lab:find-installation',
-                        'name': 'Find Bambu Studio Installation',
-                        'description': 'Find Bambu Studio installation path',
-                        'tool_id': tool_id,
-                        'entry_point': 'scripts/find-bambustudio.ps1',
-                        'parameters': []
-                    }
-                ])
-            elif tool_id == 'cpu-affinity-check':
-                operations.append({
-                    'code': 'cpu-affinity:check',
-                    'name': 'Check CPU Affinity',
-                    'description': 'Check CPU affinity for processes',
-                    'tool_id': tool_id,
-                    'entry_point': 'scripts/check-affinity.ps1',
-                    'parameters': tool_info.get('parameters', [])
-                })
-            elif tool_id == 'musubi-tuner':
-                operations.extend([
-                    {
-                        'code': 'musubi-tuner:wan:cache-latents',
-                        'name': 'Cache Wan Latents',
-                        'description': 'Cache VAE latents for Wan training',
-                        'tool_id': tool_id,
-                        'entry_point': 'scripts/wan-cache-latents.ps1',
-                        'parameters': []
-                    },
-                    {
-                        'code': 'musubi-tuner:wan:cache-text-encoder',
-                        'name': 'Cache Wan Text Encoder',
-                        'description': 'Cache text encoder outputs for Wan training',
-                        'tool_id': tool_id,
-                        'entry_point': 'scripts/wan-cache-text-encoder.ps1',
-                        'parameters': []
-                    },
-                    {
-                        'code': 'musubi-tuner:wan:train',
-                        'name': 'Train Wan LoRA',
-                        'description': 'Train LoRA model using Wan architecture',
-                        'tool_id': tool_id,
-                        'entry_point': 'scripts/wan-train.ps1',
-                        'parameters': []
-                    },
-                    {
-                        'code': 'musubi-tuner:wan:generate',
-                        'name': 'Generate with Wan',
-                        'description': 'Generate video with Wan model',
-                        'tool_id': tool_id,
-                        'entry_point': 'scripts/wan-generate.ps1',
-                        'parameters': []
-                    }
-                ])
+            # Hand-written operations from .toolset/operations.json
+            operations.extend(curated.get(tool_id, []))
+        
+        # Per-operation settings from the manifest (e.g. cache_ttl, cores).
+        # An operation generated from an entry point shares the settings of
+        # the named operation running the same script, so the generated alias
+        # cannot sidestep a core reservation.
+        by_script: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for op in operations:
+            settings = tools[op['tool_id']].get('operation_settings', {})
+            if op['code'] in settings:
+                by_script.setdefault((op['tool_id'], op['entry_point']), settings[op['code']])
+        for op in operations:
+            settings = tools[op['tool_id']].get('operation_settings', {})
+            op.update(settings.get(op['code'], by_script.get((op['tool_id'], op['entry_point']), {})))
         
         return operations
 
@@ -0,0 +1,195 @@
+"""Pool of long-lived interpreter workers for MCP server"""
+
+import asyncio
+import itertools
+import json
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+# Directory holding the worker host scripts (worker.ps1, worker.py)
+WORKER_DIR = Path(__file__).resolve().parent / "workers"
+
+# Large enough for any single protocol line a script could produce
+_STREAM_LIMIT = 16 * 1024 * 1024
+
+
+class WorkerCrashed(Exception):
+    """Raised when a worker exits or breaks protocol mid-request"""
+
+
+class Worker:
+    """A single interpreter process serving requests one at a time"""
+    
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.runs = 0
+    
+    @property
+    def alive(self) -> bool:
+        """Whether the worker process is still running"""
+        return self.process.returncode is None
+    
+    async def stop(self):
+        """Close stdin so the worker exits, killing it if it lingers"""
+        if not self.alive:
+            return
+        try:
+            self.process.stdin.close()
+            await asyncio.wait_for(self.process.wait(), timeout=2)
+        except (asyncio.TimeoutError, ConnectionError):
+            self.kill()
+            await self.process.wait()
+    
+    def kill(self):
+        """Kill the worker process immediately"""
+        if self.alive:
+            try:
+                self.process.kill()
+            except ProcessLookupError:
+                pass
+
+
+class WorkerPool:
+    """Keeps interpreters warm so quick operations skip process startup
+    
+    Workers are started lazily up to size, serve one request at a time over
+    a JSON line protocol (see workers/worker.ps1) and are replaced after
+    max_runs requests, on timeout, or when they crash.
+    """
+    
+    def __init__(
+        self,
+        command: List[str],
+        size: int = 2,
+        max_runs: int = 50,
+        startup_timeout: float = 30,
+        cwd: Optional[str] = None
+    ):
+        self.command = [part.replace('{worker_dir}', str(WORKER_DIR)) for part in command]
+        self.size = size
+        self.max_runs = max_runs
+        self.startup_timeout = startup_timeout
+        self.cwd = cwd
+        self.started = 0
+        self.recycled = 0
+        self.crashed = 0
+        self._idle: List[Worker] = []
+        self._slots = asyncio.Semaphore(size)
+        self._request_ids = itertools.count(1)
+    
+    async def _spawn(self) -> Worker:
+        """Start a worker and wait for its ready message"""
+        process = await asyncio.create_subprocess_exec(
+            *self.command,
+            cwd=self.cwd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            limit=_STREAM_LIMIT
+        )
+        worker = Worker(process)
+        
+        try:
+            line = await asyncio.wait_for(process.stdout.readline(), timeout=self.startup_timeout)
+            if not json.loads(line or b'{}').get('ready'):
+                raise WorkerCrashed(f"Worker did not start: {line!r}")
+        except (asyncio.TimeoutError, json.JSONDecodeError, WorkerCrashed) as e:
+            worker.kill()
+            await process.wait()
+            raise WorkerCrashed(f"Worker failed to start: {e}") from e
+        
+        self.started += 1
+        return worker
+    
+    async def _discard(self, worker: Worker):
+        """Kill a worker that can no longer be reused"""
+        worker.kill()
+        await worker.process.wait()
+    
+    async def run(
+        self,
+        request: Dict[str, Any],
+        on_line: Callable[[str, str], Awaitable[None]],
+        timeout: Optional[float] = None
+    ) -> int:
+        """Run one script invocation on a warm worker and return its exit code
+        
+        request carries 'script', 'cwd' and the arguments ('params' for
+        splatting, 'argv' for the Python worker). on_line receives every
+        output line as (stream, line).
+        """
+        async with self._slots:
+            worker = self._idle.pop() if self._idle else await self._spawn()
+            request_id = next(self._request_ids)
+            
+            try:
+                exit_code = await asyncio.wait_for(
+                    self._exchange(worker, {**request, 'id': request_id}, on_line),
+                    timeout=timeout
+                )
+            except WorkerCrashed:
+                self.crashed += 1
+                await self._discard(worker)
+                raise
+            except BaseException:
+                # Timeout or cancellation - the script may still be running
+                await self._discard(worker)
+                raise
+            
+            worker.runs += 1
+            if worker.runs >= self.max_runs:
+                self.recycled += 1
+                await worker.stop()
+            else:
+                self._idle.append(worker)
+            
+            return exit_code
+    
+    async def _exchange(
+        self,
+        worker: Worker,
+        request: Dict[str, Any],
+        on_line: Callable[[str, str], Awaitable[None]]
+    ) -> int:
+        """Send a request and relay response lines until the exit message"""
+        try:
+            worker.process.stdin.write((json.dumps(request) + "\n").encode('utf-8'))
+            await worker.process.stdin.drain()
+        except ConnectionError as e:
+            raise WorkerCrashed(f"Worker stdin closed: {e}") from e
+        
+        while True:
+            raw = await worker.process.stdout.readline()
+            if not raw:
+                await worker.process.wait()
+                raise WorkerCrashed(f"Worker exited with code {worker.process.returncode}")
+            
+            try:
+                message = json.loads(raw)
+            except json.JSONDecodeError:
+                # Something wrote to the console directly - treat it as output
+                await on_line('stdout', raw.decode('utf-8', errors='replace').rstrip('\r\n'))
+                continue
+            
+            if message.get('id') != request['id']:
+                continue
+            if 'exit_code' in message:
+                return int(message['exit_code'])
+            await on_line(message.get('stream', 'stdout'), message.get('line', ''))
+    
+    async def close(self):
+        """Stop all idle workers"""
+        idle, self._idle = self._idle, []
+        for worker in idle:
+            await worker.stop()
+    
+    def stats(self) -> Dict[str, int]:
+        """Counters describing pool activity"""
+        return {
+            'size': self.size,
+            'idle': len(self._idle),
+            'started': self.started,
+            'recycled': self.recycled,
+            'crashed': self.crashed
+        }
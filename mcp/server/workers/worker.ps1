@@ -0,0 +1,56 @@
+# Long-lived PowerShell worker for the MCP server worker pool.
+#
+# Protocol: the server writes one JSON request per line to stdin:
+#   {"id": 1, "script": "C:\...\check-affinity.ps1", "params": {...}, "cwd": "..."}
+# The worker answers with JSON lines on stdout:
+#   {"id": 1, "stream": "stdout", "line": "..."}   (zero or more)
+#   {"id": 1, "exit_code": 0}                       (exactly one, last)
+# Parameters are splatted, so switches and arrays bind as named parameters.
+
+$ErrorActionPreference = 'Continue'
+[Console]::OutputEncoding = [System.Text.Encoding]::UTF8
+$protocol = [Console]::Out
+
+function Send-Message($Message) {
+    $protocol.WriteLine(($Message | ConvertTo-Json -Compress -Depth 5))
+    $protocol.Flush()
+}
+
+Send-Message @{ ready = $true; pid = $PID }
+
+while ($true) {
+    $line = [Console]::In.ReadLine()
+    if ($null -eq $line) { break }
+    if (-not $line.Trim()) { continue }
+
+    $request = $line | ConvertFrom-Json
+    $params = @{}
+    if ($request.params) {
+        foreach ($property in $request.params.PSObject.Properties) {
+            $params[$property.Name] = $property.Value
+        }
+    }
+
+    $exitCode = 0
+    $global:LASTEXITCODE = 0
+    Push-Location $request.cwd
+    try {
+        & $request.script @params *>&1 | ForEach-Object {
+            $stream = 'stdout'
+            if ($_ -is [System.Management.Automation.ErrorRecord] -or $_ -is [System.Management.Automation.WarningRecord]) {
+                $stream = 'stderr'
+            }
+            foreach ($outputLine in (($_ | Out-String).TrimEnd() -split "\r?\n")) {
+                Send-Message @{ id = $request.id; stream = $stream; line = $outputLine }
+            }
+        }
+        if ($LASTEXITCODE) { $exitCode = $LASTEXITCODE }
+    } catch {
+        Send-Message @{ id = $request.id; stream = 'stderr'; line = $_.ToString() }
+        $exitCode = 1
+    } finally {
+        Pop-Location
+    }
+
+    Send-Message @{ id = $request.id; exit_code = $exitCode }
+}
@@ -0,0 +1,99 @@
+"""Long-lived Python worker for the MCP server worker pool
+
+Speaks the same line protocol as worker.ps1 and runs Python entry point
+scripts in-process, which makes it a cheap stand-in for PowerShell in tests
+and benchmarks. Protocol messages go to the real stdout; the script's own
+stdout/stderr are captured and forwarded line by line.
+"""
+
+import io
+import json
+import os
+import runpy
+import sys
+import traceback
+
+
+PROTOCOL = sys.stdout
+
+
+def send(message):
+    """Write one protocol message"""
+    PROTOCOL.write(json.dumps(message) + "\n")
+    PROTOCOL.flush()
+
+
+class LineWriter(io.TextIOBase):
+    """Text stream that forwards each complete line as a protocol message"""
+    
+    def __init__(self, request_id, stream):
+        self.request_id = request_id
+        self.stream = stream
+        self._pending = ''
+    
+    def writable(self):
+        return True
+    
+    def write(self, text):
+        self._pending += text
+        while '\n' in self._pending:
+            line, self._pending = self._pending.split('\n', 1)
+            send({'id': self.request_id, 'stream': self.stream, 'line': line})
+        return len(text)
+    
+    def finish(self):
+        """Send any partial last line"""
+        if self._pending:
+            send({'id': self.request_id, 'stream': self.stream, 'line': self._pending})
+            self._pending = ''
+
+
+def run_request(request):
+    """Run one script and return its exit code"""
+    stdout = LineWriter(request['id'], 'stdout')
+    stderr = LineWriter(request['id'], 'stderr')
+    saved_argv = sys.argv
+    saved_cwd = os.getcwd()
+    exit_code = 0
+    
+    sys.stdout, sys.stderr = stdout, stderr
+    sys.argv = [request['script'], *request.get('argv', [])]
+    try:
+        os.chdir(request.get('cwd') or saved_cwd)
+        runpy.run_path(request['script'], run_name='__main__')
+    except SystemExit as e:
+        if isinstance(e.code, int):
+            exit_code = e.code
+        elif e.code is not None:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException:
+        traceback.print_exc()
+        exit_code = 1
+    finally:
+        stdout.finish()
+        stderr.finish()
+        sys.stdout, sys.stderr = PROTOCOL, sys.__stderr__
+        sys.argv = saved_argv
+        os.chdir(saved_cwd)
+    
+    return exit_code
+
+
+def main():
+    send({'ready': True, 'pid': os.getpid()})
+    
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            break
+        if not line.strip():
+            continue
+        
+        request = json.loads(line)
+        exit_code = run_request(request)
+        send({'id': request['id'], 'exit_code': exit_code})
+
+
+if __name__ == "__main__":
+    main()
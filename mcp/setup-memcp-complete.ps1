@@ -139,7 +139,7 @@ if (-not $mcpConfig.mcpServers) {
 if (-not $mcpConfig.mcpServers.'electric-sheep') {
     $mcpConfig.mcpServers | Add-Member -MemberType NoteProperty -Name "electric-sheep" -Value @{
         command = "python"
-        args = @("-m", "mcp.server.server")
+        args = @("mcp/start_server.py")
         cwd = (Get-Location).Path
     } -Force
     Write-Host "Added electric-sheep to MCP config" -ForegroundColor Green
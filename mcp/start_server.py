@@ -1,16 +1,33 @@
 """Startup script for MCP server"""
 
+import asyncio
 import sys
-import subprocess
 from pathlib import Path
 
-# Get project root
-project_root = Path(__file__).parent.parent.parent
+# Run in this interpreter rather than spawning a second one - the extra
+# process doubled interpreter startup and hid the server's exit code
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
 
-# Run the server module
-subprocess.run([
-    sys.executable,
-    "-m",
-    "mcp.server.server"
-], cwd=str(project_root))
+SERVER_DIR = Path(__file__).resolve().parent / "server"
 
+
+def use_repo_server_package():
+    """Make mcp.server.<module> find this repo's server modules
+    
+    An installed MCP SDK is a regular `mcp` package, so it shadows this
+    directory (a namespace package) wherever it sits on sys.path. The
+    server modules are added to the SDK's mcp.server package path instead;
+    without the SDK, mcp.server already is this directory and nothing changes.
+    """
+    import mcp.server
+    
+    if str(SERVER_DIR) not in {str(Path(path).resolve()) for path in mcp.server.__path__}:
+        mcp.server.__path__.append(str(SERVER_DIR))
+
+
+if __name__ == "__main__":
+    use_repo_server_package()
+    from mcp.server.server import main
+    
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+"""Tests for the CPU core scheduler"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import project_root
+from mcp.server.affinity import CAN_PIN, CoreScheduler, pinned_command
+from mcp.server.config import load_server_config
+from mcp.server.executor import OperationExecutor
+from mcp.server.tool_registry import ToolRegistry
+
+
+def test_reservations_are_disjoint_and_queue():
+    """Concurrent reservations get disjoint cores; a request that does not fit waits"""
+    scheduler = CoreScheduler(cores=[0, 1, 2, 3], min_shared_cores=1)
+    seen = {}
+    
+    async def hold(name, count, delay, exclusive=False):
+        async with scheduler.reserve(count, exclusive) as cores:
+            seen[name] = (time.monotonic(), cores)
+            await asyncio.sleep(delay)
+    
+    async def scenario():
+        started = time.monotonic()
+        await asyncio.gather(hold('a', 2, 0.2), hold('b', 2, 0.2), hold('c', 1, 0.0))
+        return started
+    
+    started = asyncio.run(scenario())
+    assert set(seen['a'][1]).isdisjoint(seen['b'][1])
+    # c had to wait for a or b to finish
+    assert seen['c'][0] - started >= 0.15
+    assert scheduler.waited == 1
+    assert scheduler.stats()['reserved'] == []
+
+
+def test_exclusive_reservation_shrinks_shared_cores():
+    """Unhinted work is pinned away from exclusive cores, and one shared core always remains"""
+    scheduler = CoreScheduler(cores=[0, 1, 2, 3], min_shared_cores=1)
+    
+    async def scenario():
+        async with scheduler.reserve() as unpinned:
+            assert unpinned is None
+        # Asking for every core is clamped so a shared core is left
+        async with scheduler.reserve(8, exclusive=True) as exclusive:
+            assert exclusive == [0, 1, 2]
+            async with scheduler.reserve() as shared:
+                assert shared == [3]
+    
+    asyncio.run(scenario())
+
+
+def test_executor_queues_operations_without_free_cores(stub_workspace):
+    """Two exclusive single-core operations on a one-core budget run one after the other"""
+    manifest_path = stub_workspace / "tools" / "stub" / "stub-tool" / "MANIFEST.json"
+    manifest = json.loads(manifest_path.read_text())
+    manifest['operation_settings']['stub-tool:sleep'] = {'cores': 1, 'exclusive': True}
+    manifest_path.write_text(json.dumps(manifest))
+    
+    config = load_server_config(stub_workspace)
+    config['scheduler'].update(cores=[0], min_shared_cores=0)
+    executor = OperationExecutor(ToolRegistry(str(stub_workspace)), config)
+    
+    async def scenario():
+        started = time.monotonic()
+        await asyncio.gather(
+            executor.execute("stub-tool:sleep", {"Seconds": 0.5}),
+            executor.execute("stub-tool:sleep", {"Seconds": 0.5})
+        )
+        return time.monotonic() - started
+    
+    assert asyncio.run(scenario()) >= 1.0
+    assert executor.scheduler.waited == 1
+
+
+@pytest.mark.skipif(not CAN_PIN, reason="taskset not available")
+def test_pinned_command_pins_the_child_before_it_runs():
+    """The child and the processes it starts see only the reserved core"""
+    core = min(os.sched_getaffinity(0))
+    script = (
+        "import os, subprocess, sys\n"
+        "print(sorted(os.sched_getaffinity(0)))\n"
+        "subprocess.run([sys.executable, '-c', 'import os; print(sorted(os.sched_getaffinity(0)))'])\n"
+    )
+    
+    output = subprocess.run(pinned_command([sys.executable, '-c', script], [core]), capture_output=True, text=True, check=True).stdout
+    
+    assert output.split() == [f"[{core}]", f"[{core}]"]
+    assert pinned_command(['a', 'b'], None) == ['a', 'b']
+
+
+def test_shipped_manifests_keep_heavy_stages_apart():
+    """Dedup and latent caching from the real manifests overlap on disjoint cores"""
+    registry = ToolRegistry(str(project_root))
+    dedup = registry.get_operation('musubi-tuner:dataset:dedup')
+    caching = registry.get_operation('musubi-tuner:wan:cache-latents')
+    assert dedup['exclusive'] and caching['exclusive']
+    # The generated alias for the same script carries the same hint
+    assert registry.get_operation('musubi-tuner:wan-cache-latents')['cores'] == caching['cores']
+    for code in ('musubi-tuner:wan:train', 'musubi-tuner:wan:generate'):
+        assert registry.get_operation(code)['cores'] > 0
+    # Starting the caption daemon returns at once, so it reserves nothing
+    assert 'cores' not in registry.get_operation('musubi-tuner:caption:daemon')
+    
+    # Both stages may run at once under the shipped tool limit
+    config = load_server_config(project_root)
+    assert config['execution']['tool_limits']['musubi-tuner'] >= 2
+    
+    scheduler = CoreScheduler(cores=list(range(16)), min_shared_cores=1)
+    
+    async def scenario():
+        async with scheduler.reserve(dedup['cores'], dedup['exclusive']) as dedup_cores:
+            async with scheduler.reserve(caching['cores'], caching['exclusive']) as caching_cores:
+                async with scheduler.reserve() as shared:
+                    return dedup_cores, caching_cores, shared
+    
+    dedup_cores, caching_cores, shared = asyncio.run(scenario())
+    assert len(dedup_cores) == dedup['cores'] and len(caching_cores) == caching['cores']
+    assert set(dedup_cores).isdisjoint(caching_cores)
+    # Unhinted operations are pinned to what is left
+    assert shared == sorted(set(range(16)) - set(dedup_cores) - set(caching_cores))
@@ -0,0 +1,74 @@
+"""Tests for the batch (DAG) meta-tool"""
+
+import asyncio
+import time
+
+import pytest
+
+from mcp.server.batch import BatchError, BatchRunner, plan_steps
+from mcp.server.executor import OperationExecutor
+from mcp.server.tool_registry import ToolRegistry
+
+
+def test_plan_rejects_invalid_graphs():
+    """Duplicate ids, unknown dependencies and cycles are refused up front"""
+    with pytest.raises(BatchError, match="Duplicate"):
+        plan_steps([{'operation_code': 'a'}, {'operation_code': 'a'}])
+    with pytest.raises(BatchError, match="unknown"):
+        plan_steps([{'operation_code': 'a', 'depends_on': ['b']}])
+    with pytest.raises(BatchError, match="cycle"):
+        plan_steps([
+            {'id': 'x', 'operation_code': 'a', 'depends_on': ['y']},
+            {'id': 'y', 'operation_code': 'a', 'depends_on': ['x']},
+            {'id': 'z', 'operation_code': 'a'}
+        ])
+
+
+def test_independent_steps_run_in_parallel(stub_workspace):
+    """Two independent sleeps overlap, and their dependent runs after both"""
+    batches = BatchRunner(OperationExecutor(ToolRegistry(str(stub_workspace))))
+    
+    started = time.monotonic()
+    result = asyncio.run(batches.run([
+        {'id': 'first', 'operation_code': 'stub-tool:sleep', 'arguments': {'Seconds': 1}},
+        {'id': 'second', 'operation_code': 'stub-tool:sleep', 'arguments': {'Seconds': 1}},
+        {'id': 'after', 'operation_code': 'stub-tool:echo', 'depends_on': ['first', 'second']}
+    ]))
+    elapsed = time.monotonic() - started
+    
+    assert result['status'] == 'succeeded'
+    assert [step['status'] for step in result['steps']] == ['succeeded'] * 3
+    assert elapsed < 1.9
+
+
+def test_failure_skips_dependents_only(stub_workspace):
+    """A failed step skips what depends on it while other branches finish"""
+    batches = BatchRunner(OperationExecutor(ToolRegistry(str(stub_workspace))))
+    
+    result = asyncio.run(batches.run([
+        {'id': 'broken', 'operation_code': 'stub-tool:fail'},
+        {'id': 'needs-broken', 'operation_code': 'stub-tool:echo', 'depends_on': ['broken']},
+        {'id': 'transitive', 'operation_code': 'stub-tool:echo', 'depends_on': ['needs-broken']},
+        {'id': 'unrelated', 'operation_code': 'stub-tool:echo'}
+    ]))
+    steps = {step['id']: step for step in result['steps']}
+    
+    assert result['status'] == 'failed'
+    assert steps['broken']['exit_code'] == 3
+    assert steps['needs-broken']['status'] == 'skipped'
+    assert steps['transitive']['reason'] == "dependency 'needs-broken' did not succeed"
+    assert steps['unrelated']['status'] == 'succeeded'
+    assert result['counts'] == {'succeeded': 1, 'failed': 1, 'skipped': 2, 'cancelled': 0}
+
+
+def test_fail_fast_cancels_running_steps(stub_workspace):
+    """With fail_fast a failure cancels steps that are still running"""
+    batches = BatchRunner(OperationExecutor(ToolRegistry(str(stub_workspace))))
+    
+    result = asyncio.run(batches.run([
+        {'id': 'slow', 'operation_code': 'stub-tool:sleep', 'arguments': {'Seconds': 10}},
+        {'id': 'broken', 'operation_code': 'stub-tool:fail'}
+    ], fail_fast=True))
+    
+    assert [step['status'] for step in result['steps']] == ['cancelled', 'failed']
+    assert result['duration_seconds'] < 5
@@ -0,0 +1,42 @@
+"""Tests for the benchmark suite's workspace generator and baseline check"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "benchmarks"))
+
+from bench_suite import compare, make_synthetic_workspace, run_suite  # noqa: E402
+from mcp.server.tool_registry import ToolRegistry  # noqa: E402
+
+
+def test_synthetic_workspace_loads(tmp_path):
+    """Every synthetic tool contributes its scripts, plus one curated operation per ten tools"""
+    workspace = make_synthetic_workspace(tmp_path, tool_count=20, scripts_per_tool=3)
+    registry = ToolRegistry(str(workspace), use_snapshot=False)
+    
+    assert len(registry.catalog) == 20 * 3 + 2
+    assert registry.get_operation("synthetic-0010:run")['tags'] == ["curated"]
+    
+    results = run_suite(workspace, iterations=2, only=["registry_cold", "list_tools", "execute_sync"])
+    assert set(results) == {"registry_cold", "list_tools", "execute_sync"}
+    assert results["execute_sync"]['samples'] == 2
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    """Only slowdowns past both the relative tolerance and the noise floor fail"""
+    baselines = {'slow': {'median_ms': 10.0}, 'tiny': {'median_ms': 0.1}, 'fine': {'median_ms': 10.0}}
+    results = {
+        'slow': {'median_ms': 16.0},
+        'tiny': {'median_ms': 0.3},
+        'fine': {'median_ms': 14.0},
+        'fresh': {'median_ms': 1.0},
+        'stdio_round_trip': {'skipped': "no SDK"}
+    }
+    
+    assert compare(results, baselines, tolerance=0.5) == {
+        'slow': 'regressed',
+        'tiny': 'ok',
+        'fine': 'ok',
+        'fresh': 'new',
+        'stdio_round_trip': 'skipped'
+    }
@@ -0,0 +1,83 @@
+"""Tests for the operation result cache"""
+
+import asyncio
+import os
+import time
+
+from conftest import project_root
+from mcp.server.cache import ResultCache
+from mcp.server.executor import OperationExecutor
+from mcp.server.tool_registry import ToolRegistry
+
+
+def test_cacheable_operation_is_replayed(stub_workspace):
+    """Operations with a cache_ttl run once per argument set"""
+    executor = OperationExecutor(ToolRegistry(str(stub_workspace)))
+    
+    async def scenario():
+        first = await executor.execute("stub-tool:counter", {})
+        second = await executor.execute("stub-tool:counter", {})
+        other_args = await executor.execute("stub-tool:counter", {"Message": "x"})
+        return first, second, other_args
+    
+    first, second, other_args = asyncio.run(scenario())
+    assert first == second == "Output:\nrun 1\n"
+    assert other_args == "Output:\nrun 2\n"
+    assert executor.cache.stats()['hits'] == 1
+    assert executor.cache.stats()['misses'] == 2
+
+
+def test_script_change_and_invalidate_bust_cache(stub_workspace):
+    """Editing the entry point or invalidating forces a fresh run"""
+    registry = ToolRegistry(str(stub_workspace))
+    executor = OperationExecutor(registry)
+    script = registry.catalog.script_paths["stub-tool:counter"]
+    
+    async def scenario():
+        outputs = [await executor.execute("stub-tool:counter", {})]
+        
+        stat = script.stat()
+        os.utime(script, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        outputs.append(await executor.execute("stub-tool:counter", {}))
+        
+        # The entry keyed on the old mtime lingers until evicted or invalidated
+        assert executor.cache.call('cache:invalidate', {'operation_code': 'stub-tool:counter'})['invalidated'] == 2
+        outputs.append(await executor.execute("stub-tool:counter", {}))
+        return outputs
+    
+    assert asyncio.run(scenario()) == ["Output:\nrun 1\n", "Output:\nrun 2\n", "Output:\nrun 3\n"]
+
+
+def test_uncached_operations_and_failures_not_stored(stub_workspace):
+    """Only operations that opt in, and only successful runs, are cached"""
+    executor = OperationExecutor(ToolRegistry(str(stub_workspace)))
+    asyncio.run(executor.execute("stub-tool:echo", {}))
+    asyncio.run(executor.execute("stub-tool:fail", {}))
+    assert executor.cache.stats()['entries'] == 0
+
+
+def test_shipped_live_state_checks_are_not_cached():
+    """An affinity check must see set-affinity's effect, so neither of its aliases caches"""
+    registry = ToolRegistry(str(project_root))
+    for code in ("cpu-affinity:check", "cpu-affinity-check:check-affinity"):
+        assert 'cache_ttl' not in registry.get_operation(code)
+    assert registry.get_operation("bambu-lab:find-installation")['cache_ttl'] > 0
+
+
+def test_lru_eviction_and_ttl(tmp_path):
+    """Entries expire after their TTL and the oldest are evicted first"""
+    script = tmp_path / "script.py"
+    script.write_text("")
+    cache = ResultCache(max_entries=2)
+    keys = [ResultCache.make_key("op", {"n": n}, script) for n in range(3)]
+    
+    cache.put(keys[0], "a", ttl=60)
+    cache.put(keys[1], "b", ttl=60)
+    assert cache.get(keys[0]) == "a"
+    cache.put(keys[2], "c", ttl=60)
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == "a"
+    
+    cache.put(keys[1], "b", ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get(keys[1]) is None
@@ -0,0 +1,183 @@
+"""Tests for the musubi-tuner caption pipeline's batching, manifest and worker helpers"""
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "tools" / "ai" / "musubi-tuner" / "scripts"))
+
+torch = pytest.importorskip("torch", reason="torch not installed")
+pytest.importorskip("transformers", reason="transformers not installed")
+Image = pytest.importorskip("PIL.Image", reason="Pillow not installed")
+
+import caption_pipeline  # noqa: E402
+from caption_pipeline import (  # noqa: E402
+    CAPTION_PROMPT, CaptionManifest, CaptionWriter, VISION_TOKEN_PIXELS,
+    make_batches, plan_captions, smart_resize, split_cores
+)
+from generate_captions_qwen import JOB_DEFAULTS  # noqa: E402
+
+
+def make_manifest(path, trigger_word="sks"):
+    return CaptionManifest(path, "model", CAPTION_PROMPT, trigger_word)
+
+
+def write_images(directory, contents):
+    """Files named after contents' keys; the manifest only looks at their bytes"""
+    paths = []
+    for name, data in contents.items():
+        path = directory / name
+        path.write_bytes(data)
+        paths.append(path)
+    return paths
+
+
+def test_smart_resize_keeps_sizes_on_the_patch_grid_and_within_the_budget():
+    """Sizes are multiples of 28 pixels, clamped to the pixel limits"""
+    assert smart_resize(1920, 1080) == (1932, 1092)
+    
+    width, height = smart_resize(8000, 6000, max_pixels=1024 * 1024)
+    assert width % VISION_TOKEN_PIXELS == 0 and height % VISION_TOKEN_PIXELS == 0
+    assert width * height <= 1024 * 1024
+    assert abs(width / height - 8000 / 6000) < 0.05
+    
+    width, height = smart_resize(20, 20, min_pixels=256 * 256)
+    assert width * height >= 256 * 256
+    assert smart_resize(1, 1000)[0] == VISION_TOKEN_PIXELS
+
+
+def test_make_batches_groups_images_by_token_count():
+    """Images are sorted by token count before chunking, and every image lands in one batch"""
+    paths = [Path(f"{i}.png") for i in range(5)]
+    tokens = {paths[0]: 900, paths[1]: 100, paths[2]: 905, paths[3]: 110, paths[4]: 500}
+    
+    batches = make_batches(paths, 2, tokens)
+    
+    assert batches == [[paths[1], paths[3]], [paths[4], paths[0]], [paths[2]]]
+    assert make_batches(paths, 10, {}) == [paths]
+
+
+def test_manifest_skips_captioned_images_and_captions_duplicates_once(tmp_path):
+    """Byte-identical images form one pending group; captions found in the manifest are reused"""
+    first, copy, other = write_images(tmp_path, {"a.png": b"one", "b.png": b"one", "c.png": b"two"})
+    manifest = make_manifest(tmp_path / "manifest.json")
+    writer = CaptionWriter()
+    
+    pending, digests, reused = plan_captions([first, copy, other], manifest, writer)
+    assert pending == {first: [first, copy], other: [other]}
+    assert reused == 0
+    
+    manifest.put(digests[first], "sks, a cat")
+    pending, _, reused = plan_captions([first, copy, other], manifest, writer)
+    writer.close()
+    assert pending == {other: [other]}
+    assert reused == 2
+    assert first.with_suffix('.txt').read_text(encoding='utf-8') == "sks, a cat"
+    assert copy.with_suffix('.txt').read_text(encoding='utf-8') == "sks, a cat"
+    
+    # force re-captions but still groups duplicates
+    pending, _, _ = plan_captions([first, copy, other], manifest, CaptionWriter(), force=True)
+    assert pending == {first: [first, copy], other: [other]}
+
+
+def test_manifest_resumes_from_disk_and_keeps_hand_edited_captions(tmp_path):
+    """A saved manifest answers the next run; changed settings or content re-caption"""
+    first, other = write_images(tmp_path, {"a.png": b"one", "c.png": b"two"})
+    manifest_path = tmp_path / "manifest.json"
+    manifest = make_manifest(manifest_path)
+    _, digests, _ = plan_captions([first, other], manifest, CaptionWriter())
+    manifest.put(digests[first], "sks, a cat")
+    manifest.save()
+    first.with_suffix('.txt').write_text("hand edited", encoding='utf-8')
+    
+    resumed = make_manifest(manifest_path)
+    writer = CaptionWriter()
+    pending, _, reused = plan_captions([first, other], resumed, writer)
+    writer.close()
+    assert pending == {other: [other]} and reused == 1
+    assert first.with_suffix('.txt').read_text(encoding='utf-8') == "hand edited"
+    
+    # Another trigger word is another caption setting
+    pending, _, _ = plan_captions([first, other], make_manifest(manifest_path, "xyz"), CaptionWriter())
+    assert set(pending) == {first, other}
+    
+    # New content under the same name is captioned again
+    first.write_bytes(b"three")
+    pending, _, _ = plan_captions([first, other], make_manifest(manifest_path), CaptionWriter())
+    assert set(pending) == {first, other}
+
+
+def test_split_cores_gives_each_worker_its_own_cores(monkeypatch):
+    """Cores are split into equal contiguous sets; extra workers share the last core"""
+    monkeypatch.setattr(caption_pipeline.os, 'sched_getaffinity', lambda pid: set(range(8)), raising=False)
+    
+    assert split_cores(1) == [list(range(8))]
+    assert split_cores(3) == [[0, 1], [2, 3], [4, 5]]
+    assert split_cores(4) == [[0, 1], [2, 3], [4, 5], [6, 7]]
+    
+    many = split_cores(10)
+    assert many[:8] == [[core] for core in range(8)]
+    assert many[8:] == [[7], [7]]
+
+
+def test_bare_trigger_word_caption_is_not_a_failure(tmp_path, monkeypatch):
+    """Only images that failed are left out of the manifest, whatever their caption"""
+    for name in ("plain.png", "bad.png"):
+        Image.new("RGB", (64, 64), "white" if name == "plain.png" else "black").save(tmp_path / name)
+    
+    def fake_generate(inputs, model, processor, device, trigger_word, max_new_tokens=256, timing=None):
+        if "bad.png" in inputs:
+            raise RuntimeError("cannot caption")
+        timing.update({'prompt_tokens': 1, 'prefill_seconds': 0.0, 'token_decode_seconds': 0.0, 'new_tokens': [1] * len(inputs)})
+        return [trigger_word] * len(inputs)
+    
+    monkeypatch.setattr(caption_pipeline, 'preprocess_images', lambda images, processor: [Path(image.filename).name for image in images])
+    monkeypatch.setattr(caption_pipeline, 'load_image', lambda path, *limits: Image.open(path))
+    monkeypatch.setattr(caption_pipeline, 'generate_from_inputs', fake_generate)
+    args = argparse.Namespace(**{**JOB_DEFAULTS, 'image_dir': str(tmp_path), 'batch_size': 2, 'prefetch': 0, 'trigger_word': "sks"})
+    
+    summary = caption_pipeline.run_caption_job(args, lambda: (None, None, torch.device("cpu")), lambda event: None)
+    
+    assert summary['captioned'] == 2
+    assert summary['failed'] == 1
+    manifest = CaptionManifest(tmp_path / caption_pipeline.MANIFEST_NAME, args.model_name, CAPTION_PROMPT, "sks")
+    pending, _, reused = plan_captions(sorted(tmp_path.glob("*.png")), manifest, CaptionWriter())
+    assert [path.name for path in pending] == ["bad.png"] and reused == 1
+
+
+class SingleThreadedProcessor:
+    """Processor stand-in that fails like a fast tokenizer when used by two threads at once"""
+    
+    def __init__(self):
+        self.busy = threading.Lock()
+        self.calls = 0
+    
+    def apply_chat_template(self, messages, **kwargs):
+        return "prompt"
+    
+    def __call__(self, text, images, **kwargs):
+        if not self.busy.acquire(blocking=False):
+            raise RuntimeError("Already borrowed")
+        try:
+            time.sleep(0.01)
+            self.calls += 1
+            return [image.size for image in images]
+        finally:
+            self.busy.release()
+
+
+def test_prefetch_threads_take_turns_on_the_shared_processor(monkeypatch):
+    """Images decode in parallel threads, but the processor is never entered concurrently"""
+    monkeypatch.setattr(caption_pipeline, 'load_image', lambda path, *limits: Image.new("RGB", (int(path.stem) + 1, 8)))
+    processor = SingleThreadedProcessor()
+    batches = [[Path(f"{i}.png"), Path(f"{i + 1}.png")] for i in range(0, 16, 2)]
+    
+    prepared = list(caption_pipeline.prefetch_batches(batches, processor, workers=4, depth=4))
+    
+    assert [batch.error for batch in prepared] == [None] * len(batches)
+    assert [batch.inputs for batch in prepared] == [[(i + 1, 8), (i + 2, 8)] for i in range(0, 16, 2)]
+    assert processor.calls == len(batches)
@@ -0,0 +1,197 @@
+"""Tests for the precompiled operation catalog"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import project_root, write_stub_workspace
+from mcp.server.tool_registry import ToolRegistry, build_input_schema
+
+
+def test_catalog_lookup_and_schema(stub_workspace):
+    """Operations are indexed by code with precomputed schemas"""
+    registry = ToolRegistry(str(stub_workspace))
+    
+    op = registry.get_operation("stub-tool:echo")
+    assert op['entry_point'] == "scripts/echo.py"
+    assert registry.get_operation("missing") is None
+    assert registry.catalog.script_paths["stub-tool:echo"] == stub_workspace / "tools/stub/stub-tool/scripts/echo.py"
+    
+    schema = registry.get_input_schema("stub-tool:echo")
+    assert schema['properties']['Message'] == {'type': 'string', 'description': 'Text to echo'}
+    assert schema is registry.get_input_schema("stub-tool:echo")
+
+
+def test_catalog_is_built_once(stub_workspace, monkeypatch):
+    """Reading operations does not re-derive them from the manifests"""
+    registry = ToolRegistry(str(stub_workspace))
+    
+    def fail():
+        raise AssertionError("operations rebuilt")
+    
+    monkeypatch.setattr(registry, '_build_operations', fail)
+    assert len(registry.get_operations()) == len(registry.catalog)
+    assert registry.get_operation("stub-tool:fail") is not None
+
+
+def test_catalog_index_is_read_only(stub_workspace):
+    """The code index cannot be mutated in place"""
+    registry = ToolRegistry(str(stub_workspace))
+    with pytest.raises(TypeError):
+        registry.catalog.by_code['new'] = {}
+
+
+def test_build_input_schema_types():
+    """Manifest parameter types map onto JSON Schema types"""
+    schema = build_input_schema([
+        {'name': 'Cores', 'type': 'array', 'required': True},
+        {'name': 'Wait', 'type': 'boolean', 'default': False},
+        {'name': 'Id', 'type': 'integer'}
+    ])
+    assert schema['properties']['Cores']['type'] == 'array'
+    assert schema['properties']['Wait'] == {'type': 'boolean', 'description': '', 'default': False}
+    assert schema['required'] == ['Cores']
+
+
+def test_operations_file_is_merged_and_indexed(tmp_path):
+    """operations.json entries join the catalog and are searchable by category and tag"""
+    workspace = write_stub_workspace(tmp_path, tool_ids=("tool-a", "tool-b"))
+    (workspace / ".toolset" / "operations.json").write_text(json.dumps({
+        "operations": [{
+            "code": "tool-a:greet",
+            "name": "Greet Someone",
+            "description": "Print a friendly greeting",
+            "category": "social",
+            "tool": "tool-a",
+            "entry_point": "scripts/echo.py",
+            "parameters": {"Message": {"type": "string", "required": True}},
+            "tags": ["greeting", "demo"]
+        }],
+        "categories": {"social": {"description": "Talking to people"}}
+    }))
+    registry = ToolRegistry(str(workspace))
+    
+    assert registry.get_input_schema("tool-a:greet")['required'] == ["Message"]
+    assert registry.catalog.by_category["social"] == ("tool-a:greet",)
+    assert registry.catalog.filter(category="dev", tag="demo") == []
+    assert registry.get_categories()["social"] == {'description': "Talking to people", 'operations': 1}
+    
+    results = registry.call('catalog:search', {'query': "greet"})['results']
+    assert results[0]['code'] == "tool-a:greet"
+    # "gree" only prefixes "greet"/"greeting", scoring below an exact match
+    assert registry.search("gree")['results'][0]['score'] < results[0]['score']
+    
+    assert [code for code, _ in registry.catalog.search("echo", category="dev", limit=5)] == ["tool-a:echo", "tool-b:echo"]
+    assert registry.catalog.search("nothing matches this") == []
+
+
+def _touch_manifest(workspace, tool_id, **changes):
+    """Rewrite a stub manifest with changes and a newer mtime"""
+    manifest_path = workspace / "tools" / "stub" / tool_id / "MANIFEST.json"
+    manifest = json.loads(manifest_path.read_text())
+    manifest.update(changes)
+    manifest_path.write_text(json.dumps(manifest))
+    stat = manifest_path.stat()
+    os.utime(manifest_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_shipped_curated_operations_keep_their_script_parameters():
+    """Hand-written operations still offer the parameters their scripts accept"""
+    registry = ToolRegistry(str(project_root))
+    
+    def names(code):
+        return {param['name'] for param in registry.get_operation(code)['parameters']}
+    
+    assert {'ProcessName', 'ProcessId'} <= names("cpu-affinity:check")
+    assert {'BambuLabPath', 'AffinityCores', 'WaitForProcess'} <= names("bambu-lab:launch")
+    assert {'BambuLabPath', 'AffinityCores', 'WaitForProcess'} <= names("bambu-lab:set-affinity")
+
+
+def test_reload_reparses_only_changed_manifests(tmp_path):
+    """Editing one manifest re-parses just that file and swaps the catalog"""
+    workspace = write_stub_workspace(tmp_path, tool_ids=("tool-a", "tool-b"))
+    registry = ToolRegistry(str(workspace))
+    old_catalog = registry.catalog
+    parsed = registry.manifests_parsed
+    
+    assert not registry.reload()
+    
+    _touch_manifest(workspace, "tool-a", description="Updated")
+    assert registry.reload()
+    assert registry.manifests_parsed == parsed + 1
+    assert registry.catalog is not old_catalog
+    assert registry.get_operation("tool-a:echo")['description'] == "Updated"
+    assert registry.get_operation("tool-b:echo") is not None
+
+
+def test_snapshot_skips_unchanged_files(tmp_path):
+    """A second startup parses nothing but the files edited since the snapshot"""
+    workspace = write_stub_workspace(tmp_path, tool_ids=("tool-a", "tool-b"))
+    first = ToolRegistry(str(workspace))
+    assert first.load_stats['snapshot_files'] == 0
+    assert first.snapshot_path.exists()
+    
+    second = ToolRegistry(str(workspace))
+    assert second.manifests_parsed == 0
+    assert second.load_stats['snapshot_files'] == first.manifests_parsed
+    assert second.catalog.codes == first.catalog.codes
+    
+    _touch_manifest(workspace, "tool-b", description="Updated")
+    third = ToolRegistry(str(workspace))
+    assert third.manifests_parsed == 1
+    assert third.get_operation("tool-b:echo")['description'] == "Updated"
+    
+    assert ToolRegistry(str(workspace), use_snapshot=False).manifests_parsed == 3
+
+
+def test_reload_keeps_catalog_on_broken_manifest(tmp_path):
+    """A manifest caught mid-save does not take tools away"""
+    workspace = write_stub_workspace(tmp_path)
+    registry = ToolRegistry(str(workspace))
+    catalog = registry.catalog
+    
+    manifest_path = workspace / "tools" / "stub" / "stub-tool" / "MANIFEST.json"
+    manifest_path.write_text('{"id": ')
+    assert not registry.reload()
+    assert registry.catalog is catalog
+
+
+def test_watch_notifies_after_reload(tmp_path):
+    """The polling watcher calls back once a change has been loaded"""
+    workspace = write_stub_workspace(tmp_path)
+    registry = ToolRegistry(str(workspace))
+    
+    async def scenario():
+        changed = asyncio.Event()
+        
+        async def on_change():
+            changed.set()
+        
+        watcher = asyncio.create_task(registry.watch(0.01, on_change))
+        _touch_manifest(workspace, "stub-tool", description="Watched")
+        await asyncio.wait_for(changed.wait(), timeout=5)
+        watcher.cancel()
+    
+    asyncio.run(scenario())
+    assert registry.get_operation("stub-tool:echo")['description'] == "Watched"
+
+
+def test_discover_operations_runs_beside_installed_sdk(tmp_path):
+    """discover_operations.py finds the catalog even when another `mcp` package shadows mcp/"""
+    (tmp_path / "mcp").mkdir()
+    (tmp_path / "mcp" / "__init__.py").write_text("")
+    env = dict(os.environ, PYTHONPATH=str(tmp_path))
+    
+    result = subprocess.run(
+        [sys.executable, str(project_root / ".toolset" / "discover_operations.py"), "--json"],
+        capture_output=True,
+        text=True,
+        env=env
+    )
+    assert result.returncode == 0, result.stderr
+    codes = {op['code'] for op in json.loads(result.stdout)['operations']}
+    assert "musubi-tuner:dataset:dedup" in codes
@@ -0,0 +1,55 @@
+"""Tests for the musubi-tuner perceptual-hash dedup stage"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "tools" / "ai" / "musubi-tuner" / "scripts"))
+
+np = pytest.importorskip("numpy", reason="numpy not installed")
+pytest.importorskip("PIL", reason="Pillow not installed")
+
+from dedup_images import cluster, hamming, near_pairs, phash, PHASH_SIZE  # noqa: E402
+
+
+def thumbnail(seed):
+    """32x32 grayscale thumbnail of random 4x4-pixel blocks, rich in low frequencies"""
+    blocks = np.random.default_rng(seed).uniform(0, 255, (PHASH_SIZE // 4, PHASH_SIZE // 4))
+    return np.kron(blocks, np.ones((4, 4))).astype(np.float32)
+
+
+def test_phash_survives_small_changes_and_separates_different_images():
+    """Brightness shifts and mild noise keep the hash close; another picture does not"""
+    base = thumbnail(0)
+    noise = np.random.default_rng(1).normal(0, 3, base.shape).astype(np.float32)
+    thumbnails = np.stack([base, base * 0.8 + 20, base + noise, thumbnail(2)])
+    
+    hashes = phash(thumbnails)
+    
+    assert hashes.dtype == np.uint64 and hashes.shape == (4,)
+    distances = hamming(hashes[0], hashes)
+    assert distances[1] == 0
+    assert distances[2] <= 6
+    assert distances[3] > 16
+
+
+def test_near_pairs_finds_every_pair_within_threshold_across_blocks():
+    """Pairs straddling comparison blocks are found once each, with their distances"""
+    hashes = np.array([0b0000, 0b0001, 0b1111_0000, 0b0011, 0b1111_0001], dtype=np.uint64)
+    
+    pairs = sorted(near_pairs(hashes, threshold=1, block=2))
+    
+    assert pairs == [(0, 1, 1), (1, 3, 1), (2, 4, 1)]
+    assert sorted(near_pairs(hashes, threshold=1)) == pairs
+    assert list(near_pairs(hashes, threshold=0)) == []
+
+
+def test_cluster_joins_chains_of_near_duplicates():
+    """Clusters are connected components, so a chain links its ends; singletons are dropped"""
+    hashes = np.array([0b0000, 0b0001, 0b1111_0000, 0b0011, 0b1111_0001, 0xFFFF_0000_0000], dtype=np.uint64)
+    
+    groups = sorted(sorted(members) for members in cluster(hashes, threshold=1))
+    
+    assert groups == [[0, 1, 3], [2, 4]]
+    assert cluster(hashes, threshold=0) == []
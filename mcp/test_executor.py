@@ -0,0 +1,120 @@
+"""Tests for the asynchronous operation executor"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from mcp.server.config import load_server_config
+from mcp.server.executor import OperationExecutor, execute_operation_sync
+from mcp.server.tool_registry import ToolRegistry
+
+
+def test_execute_returns_output(stub_workspace):
+    """Operations run as subprocesses and return formatted output"""
+    executor = OperationExecutor(ToolRegistry(str(stub_workspace)))
+    
+    result = asyncio.run(executor.execute("stub-tool:echo", {"Message": "hi"}))
+    assert result == 'Output:\n-Message "hi"\n'
+    
+    result = asyncio.run(executor.execute("stub-tool:fail", {}))
+    assert "Errors:\nbad things" in result
+    assert "Exit code: 3" in result
+
+
+def test_unknown_operation_lists_available(stub_workspace):
+    """Unknown codes return the list of available operations"""
+    executor = OperationExecutor(ToolRegistry(str(stub_workspace)))
+    
+    result = asyncio.run(executor.execute("nope", {}))
+    assert "Operation 'nope' not found" in result
+    assert "stub-tool:echo" in result
+
+
+def test_sync_path_matches_async(stub_workspace):
+    """The synchronous path formats results like the async engine"""
+    registry = ToolRegistry(str(stub_workspace))
+    executor = OperationExecutor(registry)
+    
+    sync_result = execute_operation_sync(registry, "stub-tool:echo", {"Message": "x"})
+    async_result = asyncio.run(executor.execute("stub-tool:echo", {"Message": "x"}))
+    assert sync_result == async_result
+
+
+def test_timeout_kills_process(stub_workspace):
+    """A process exceeding the timeout is killed and reported"""
+    registry = ToolRegistry(str(stub_workspace))
+    config = load_server_config(stub_workspace)
+    config['execution']['timeout'] = 0.5
+    executor = OperationExecutor(registry, config)
+    
+    result = asyncio.run(executor.execute("stub-tool:sleep", {"Seconds": 10}))
+    assert result == "Error: Operation timed out after 0.5 seconds"
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc")
+def test_timeout_kills_processes_the_script_started(stub_workspace):
+    """A timeout stops the script's whole process group, not just the interpreter"""
+    registry = ToolRegistry(str(stub_workspace))
+    config = load_server_config(stub_workspace)
+    config['execution']['timeout'] = 1.0
+    executor = OperationExecutor(registry, config)
+    
+    started = time.monotonic()
+    result = asyncio.run(executor.execute("stub-tool:spawn", {}))
+    assert result.startswith("Error: Operation timed out")
+    assert time.monotonic() - started < 15
+    
+    child = int((stub_workspace / "child.pid").read_text())
+    deadline = time.monotonic() + 5
+    while process_running(child) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert not process_running(child)
+
+
+def process_running(pid):
+    """True while pid exists and is not a zombie waiting to be reaped"""
+    try:
+        status = Path(f"/proc/{pid}/stat").read_text()
+    except FileNotFoundError:
+        return False
+    return status.rsplit(')', 1)[1].split()[0] != 'Z'
+
+
+def test_short_operations_run_alongside_long_one(stub_workspace):
+    """A slow operation does not block other operations or the event loop"""
+    executor = OperationExecutor(ToolRegistry(str(stub_workspace)))
+    
+    async def scenario():
+        slow = asyncio.create_task(executor.execute("stub-tool:sleep", {"Seconds": 2}))
+        await asyncio.sleep(0.1)
+        started = time.monotonic()
+        fast = await executor.execute("stub-tool:echo", {})
+        fast_elapsed = time.monotonic() - started
+        assert not slow.done()
+        await slow
+        return fast, fast_elapsed
+    
+    fast, fast_elapsed = asyncio.run(scenario())
+    assert fast == "Output:\nhello\n"
+    assert fast_elapsed < 1.5
+
+
+def test_per_tool_limit_serializes(stub_workspace):
+    """The per-tool limit queues calls beyond the allowed concurrency"""
+    registry = ToolRegistry(str(stub_workspace))
+    config = load_server_config(stub_workspace)
+    config['execution']['tool_limits'] = {"stub-tool": 1}
+    executor = OperationExecutor(registry, config)
+    
+    async def scenario():
+        started = time.monotonic()
+        await asyncio.gather(
+            executor.execute("stub-tool:sleep", {"Seconds": 0.5}),
+            executor.execute("stub-tool:sleep", {"Seconds": 0.5})
+        )
+        return time.monotonic() - started
+    
+    assert asyncio.run(scenario()) >= 1.0
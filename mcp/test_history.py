@@ -0,0 +1,124 @@
+"""Tests for the run history and shortest-job-first queueing"""
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from mcp.server.config import load_server_config
+from mcp.server.executor import OperationExecutor, PrioritySemaphore
+from mcp.server.history import RunHistory
+from mcp.server.jobs import JobManager
+from mcp.server.tool_registry import ToolRegistry
+
+from test_jobs import _wait_for
+
+
+def test_estimate_prefers_matching_arguments(tmp_path):
+    """Same-argument runs give the estimate; other arguments are the fallback"""
+    history = RunHistory(tmp_path / "history.sqlite3", max_runs=3)
+    assert history.estimate("tool:train", {"Epochs": 1}) is None
+    
+    for duration in (10, 12, 500, 14, 16):
+        history.record("tool:train", {"Epochs": 1}, duration, 0, 100)
+    history.record("tool:train", {"Epochs": 50}, 3600, 0, 100)
+    
+    # Only the last three runs per fingerprint are kept: 500, 14, 16
+    assert history.estimate("tool:train", {"Epochs": 1}) == {'seconds': 16, 'samples': 3, 'basis': 'arguments'}
+    assert history.estimate("tool:train", {"Epochs": 2})['basis'] == 'operation'
+    
+    reopened = RunHistory(tmp_path / "history.sqlite3")
+    assert reopened.estimate("tool:train", {"Epochs": 50})['seconds'] == 3600
+
+
+def test_estimate_ignores_failed_runs(tmp_path):
+    """A quick failure or a timeout does not make a long operation look short"""
+    history = RunHistory(tmp_path / "history.sqlite3")
+    history.record("tool:train", {}, 3600, 0, 100)
+    history.record("tool:train", {}, 2, 1, 100)
+    history.record("tool:train", {}, 5, None, 100)
+    
+    assert history.estimate("tool:train", {}) == {'seconds': 3600, 'samples': 1, 'basis': 'arguments'}
+    history.record("tool:lint", {}, 1, 2, 10)
+    assert history.estimate("tool:lint", {}) is None
+
+
+def test_priority_semaphore_waiter_cancelled_before_release():
+    """A waiter cancelled just before a release raises CancelledError, and the slot is not lost"""
+    async def scenario():
+        semaphore = PrioritySemaphore(1)
+        await semaphore.acquire()
+        waiter = asyncio.create_task(semaphore.acquire())
+        await asyncio.sleep(0)
+        # The release pops the cancelled waiter before the task gets to run
+        waiter.cancel()
+        semaphore.release()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return semaphore
+    
+    semaphore = asyncio.run(scenario())
+    assert semaphore._value == 1 and semaphore._waiters == []
+
+
+def test_priority_semaphore_serves_lowest_rank_first():
+    """Waiters get released slots in rank order; a cancelled waiter is skipped"""
+    async def scenario():
+        semaphore = PrioritySemaphore(1)
+        order = []
+        
+        async def worker(name, rank):
+            async with semaphore.hold(rank):
+                order.append(name)
+        
+        await semaphore.acquire()
+        tasks = {name: asyncio.create_task(worker(name, rank)) for name, rank in (('long', 30), ('short', 10), ('gone', 5), ('mid', 20))}
+        await asyncio.sleep(0.01)
+        tasks['gone'].cancel()
+        semaphore.release()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        return order
+    
+    assert asyncio.run(scenario()) == ['short', 'mid', 'long']
+
+
+def test_short_job_overtakes_long_queued_job(stub_workspace):
+    """Jobs report an estimate on submit, and a short job starts before a long one queued earlier"""
+    config = load_server_config(stub_workspace)
+    config['execution']['per_tool_limit'] = 1
+    executor = OperationExecutor(ToolRegistry(str(stub_workspace)), config)
+    executor.history.record("stub-tool:sleep", {"Seconds": 0.2}, 7200, 0, 10)
+    executor.history.record("stub-tool:echo", {"Message": "hi"}, 0.1, 0, 10)
+    
+    async def scenario():
+        manager = JobManager(executor)
+        blocker = manager.submit("stub-tool:chatty")
+        long_job = manager.submit("stub-tool:sleep", {"Seconds": 0.2})
+        short_job = manager.submit("stub-tool:echo", {"Message": "hi"})
+        assert long_job['estimate'] == {'seconds': 7200, 'samples': 1, 'basis': 'arguments'}
+        assert blocker['estimate'] is None
+        
+        results = [await _wait_for(manager, job['id']) for job in (blocker, long_job, short_job)]
+        return results
+    
+    blocker, long_job, short_job = asyncio.run(scenario())
+    assert all(job['status'] == 'succeeded' for job in (blocker, long_job, short_job))
+    assert short_job['started_at'] < long_job['started_at']
+    # The finished runs were added to the history
+    assert executor.estimate("stub-tool:chatty", {})['samples'] == 1
+
+
+def test_executor_close_releases_history(stub_workspace):
+    """Closing the executor closes the SQLite connection and stops recording"""
+    executor = OperationExecutor(ToolRegistry(str(stub_workspace)))
+    history = executor.history
+    assert history is not None
+    
+    asyncio.run(executor.close())
+    
+    assert executor.history is None
+    with pytest.raises(sqlite3.ProgrammingError):
+        history._db.execute("SELECT 1")
+    # Runs finishing after close are simply not recorded
+    executor.record_history("stub-tool:echo", {}, 0.1, 0, 10)
+    assert executor.estimate("stub-tool:echo", {}) is None
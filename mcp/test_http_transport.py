@@ -0,0 +1,151 @@
+"""Tests for the streamable HTTP transport and per-client limits"""
+
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from mcp.server.http_transport import ClientLimiter, ClientLimitMiddleware
+
+from conftest import project_root
+
+
+def http_scope(method='POST', session=None, host='127.0.0.1'):
+    """Minimal ASGI HTTP scope"""
+    headers = [(b'mcp-session-id', session.encode())] if session else []
+    return {'type': 'http', 'method': method, 'path': '/mcp', 'headers': headers, 'client': (host, 50000)}
+
+
+async def call(app, scope):
+    """Send one request through an ASGI app and return the response status"""
+    sent = []
+    
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+    
+    async def send(message):
+        sent.append(message)
+    
+    await app(scope, receive, send)
+    return sent[0]['status']
+
+
+def test_concurrency_limit_is_per_client():
+    """A client over its in-flight limit gets 429; other clients and GET streams are unaffected"""
+    release = asyncio.Event()
+    
+    async def slow_app(scope, receive, send):
+        await release.wait()
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b'{}'})
+    
+    limiter = ClientLimiter(max_concurrent=2, max_per_minute=100)
+    app = ClientLimitMiddleware(slow_app, limiter)
+    
+    async def scenario():
+        held = [asyncio.create_task(call(app, http_scope())) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        refused = await call(app, http_scope())
+        other = asyncio.create_task(call(app, http_scope(host='10.0.0.2')))
+        stream = asyncio.create_task(call(app, http_scope(method='GET')))
+        await asyncio.sleep(0.01)
+        assert limiter.stats()['in_flight'] == {'addr:127.0.0.1': 2, 'addr:10.0.0.2': 1}
+        release.set()
+        statuses = await asyncio.gather(*held, other, stream)
+        return refused, statuses, await call(app, http_scope())
+    
+    refused, statuses, after = asyncio.run(scenario())
+    assert refused == 429
+    assert statuses == [200, 200, 200, 200]
+    assert after == 200
+    assert limiter.stats() == {'in_flight': {}, 'rejected': 1}
+
+
+def test_rate_limit_ignores_client_chosen_session_ids():
+    """Requests are budgeted per remote address, so rotating session IDs does not reset the budget"""
+    async def ok_app(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b'{}'})
+    
+    app = ClientLimitMiddleware(ok_app, ClientLimiter(max_concurrent=4, max_per_minute=3))
+    
+    async def scenario():
+        first = [await call(app, http_scope(session=f"rotated-{i}")) for i in range(4)]
+        return first, await call(app, http_scope(host='10.0.0.2'))
+    
+    statuses, other_host = asyncio.run(scenario())
+    assert statuses == [200, 200, 200, 429]
+    assert other_host == 200
+
+
+def free_port() -> int:
+    """Ask the OS for an unused localhost port"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def post(url, message, session=None):
+    """POST a JSON-RPC message; returns (session ID, decoded result or None)"""
+    headers = {'Content-Type': 'application/json', 'Accept': 'application/json, text/event-stream'}
+    if session:
+        headers['mcp-session-id'] = session
+    request = urllib.request.Request(url, json.dumps(message).encode('utf-8'), headers)
+    with urllib.request.urlopen(request, timeout=30) as response:
+        body = response.read().decode('utf-8')
+        session = response.headers.get('mcp-session-id', session)
+    # Responses come back as plain JSON or as a short SSE stream
+    for line in body.splitlines():
+        if line.startswith('data:'):
+            body = line[5:]
+    return session, json.loads(body)['result'] if body.strip() else None
+
+
+def test_http_clients_share_one_server(stub_workspace):
+    """Two localhost clients get separate sessions from the same server process"""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, str(project_root / 'mcp' / 'start_server.py'), str(stub_workspace), '--transport', 'http', '--port', str(port)],
+        cwd=str(project_root),
+        stderr=subprocess.PIPE
+    )
+    url = f"http://127.0.0.1:{port}/mcp"
+    initialize = {
+        'jsonrpc': '2.0', 'id': 1, 'method': 'initialize',
+        'params': {'protocolVersion': '2025-03-26', 'capabilities': {}, 'clientInfo': {'name': 'test', 'version': '1'}}
+    }
+    
+    try:
+        deadline = time.monotonic() + 20
+        while True:
+            if process.poll() is not None:
+                stderr = process.stderr.read().decode('utf-8', errors='replace').strip()
+                pytest.skip(f"server did not start: {stderr.splitlines()[-1] if stderr else process.returncode}")
+            try:
+                first, _ = post(url, initialize)
+                break
+            except (urllib.error.URLError, ConnectionError):
+                if time.monotonic() > deadline:
+                    pytest.fail("server did not accept connections")
+                time.sleep(0.2)
+        
+        second, _ = post(url, initialize)
+        assert first and second and first != second
+        
+        for session in (first, second):
+            post(url, {'jsonrpc': '2.0', 'method': 'notifications/initialized'}, session)
+            _, result = post(url, {'jsonrpc': '2.0', 'id': 2, 'method': 'tools/list', 'params': {}}, session)
+            assert 'stub-tool:echo' in {tool['name'] for tool in result['tools']}
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        process.stderr.close()
@@ -0,0 +1,193 @@
+"""Tests for the background job manager"""
+
+import asyncio
+import json
+import subprocess
+import sys
+
+import pytest
+
+from mcp.server.executor import OperationExecutor
+from mcp.server.jobs import JobManager
+from mcp.server.process import IS_WINDOWS, pid_alive, process_start_time
+from mcp.server.tool_registry import ToolRegistry
+
+
+async def _wait_for(manager, job_id, timeout=10.0):
+    """Poll a job until it reaches a terminal state"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        status = manager.status(job_id)
+        if status['status'] not in ('queued', 'running'):
+            return status
+        await asyncio.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_submit_returns_immediately_and_tail_reads_offsets(stub_workspace):
+    """A job runs in the background and its output can be paged by offset"""
+    async def scenario():
+        manager = JobManager(OperationExecutor(ToolRegistry(str(stub_workspace))))
+        job = manager.submit("stub-tool:chatty")
+        assert job['status'] == 'queued'
+        
+        status = await _wait_for(manager, job['id'])
+        assert status['status'] == 'succeeded'
+        assert status['exit_code'] == 0
+        
+        first = manager.tail(job['id'], offset=0, max_bytes=100)
+        assert first['data'].startswith("line 0000")
+        assert first['next_offset'] == 100
+        assert not first['eof']
+        
+        second = manager.tail(job['id'], offset=first['next_offset'], max_bytes=100)
+        assert second['offset'] == 100
+        
+        last = manager.tail(job['id'], max_bytes=100)
+        assert last['eof']
+        assert "progress 100%" in last['data']
+    
+    asyncio.run(scenario())
+
+
+def test_cancel_kills_running_job(stub_workspace):
+    """Cancelling a running job kills its process group"""
+    async def scenario():
+        manager = JobManager(OperationExecutor(ToolRegistry(str(stub_workspace))))
+        job = manager.submit("stub-tool:sleep", {"Seconds": 30})
+        
+        while manager.status(job['id'])['status'] == 'queued':
+            await asyncio.sleep(0.05)
+        running = manager.status(job['id'])
+        assert running['process_start'] is not None
+        assert running['process_start'] == process_start_time(running['pid'])
+        
+        started = asyncio.get_running_loop().time()
+        result = await manager.cancel(job['id'])
+        assert result['status'] == 'cancelled'
+        assert asyncio.get_running_loop().time() - started < 5
+    
+    asyncio.run(scenario())
+
+
+def test_cancel_during_startup_kills_process(stub_workspace, monkeypatch):
+    """A cancel landing while the process spawns is not overwritten by 'running'"""
+    spawned = []
+    real_spawn = asyncio.create_subprocess_exec
+    
+    async def slow_spawn(*args, **kwargs):
+        process = await real_spawn(*args, **kwargs)
+        spawned.append(process)
+        await asyncio.sleep(0.3)
+        return process
+    
+    async def scenario():
+        manager = JobManager(OperationExecutor(ToolRegistry(str(stub_workspace))))
+        job = manager.submit("stub-tool:sleep", {"Seconds": 30})
+        while not spawned:
+            await asyncio.sleep(0.01)
+        
+        result = await manager.cancel(job['id'])
+        assert result['status'] == 'cancelled'
+        await asyncio.sleep(0.1)
+        assert manager.status(job['id'])['status'] == 'cancelled'
+        assert spawned[0].returncode is not None
+    
+    monkeypatch.setattr(asyncio, 'create_subprocess_exec', slow_spawn)
+    asyncio.run(scenario())
+
+
+def test_cancel_queued_job_releases_its_task(stub_workspace):
+    """Cancelling a job that waits for a slot stops its task as well"""
+    async def scenario():
+        manager = JobManager(OperationExecutor(ToolRegistry(str(stub_workspace))))
+        running = [manager.submit("stub-tool:sleep", {"Seconds": 30}) for _ in range(2)]
+        waiting = manager.submit("stub-tool:sleep", {"Seconds": 30})
+        await asyncio.sleep(0.2)
+        assert manager.status(waiting['id'])['status'] == 'queued'
+        
+        result = await manager.cancel(waiting['id'])
+        assert result['status'] == 'cancelled'
+        assert waiting['id'] not in manager._tasks
+        
+        for job in running:
+            await manager.cancel(job['id'])
+    
+    asyncio.run(scenario())
+
+
+def test_unexpected_error_fails_job(stub_workspace):
+    """An error outside spawning still moves the job to a terminal state"""
+    async def scenario():
+        manager = JobManager(OperationExecutor(ToolRegistry(str(stub_workspace))))
+        job = manager.submit("stub-tool:echo")
+        # The log path is a directory, so opening it raises IsADirectoryError
+        (manager.state_dir / f"{job['id']}.log").mkdir()
+        return await _wait_for(manager, job['id'])
+    
+    status = asyncio.run(scenario())
+    assert status['status'] == 'failed'
+    assert status['error'].startswith("Job failed: IsADirectoryError")
+
+
+def test_unknown_operation_and_job(stub_workspace):
+    """Errors are returned as records rather than raised"""
+    manager = JobManager(OperationExecutor(ToolRegistry(str(stub_workspace))))
+    assert "not found" in manager.submit("nope")['error']
+    assert "not found" in manager.status("missing")['error']
+
+
+def test_job_state_survives_restart(stub_workspace):
+    """A new manager reloads finished jobs and marks orphaned queued jobs lost"""
+    async def scenario():
+        manager = JobManager(OperationExecutor(ToolRegistry(str(stub_workspace))))
+        job = manager.submit("stub-tool:echo", {"Message": "persisted"})
+        await _wait_for(manager, job['id'])
+        return manager.state_dir, job['id']
+    
+    state_dir, job_id = asyncio.run(scenario())
+    
+    # Simulate a job that was still queued when the old server exited
+    (state_dir / "orphan.json").write_text(json.dumps({
+        'id': 'orphan', 'operation': 'stub-tool:echo', 'arguments': {}, 'status': 'queued',
+        'submitted_at': 0, 'started_at': None, 'finished_at': None, 'exit_code': None,
+        'pid': None, 'log': 'orphan.log'
+    }))
+    
+    manager = JobManager(OperationExecutor(ToolRegistry(str(stub_workspace))))
+    assert manager.status(job_id)['status'] == 'succeeded'
+    assert 'persisted' in manager.tail(job_id)['data']
+    assert manager.status('orphan')['status'] == 'lost'
+
+
+@pytest.mark.skipif(IS_WINDOWS, reason="uses a POSIX session as the job's process group")
+def test_cancel_after_restart_kills_only_the_recorded_process(stub_workspace):
+    """A detached job is killed only if its PID still has the recorded start time"""
+    manager = JobManager(OperationExecutor(ToolRegistry(str(stub_workspace))))
+    process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'], start_new_session=True)
+    
+    def write_running_job(job_id, process_start):
+        (manager.state_dir / f"{job_id}.json").write_text(json.dumps({
+            'id': job_id, 'operation': 'stub-tool:sleep', 'arguments': {}, 'status': 'running',
+            'submitted_at': 0, 'started_at': 0, 'finished_at': None, 'exit_code': None,
+            'pid': process.pid, 'process_start': process_start, 'log': f"{job_id}.log"
+        }))
+    
+    try:
+        # The PID now belongs to a process started at another time, or to one
+        # recorded before start times were kept: neither may be killed
+        write_running_job('reused', 'another start')
+        write_running_job('unverified', None)
+        restarted = JobManager(OperationExecutor(ToolRegistry(str(stub_workspace))))
+        assert restarted.status('reused')['status'] == 'finished'
+        assert asyncio.run(restarted.cancel('unverified'))['status'] == 'lost'
+        assert pid_alive(process.pid)
+        
+        write_running_job('own', process_start_time(process.pid))
+        restarted = JobManager(OperationExecutor(ToolRegistry(str(stub_workspace))))
+        assert restarted.status('own')['status'] == 'running'
+        assert asyncio.run(restarted.cancel('own'))['status'] == 'cancelled'
+        assert process.wait(timeout=10) is not None
+    finally:
+        process.kill()
+        process.wait()
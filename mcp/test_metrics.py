@@ -0,0 +1,50 @@
+"""Tests for per-operation metrics"""
+
+import asyncio
+
+from mcp.server.config import load_server_config
+from mcp.server.executor import OperationExecutor
+from mcp.server.metrics import Histogram, SECONDS_BUCKETS
+from mcp.server.tool_registry import ToolRegistry
+
+
+def test_histogram_buckets_and_quantiles():
+    """Observations land in the first bucket whose bound is >= the value"""
+    histogram = Histogram(SECONDS_BUCKETS)
+    for value in (0.001, 0.2, 0.2, 7200):
+        histogram.observe(value)
+    
+    assert histogram.count == 4
+    assert histogram.quantile(0.5) == 0.25
+    assert histogram.quantile(1.0) == float('inf')
+    assert histogram.cumulative()[-1] == ('+Inf', 4)
+
+
+def test_executor_records_runs_and_exports(stub_workspace):
+    """Runs, exit codes, timeouts and cache hits are counted per operation"""
+    config = load_server_config(stub_workspace)
+    config['execution']['timeout'] = 1
+    config['metrics']['export_interval'] = 0
+    executor = OperationExecutor(ToolRegistry(str(stub_workspace)), config)
+    
+    async def scenario():
+        await executor.execute("stub-tool:echo", {"Message": "hi"})
+        await executor.execute("stub-tool:fail", {})
+        await executor.execute("stub-tool:sleep", {"Seconds": 5})
+        await executor.execute("stub-tool:counter", {})
+        await executor.execute("stub-tool:counter", {})
+    
+    asyncio.run(scenario())
+    
+    metrics = executor.metrics.to_dict()['operations']
+    assert metrics['stub-tool:echo']['exit_codes'] == {'0': 1}
+    assert metrics['stub-tool:echo']['output_bytes']['sum'] > 0
+    assert metrics['stub-tool:echo']['spawn_seconds']['count'] == 1
+    assert metrics['stub-tool:fail']['exit_codes'] == {'3': 1}
+    assert metrics['stub-tool:sleep']['timeouts'] == 1
+    assert metrics['stub-tool:counter']['calls'] == 2
+    assert metrics['stub-tool:counter']['cache_hits'] == 1
+    
+    exported = (stub_workspace / "logs" / "mcp" / "metrics.prom").read_text()
+    assert 'electric_sheep_operation_timeouts_total{operation="stub-tool:sleep"} 1' in exported
+    assert 'electric_sheep_operation_run_seconds_count{operation="stub-tool:echo"} 1' in exported
@@ -0,0 +1,200 @@
+"""Tests for streaming output capture"""
+
+import asyncio
+import os
+import time
+
+from mcp.server import output
+from mcp.server.config import load_server_config
+from mcp.server.executor import OperationExecutor
+from mcp.server.output import BoundedOutput, OutputNotifier, OutputStore, iter_lines
+from mcp.server.tool_registry import ToolRegistry
+
+
+def _collect_lines(chunks, **kwargs):
+    """Feed chunks through a StreamReader and collect the yielded lines"""
+    async def scenario():
+        stream = asyncio.StreamReader()
+        for chunk in chunks:
+            stream.feed_data(chunk)
+        stream.feed_eof()
+        return [line async for line in iter_lines(stream, chunk_size=4, **kwargs)]
+    
+    return asyncio.run(scenario())
+
+
+def test_iter_lines_splits_all_line_endings():
+    """\\n, \\r\\n and bare \\r all terminate a line, even across reads"""
+    lines = _collect_lines([b"one\r", b"\ntwo\nthree\rfour\r\n\nlast"])
+    assert lines == [b"one", b"two", b"three", b"four", b"", b"last"]
+
+
+def test_iter_lines_caps_long_lines():
+    """A line without terminators is yielded in bounded pieces"""
+    lines = _collect_lines([b"a" * 25], max_line_bytes=10)
+    assert b"".join(lines) == b"a" * 25
+    assert all(len(line) <= 10 for line in lines)
+
+
+def test_bounded_output_keeps_tail():
+    """Old lines are evicted once the byte budget is exceeded"""
+    buffer = BoundedOutput(max_bytes=20)
+    for i in range(10):
+        buffer.append(f"line{i}", 5)
+    
+    assert buffer.line_count == 10
+    assert buffer.total_bytes == 60
+    assert buffer.dropped_bytes == 42
+    assert buffer.text().endswith("line7\nline8\nline9\n")
+    assert buffer.text().startswith("[... 42 bytes of earlier output truncated ...]")
+
+
+def test_execute_streams_lines_with_bounded_result(stub_workspace):
+    """Every line reaches the callback while the result stays bounded"""
+    config = load_server_config(stub_workspace)
+    config['execution']['max_output_bytes'] = 4096
+    config['execution']['spill']['enabled'] = False
+    executor = OperationExecutor(ToolRegistry(str(stub_workspace)), config)
+    received = []
+    
+    async def on_output(stream, line):
+        received.append((stream, line))
+    
+    result = asyncio.run(executor.execute("stub-tool:chatty", {}, on_output=on_output))
+    
+    stdout_lines = [line for stream, line in received if stream == 'stdout']
+    assert len(stdout_lines) == 2000
+    assert stdout_lines[0].startswith("line 0000")
+    assert ('stderr', 'progress 50%') in received
+    assert ('stderr', 'progress 100%') in received
+    assert "bytes of earlier output truncated" in result
+    assert "line 1999" in result
+    assert len(result) < 3 * 4096
+
+
+def test_notifier_batches_lines(stub_workspace):
+    """2000 streamed lines reach the client as a handful of notifications, in order"""
+    executor = OperationExecutor(ToolRegistry(str(stub_workspace)))
+    logs = []
+    progress = []
+    
+    async def send_log(level, data):
+        logs.append((level, data))
+    
+    async def send_progress(value):
+        progress.append(value)
+    
+    async def scenario():
+        async with OutputNotifier(send_log, send_progress, max_lines=500) as notifier:
+            await executor.execute("stub-tool:chatty", {}, on_output=notifier)
+    
+    asyncio.run(scenario())
+    
+    stdout_lines = [line for level, data in logs if level == 'info' for line in data.split('\n')]
+    assert [line[:9] for line in stdout_lines] == [f"line {i:04d}" for i in range(2000)]
+    assert ('warning', 'progress 50%\nprogress 100%') in logs
+    assert len(logs) < 20
+    assert progress == sorted(progress) and progress[-1] == 2002
+
+
+def test_notifier_does_not_wait_for_slow_client():
+    """Queuing a line never waits on the client; overflow is dropped and reported"""
+    logs = []
+    
+    async def slow_log(level, data):
+        await asyncio.sleep(0.2)
+        logs.append(data)
+    
+    async def send_progress(value):
+        pass
+    
+    async def scenario():
+        async with OutputNotifier(slow_log, send_progress, interval=0.01, max_pending=100) as notifier:
+            started = time.monotonic()
+            for i in range(50):
+                await notifier('stdout', f"early {i}")
+            await asyncio.sleep(0.05)
+            for i in range(1000):
+                await notifier('stdout', f"late {i}")
+            return time.monotonic() - started
+    
+    elapsed = asyncio.run(scenario())
+    assert elapsed < 0.2
+    assert logs[0].split('\n') == [f"early {i}" for i in range(50)]
+    assert logs[1] == "[... 900 lines not forwarded, client too slow ...]"
+    assert logs[2].split('\n') == [f"late {i}" for i in range(900, 1000)]
+
+
+def test_large_output_spills_to_disk(stub_workspace):
+    """Output over the budget is saved whole and the result holds excerpts"""
+    config = load_server_config(stub_workspace)
+    config['execution']['max_output_bytes'] = 4096
+    config['execution']['spill']['excerpt_bytes'] = 512
+    executor = OperationExecutor(ToolRegistry(str(stub_workspace)), config)
+    
+    result = asyncio.run(executor.execute("stub-tool:chatty", {}))
+    
+    assert result.startswith("Output:\nline 0000")
+    assert "line 1999" in result
+    assert "line 1000" not in result
+    assert len(result) < 4096
+    handle = result.split("handle=")[1].split()[0]
+    
+    store = executor.output_store
+    page = store.read(handle, offset=0, length=60)
+    assert page['data'].startswith("line 0000")
+    assert page['size'] == 2000 * 51
+    
+    lines = store.read(handle, start_line=1500, line_count=3)
+    assert [line[:9] for line in lines['lines']] == ["line 1500", "line 1501", "line 1502"]
+    assert lines['next_line'] == 1503
+    
+    last = store.read(handle, start_line=1999, line_count=10)
+    assert len(last['lines']) == 1
+    assert last['eof']
+    
+    # stderr stayed small, so it was returned inline and never spilled
+    assert "progress 100%" in result
+    assert "error" in store.read(handle, stream='stderr')
+
+
+def test_output_read_rejects_bad_handles(tmp_path):
+    """Handles are validated before touching the filesystem"""
+    store = OutputStore(tmp_path, 1024, 128, 1)
+    assert store.read("../../etc/passwd")['error'] == 'Invalid handle or stream'
+    assert 'error' in store.read("0" * 32)
+
+
+def test_spill_excerpts_are_sized_in_bytes(tmp_path):
+    """Multi-byte lines count their encoded size toward the excerpt budget"""
+    store = OutputStore(tmp_path, 64, 40, 1)
+    stdout, _ = store.new_buffers()
+    line = "é" * 10  # 10 characters, 20 bytes
+    for _ in range(20):
+        stdout.append(line, len(line.encode('utf-8')))
+    stdout.close()
+    
+    # Counting characters (11 per line) would keep 4 head and 3 tail lines
+    head, _, tail = stdout.text().partition("[...")
+    assert head.count(line) == 2
+    assert tail.count(line) == 1
+
+
+def test_spill_files_are_pruned_while_running(tmp_path, monkeypatch):
+    """Expired spill files are removed on later runs, not only at startup"""
+    store = OutputStore(tmp_path, 1024, 128, retention_hours=1)
+    stale = tmp_path / ("0" * 32 + ".stdout.log")
+    stale.write_text("old")
+    os.utime(stale, (0, 0))
+    
+    store.new_buffers()
+    assert not stale.exists()
+    
+    stale.write_text("old")
+    os.utime(stale, (0, 0))
+    store.new_buffers()
+    assert stale.exists()  # checked at most every PRUNE_INTERVAL
+    
+    monkeypatch.setattr(output, 'PRUNE_INTERVAL', 0)
+    store.new_buffers()
+    assert not stale.exists()
@@ -0,0 +1,55 @@
+"""Tests for the MCP server wiring, driven through the real MCP SDK"""
+
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("mcp.shared.memory", reason="MCP SDK not installed")
+
+from mcp.shared.memory import create_connected_server_and_client_session
+
+from mcp.server.executor import OperationExecutor
+from mcp.server.server import create_server
+from mcp.server.tool_registry import ToolRegistry
+
+
+def run_session(workspace, scenario):
+    """Run scenario(client) against create_server over in-memory streams"""
+    registry = ToolRegistry(str(workspace))
+    executor = OperationExecutor(registry)
+    
+    async def main():
+        try:
+            async with create_connected_server_and_client_session(create_server(registry, executor)) as client:
+                return await scenario(client)
+        finally:
+            await executor.close()
+    
+    return asyncio.run(main())
+
+
+def test_operation_tools_use_catalog_schemas(stub_workspace):
+    """tools/list advertises each operation's manifest parameters"""
+    async def scenario(client):
+        return {tool.name: tool.inputSchema for tool in (await client.list_tools()).tools}
+    
+    schemas = run_session(stub_workspace, scenario)
+    assert schemas['stub-tool:echo']['properties']['Message']['type'] == 'string'
+    assert 'kwargs' not in schemas['stub-tool:echo']['properties']
+    assert 'jobs:submit' in schemas
+
+
+def test_operation_call_passes_arguments_through(stub_workspace):
+    """tools/call hands the argument dict to the operation unchanged"""
+    async def scenario(client):
+        with_message = await client.call_tool('stub-tool:echo', {'Message': 'hi'})
+        without = await client.call_tool('stub-tool:echo', {})
+        status = await client.call_tool('jobs:status', {})
+        return with_message, without, status
+    
+    with_message, without, status = run_session(stub_workspace, scenario)
+    assert not with_message.isError
+    assert with_message.content[0].text == 'Output:\n-Message "hi"\n'
+    assert without.content[0].text == 'Output:\nhello\n'
+    assert json.loads(status.content[0].text) == {'jobs': []}
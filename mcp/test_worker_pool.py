@@ -0,0 +1,90 @@
+"""Tests for the warm interpreter worker pool"""
+
+import asyncio
+import sys
+
+from mcp.server.config import load_server_config
+from mcp.server.executor import OperationExecutor
+from mcp.server.tool_registry import ToolRegistry
+from mcp.server.worker_pool import WorkerCrashed, WorkerPool
+
+
+PYTHON_WORKER = [sys.executable, "{worker_dir}/worker.py"]
+
+
+def _pooled_executor(workspace, **pool_overrides):
+    """Executor that runs every operation on Python stub workers"""
+    config = load_server_config(workspace)
+    config['execution']['worker_pool'].update({
+        'enabled': True,
+        'command': PYTHON_WORKER,
+        'operations': ['*'],
+        **pool_overrides
+    })
+    return OperationExecutor(ToolRegistry(str(workspace)), config)
+
+
+def test_pooled_results_match_spawn_path(stub_workspace):
+    """Warm workers return the same text as spawning an interpreter"""
+    async def scenario():
+        spawned = OperationExecutor(ToolRegistry(str(stub_workspace)))
+        pooled = _pooled_executor(stub_workspace)
+        try:
+            for code, args in [("stub-tool:echo", {"Message": "hi"}), ("stub-tool:fail", {})]:
+                assert await pooled.execute(code, args) == await spawned.execute(code, args)
+            return pooled.worker_pool.stats()
+        finally:
+            await pooled.close()
+    
+    stats = asyncio.run(scenario())
+    assert stats['started'] == 1
+
+
+def test_workers_recycled_after_max_runs(stub_workspace):
+    """A worker is replaced once it has served max_runs requests"""
+    async def scenario():
+        executor = _pooled_executor(stub_workspace, size=1, max_runs=2)
+        try:
+            for _ in range(5):
+                assert "hello" in await executor.execute("stub-tool:echo", {})
+            return executor.worker_pool.stats()
+        finally:
+            await executor.close()
+    
+    stats = asyncio.run(scenario())
+    assert stats['started'] == 3
+    assert stats['recycled'] == 2
+
+
+def test_crashed_worker_is_replaced(stub_workspace):
+    """A worker that dies mid-request is reported and replaced"""
+    async def scenario():
+        executor = _pooled_executor(stub_workspace, size=1)
+        try:
+            crashed = await executor.execute("stub-tool:crash", {})
+            after = await executor.execute("stub-tool:echo", {})
+            return crashed, after, executor.worker_pool.stats()
+        finally:
+            await executor.close()
+    
+    crashed, after, stats = asyncio.run(scenario())
+    assert "about to crash" in crashed
+    assert "Worker exited with code 5" in crashed
+    assert after == "Output:\nhello\n"
+    assert stats['crashed'] == 1
+    assert stats['started'] == 2
+
+
+def test_pool_reports_bad_worker_command(tmp_path):
+    """A worker command that never becomes ready raises WorkerCrashed"""
+    async def scenario():
+        pool = WorkerPool([sys.executable, "-c", "print('not json')"], startup_timeout=5)
+        async def ignore(stream, line):
+            pass
+        try:
+            await pool.run({'script': 'x', 'cwd': str(tmp_path)}, ignore)
+        except WorkerCrashed:
+            return True
+        return False
+    
+    assert asyncio.run(scenario())
@@ -0,0 +1,58 @@
+# Caption Daemon - keeps Qwen2.5-VL loaded between generate_captions_qwen.py runs
+# Usage: .\tools\ai\musubi-tuner\scripts\caption-daemon.ps1 [-ModelName "Qwen/Qwen2.5-VL-7B-Instruct"] [-Port 8766] [-IdleTimeout 900]
+
+param(
+    [Parameter(Mandatory=$false)]
+    [string]$ModelName,
+    
+    [Parameter(Mandatory=$false)]
+    [int]$Port = 8766,
+    
+    [Parameter(Mandatory=$false)]
+    [int]$IdleTimeout = 900
+)
+
+# Load configuration
+$ConfigPath = Join-Path $PSScriptRoot "..\..\..\..\.local\config.json"
+if (Test-Path $ConfigPath) {
+    $Config = Get-Content $ConfigPath | ConvertFrom-Json
+    $MusubiTunerPath = $Config.paths.musubi_tuner.installation_path
+    $PythonExe = $Config.paths.musubi_tuner.python_exe
+    if (-not $PythonExe -or -not (Test-Path $PythonExe)) {
+        $PythonExe = Join-Path $MusubiTunerPath "venv\Scripts\python.exe"
+    }
+} else {
+    Write-Warning ".local/config.json not found. Using default paths."
+    $MusubiTunerPath = "E:/path/to/musubi-tuner"
+    $PythonExe = Join-Path $MusubiTunerPath "venv\Scripts\python.exe"
+}
+
+$ScriptPath = Join-Path $PSScriptRoot "caption_daemon.py"
+
+if (-not (Test-Path $PythonExe)) {
+    Write-Host "Error: Python executable not found at $PythonExe" -ForegroundColor Red
+    exit 1
+}
+
+$Arguments = @(
+    $ScriptPath
+    "--port", $Port
+    "--idle_timeout", $IdleTimeout
+)
+
+if ($ModelName) {
+    $Arguments += "--preload", $ModelName
+}
+
+Write-Host "Starting caption daemon on http://127.0.0.1:$Port ..." -ForegroundColor Cyan
+Write-Host "Command: $PythonExe $($Arguments -join ' ')" -ForegroundColor Gray
+Write-Host "generate_captions_qwen.py will send its jobs here while this runs (Ctrl+C to stop)" -ForegroundColor Gray
+
+& $PythonExe $Arguments
+
+if ($LASTEXITCODE -ne 0) {
+    Write-Host "Error: Caption daemon exited with code $LASTEXITCODE" -ForegroundColor Red
+    exit $LASTEXITCODE
+}
+
+Write-Host "Caption daemon stopped" -ForegroundColor Green
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of the caption pipeline on a tiny random-weight Qwen2.5-VL.
+
+Synthetic images go through the same job code as generate_captions_qwen.py
+(bucketing, prefetch, pixel budget, caption writing) with a model that has two
+small layers per tower, so pipeline changes can be measured in seconds on a
+CPU-only machine. By default the tokenizer and processor are built in memory
+and nothing is downloaded; --model_name borrows a cached model's processor and
+config instead. Each --precisions entry runs once on the same weights and
+images, in its own process so peak RSS is that precision's alone; the report
+lists weight memory, images/s, tokens/s, prefill time, peak RSS and how
+closely the captions match the first precision.
+"""
+
+import argparse
+import difflib
+import io
+import json
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import torch
+from PIL import Image
+from transformers import AutoConfig, AutoProcessor, PreTrainedTokenizerFast
+
+import caption_pipeline
+from generate_captions_qwen import JOB_DEFAULTS
+
+# Layer sizes of the tiny model; text head_dim is 64 / 2 = 32, so the
+# multimodal rotary sections must add up to 16
+TINY_TEXT = {
+    'hidden_size': 64,
+    'intermediate_size': 128,
+    'num_hidden_layers': 2,
+    'num_attention_heads': 2,
+    'num_key_value_heads': 1,
+    'max_window_layers': 2,
+    'use_sliding_window': False,
+}
+TINY_VISION = {
+    'depth': 2,
+    'hidden_size': 64,
+    'intermediate_size': 128,
+    'num_heads': 2,
+    'out_hidden_size': 64,
+    'fullatt_block_indexes': [1],
+}
+TINY_MROPE_SECTION = [4, 6, 6]
+
+# Synthetic image sizes, a mix of orientations and vision-token counts
+SYNTHETIC_SIZES = [(448, 448), (640, 480), (480, 640), (896, 672), (336, 336), (1024, 576)]
+
+# Special tokens of the Qwen2.5-VL chat format used by the offline tokenizer
+SPECIAL_TOKENS = ["<|endoftext|>", "<|im_start|>", "<|im_end|>", "<|vision_start|>", "<|vision_end|>", "<|image_pad|>", "<|video_pad|>"]
+CHAT_TEMPLATE = (
+    "{% for message in messages %}<|im_start|>{{ message['role'] }}\n"
+    "{% if message['content'] is string %}{{ message['content'] }}{% else %}"
+    "{% for content in message['content'] %}"
+    "{% if content['type'] == 'image' %}<|vision_start|><|image_pad|><|vision_end|>"
+    "{% elif content['type'] == 'text' %}{{ content['text'] }}{% endif %}"
+    "{% endfor %}{% endif %}<|im_end|>\n{% endfor %}"
+    "{% if add_generation_prompt %}<|im_start|>assistant\n{% endif %}"
+)
+# Filler words so random generations decode to readable captions
+FILLER_WORDS = (
+    "a an the woman man person portrait photo standing sitting outdoor indoor light dark red blue green "
+    "white black hair eyes smiling wearing shirt dress jacket background street room window tree sky "
+    "close up wide shot soft sharp detailed natural warm cool evening morning"
+).split()
+
+
+def offline_processor():
+    """Qwen2.5-VL processor with a small word-level tokenizer, built without any download"""
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import Qwen2_5_VLProcessor, Qwen2VLImageProcessor
+    
+    words = set(FILLER_WORDS) | {"user", "assistant", "system"}
+    words |= set(caption_pipeline.CAPTION_PROMPT.replace("\n", " ").split())
+    vocab = {token: i for i, token in enumerate(["[UNK]"] + SPECIAL_TOKENS + sorted(words))}
+    backend = Tokenizer(models.WordLevel(vocab, unk_token="[UNK]"))
+    backend.pre_tokenizer = pre_tokenizers.WhitespaceSplit()
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=backend,
+        unk_token="[UNK]",
+        pad_token="<|endoftext|>",
+        eos_token="<|im_end|>",
+        additional_special_tokens=SPECIAL_TOKENS[1:]
+    )
+    tokenizer.padding_side = "left"
+    
+    extra = {}
+    try:
+        # Newer transformers versions give the processor a separate video processor
+        from transformers import Qwen2VLVideoProcessor
+        extra['video_processor'] = Qwen2VLVideoProcessor()
+    except ImportError:
+        pass
+    return Qwen2_5_VLProcessor(image_processor=Qwen2VLImageProcessor(), tokenizer=tokenizer, chat_template=CHAT_TEMPLATE, **extra)
+
+
+def tiny_config(processor, model_name: Optional[str] = None):
+    """Tiny Qwen2.5-VL config matching the processor's vocabulary and special tokens"""
+    if model_name:
+        config = AutoConfig.from_pretrained(model_name)
+    else:
+        from transformers import Qwen2_5_VLConfig
+        tokenizer = processor.tokenizer
+        token_id = tokenizer.convert_tokens_to_ids
+        config = Qwen2_5_VLConfig(
+            vocab_size=len(tokenizer),
+            bos_token_id=token_id("<|im_start|>"),
+            eos_token_id=tokenizer.eos_token_id,
+            pad_token_id=tokenizer.pad_token_id,
+            image_token_id=token_id("<|image_pad|>"),
+            video_token_id=token_id("<|video_pad|>"),
+            vision_start_token_id=token_id("<|vision_start|>"),
+            vision_end_token_id=token_id("<|vision_end|>"),
+            tie_word_embeddings=False
+        )
+    
+    # Newer transformers versions keep the text settings in text_config
+    text_config = getattr(config, 'text_config', None)
+    for target in [config] + ([text_config] if text_config is not None and text_config is not config else []):
+        for name, value in TINY_TEXT.items():
+            setattr(target, name, value)
+        rope_scaling = dict(getattr(target, 'rope_scaling', None) or {'type': 'mrope'})
+        rope_scaling['mrope_section'] = TINY_MROPE_SECTION
+        target.rope_scaling = rope_scaling
+    for name, value in TINY_VISION.items():
+        setattr(config.vision_config, name, value)
+    return config
+
+
+def tiny_random_model(config, seed: int = 0):
+    """Randomly initialised float32 Qwen2.5-VL for config"""
+    if caption_pipeline.Qwen2_5_VLForConditionalGeneration is None:
+        raise RuntimeError("The benchmark needs a transformers version with Qwen2.5-VL")
+    torch.manual_seed(seed)
+    model = caption_pipeline.Qwen2_5_VLForConditionalGeneration(config)
+    return model.to(torch.float32).eval()
+
+
+def synthetic_images(directory: Path, count: int, seed: int = 0) -> List[Path]:
+    """Write count random-noise JPEGs of mixed sizes and return their paths"""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        width, height = SYNTHETIC_SIZES[i % len(SYNTHETIC_SIZES)]
+        path = directory / f"synthetic_{i:03d}.jpg"
+        Image.frombytes("RGB", (width, height), rng.randbytes(width * height * 3)).save(path, quality=90)
+        paths.append(path)
+    return paths
+
+
+def weights_mb(model) -> float:
+    """Size of the model's state dict, including int8 packed weights"""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / 2**20
+
+
+def caption_agreement(reference: List[str], captions: List[str]) -> Dict[str, float]:
+    """Share of identical captions and mean word-level similarity to the reference"""
+    exact = sum(a == b for a, b in zip(reference, captions))
+    similarity = sum(
+        difflib.SequenceMatcher(None, a.split(), b.split()).ratio()
+        for a, b in zip(reference, captions)
+    )
+    return {'exact': exact / len(reference), 'similarity': similarity / len(reference)}
+
+
+def measure_precision(args: argparse.Namespace, precision: str, image_dir: Path) -> Dict[str, Any]:
+    """Caption the synthetic images in image_dir at one precision, in this process
+    
+    Returns the precision's measurements and its captions.
+    """
+    if args.model_name:
+        processor = AutoProcessor.from_pretrained(args.model_name)
+        processor.tokenizer.padding_side = "left"
+    else:
+        processor = offline_processor()
+    config = tiny_config(processor, args.model_name)
+    device = torch.device("cpu")
+    
+    def log(event: Dict[str, Any]):
+        if args.verbose and event['event'] == 'log':
+            print(event['message'], file=sys.stderr)
+    
+    images = sorted(image_dir.glob("synthetic_*.jpg"))
+    model = caption_pipeline.apply_cpu_precision(tiny_random_model(config, args.seed), precision).eval()
+    # Warm-up batch so one-time kernel setup is not timed
+    caption_pipeline.caption_batch(
+        images[:args.batch_size], model, processor, device, "tiny", args.max_new_tokens, args.min_pixels, args.max_pixels
+    )
+    
+    report = Path(args.report_dir) / f"caption-benchmark-{precision}.json" if args.report_dir else None
+    job = argparse.Namespace(**{
+        **JOB_DEFAULTS,
+        'image_dir': str(image_dir),
+        'trigger_word': "tiny",
+        'max_new_tokens': args.max_new_tokens,
+        'batch_size': args.batch_size,
+        'prefetch': args.prefetch,
+        'decode_workers': args.decode_workers,
+        'min_pixels': args.min_pixels,
+        'max_pixels': args.max_pixels,
+        'no_manifest': True,
+        'cpu_precision': precision,
+        'report': str(report) if report else None
+    })
+    summary = caption_pipeline.run_caption_job(job, lambda: (model, processor, device), log)
+    
+    pipeline, telemetry = summary['pipeline'], summary['telemetry']
+    return {
+        'precision': precision,
+        'weights_mb': round(weights_mb(model), 2),
+        'images_per_second': round(pipeline['images'] / pipeline['wall_seconds'], 2),
+        'tokens_per_second': telemetry['tokens_per_second'],
+        'prefill_seconds': telemetry['prefill_seconds'],
+        'peak_rss_mb': telemetry['peak_rss_mb'],
+        'captions': [path.with_suffix('.txt').read_text(encoding='utf-8') for path in images]
+    }
+
+
+def measure_command(args: argparse.Namespace, precision: str, image_dir: Path, result_path: Path) -> List[str]:
+    """Command line re-running this script to measure one precision"""
+    command = [sys.executable, str(Path(__file__).resolve()), '--precisions', precision,
+               '--measure', str(image_dir), '--json', str(result_path)]
+    for name in ('model_name', 'batch_size', 'max_new_tokens', 'prefetch', 'decode_workers',
+                 'max_pixels', 'min_pixels', 'threads', 'seed', 'report_dir'):
+        value = getattr(args, name)
+        if value is not None:
+            command += [f"--{name}", str(value)]
+    if args.verbose:
+        command.append("--verbose")
+    return command
+
+
+def run_benchmark(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Caption the synthetic images once per precision and collect the measurements
+    
+    Each precision runs in a fresh process: peak RSS only ever grows, so in
+    a shared process every row would include the peaks of the ones before it.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        image_dir = Path(tmp)
+        synthetic_images(image_dir, args.images, args.seed)
+        results = []
+        reference = None
+        for precision in args.precisions:
+            result_path = image_dir / f"result-{precision}.json"
+            subprocess.run(measure_command(args, precision, image_dir, result_path), check=True)
+            row = json.loads(result_path.read_text(encoding='utf-8'))
+            captions = row.pop('captions')
+            if reference is None:
+                reference = captions
+            row.update({f"agreement_{name}": round(value, 3) for name, value in caption_agreement(reference, captions).items()})
+            results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the caption pipeline offline on a tiny random Qwen2.5-VL")
+    parser.add_argument("--model_name", type=str, default=None, help="Borrow this (cached) model's processor and config instead of the built-in tiny tokenizer")
+    parser.add_argument("--precisions", nargs="+", choices=caption_pipeline.CPU_PRECISIONS, default=list(caption_pipeline.CPU_PRECISIONS),
+                        help="Precisions to run; agreement is measured against the first")
+    parser.add_argument("--images", type=int, default=12, help="Synthetic images to caption")
+    parser.add_argument("--batch_size", type=int, default=2, help="Images per generate call")
+    parser.add_argument("--max_new_tokens", type=int, default=24, help="Tokens generated per caption")
+    parser.add_argument("--prefetch", type=int, default=JOB_DEFAULTS['prefetch'], help="Batches prepared ahead of generation")
+    parser.add_argument("--decode_workers", type=int, default=JOB_DEFAULTS['decode_workers'], help="Threads preparing batches")
+    parser.add_argument("--max_pixels", type=int, default=None, help="Pixel budget per image, as in generate_captions_qwen.py")
+    parser.add_argument("--min_pixels", type=int, default=None, help="Minimum pixels per image, as in generate_captions_qwen.py")
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op CPU threads (0 = torch default)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the weights and images")
+    parser.add_argument("--report_dir", type=str, default=None, help="Write each precision's per-image telemetry report here")
+    parser.add_argument("--json", type=str, default=None, help="Also write the comparison table to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's log lines")
+    # Used by run_benchmark to measure one precision on images it already wrote
+    parser.add_argument("--measure", type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    
+    if args.measure:
+        result = measure_precision(args, args.precisions[0], Path(args.measure))
+        Path(args.json).write_text(json.dumps(result), encoding='utf-8')
+        return
+    
+    print(f"Benchmarking {', '.join(args.precisions)} on {args.images} synthetic images "
+          f"with {torch.get_num_threads()} threads", file=sys.stderr)
+    results = run_benchmark(args)
+    
+    print(f"{'precision':>12}  {'weights MB':>10}  {'images/s':>8}  {'tokens/s':>8}  {'prefill s':>9}  {'peak RSS':>8}  {'exact':>6}  {'similar':>7}")
+    for row in results:
+        tokens = f"{row['tokens_per_second']:8.1f}" if row['tokens_per_second'] else f"{'-':>8}"
+        peak = f"{row['peak_rss_mb']:8.0f}" if row['peak_rss_mb'] is not None else f"{'-':>8}"
+        print(f"{row['precision']:>12}  {row['weights_mb']:10.2f}  {row['images_per_second']:8.2f}  {tokens}  "
+              f"{row['prefill_seconds']:9.2f}  {peak}  {row['agreement_exact']:6.0%}  {row['agreement_similarity']:7.0%}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding='utf-8')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Caption daemon: keeps Qwen2.5-VL loaded between generate_captions_qwen.py runs.
+
+Serves localhost HTTP. POST /jobs takes the same options as the command line
+(image_dir or files, trigger_word, batch_size, ...) as JSON and streams one JSON
+event per line while the job runs. GET /status reports whether a model is loaded.
+POST /shutdown stops the daemon. POSTs must be application/json and carry no
+Origin header, so web pages cannot drive the daemon. The model is unloaded after
+--idle_timeout seconds without a job and loaded again by the next one.
+"""
+
+import argparse
+import gc
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+import torch
+
+import caption_pipeline
+from generate_captions_qwen import DEFAULT_DAEMON_URL, JOB_DEFAULTS
+
+
+class ModelHolder:
+    """The resident model, loaded on demand and unloaded when idle
+    
+    Jobs run one at a time: each holds job_lock for its whole run, and a
+    request for a different model swaps the resident one.
+    """
+    
+    def __init__(self, idle_timeout: float):
+        self.idle_timeout = idle_timeout
+        self.job_lock = threading.Lock()
+        self.model_name: Optional[str] = None
+        self.cpu_precision = 'fp32'
+        self.model = None
+        self.processor = None
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.last_used = time.monotonic()
+        self.jobs_run = 0
+    
+    def get(self, model_name: str, cpu_precision: str = 'fp32') -> Tuple[Any, Any, Any]:
+        """Model, processor and device for model_name, loading it if needed (call with job_lock held)"""
+        if self.model is not None and (self.model_name, self.cpu_precision) != (model_name, cpu_precision):
+            self.unload()
+        if self.model is None:
+            self.model, self.processor = caption_pipeline.load_model(model_name, self.device, cpu_precision=cpu_precision)
+            self.model_name = model_name
+            self.cpu_precision = cpu_precision
+        return self.model, self.processor, self.device
+    
+    def unload(self):
+        """Drop the model and give its memory back"""
+        self.model = None
+        self.processor = None
+        self.model_name = None
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    
+    def unload_when_idle(self):
+        """Background loop unloading the model after idle_timeout seconds without a job"""
+        while True:
+            time.sleep(min(30.0, max(1.0, self.idle_timeout / 4)))
+            if self.model is None or time.monotonic() - self.last_used < self.idle_timeout:
+                continue
+            # Never unload under a running job
+            if self.job_lock.acquire(blocking=False):
+                try:
+                    if self.model is not None and time.monotonic() - self.last_used >= self.idle_timeout:
+                        print(f"Idle for {self.idle_timeout:.0f}s, unloading {self.model_name}", file=sys.stderr)
+                        self.unload()
+                finally:
+                    self.job_lock.release()
+    
+    def status(self) -> Dict[str, Any]:
+        """State reported by GET /status"""
+        return {
+            'loaded': self.model is not None,
+            'model_name': self.model_name,
+            'cpu_precision': self.cpu_precision,
+            'device': str(self.device),
+            'busy': self.job_lock.locked(),
+            'idle_seconds': round(time.monotonic() - self.last_used, 1),
+            'idle_timeout': self.idle_timeout,
+            'jobs_run': self.jobs_run
+        }
+
+
+class CaptionRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end of the daemon; server.holder is the ModelHolder"""
+    
+    protocol_version = "HTTP/1.0"
+    
+    def _send_json(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def do_GET(self):
+        if self.path == '/status':
+            self._send_json(200, self.server.holder.status())
+        else:
+            self._send_json(404, {'error': f"Unknown path {self.path}"})
+    
+    def _refuse_untrusted(self) -> bool:
+        """Refuse POSTs a web page could make; True when the request was answered
+        
+        Browsers attach Origin to cross-site requests and can only send
+        application/json cross-site after a CORS preflight, which this server
+        never answers. Local clients (generate_captions_qwen.py) send neither.
+        """
+        if self.headers.get('Origin') is not None:
+            self._send_json(403, {'error': "Requests from web pages are not accepted"})
+            return True
+        content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+        if content_type != 'application/json':
+            self._send_json(415, {'error': "Content-Type must be application/json"})
+            return True
+        return False
+    
+    def do_POST(self):
+        if self._refuse_untrusted():
+            return
+        if self.path == '/shutdown':
+            self._send_json(200, {'stopping': True})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+        if self.path != '/jobs':
+            self._send_json(404, {'error': f"Unknown path {self.path}"})
+            return
+        
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            options = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(options, dict):
+                raise ValueError("A job must be a JSON object")
+            unknown = sorted(set(options) - set(JOB_DEFAULTS))
+            if unknown:
+                raise ValueError(f"Unknown options: {', '.join(unknown)}")
+            if not options.get('image_dir') and not options.get('files'):
+                raise ValueError("A job needs image_dir or files")
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        # The daemon captions in its own process with its resident model
+        args = argparse.Namespace(**{**JOB_DEFAULTS, **options, 'workers': 1})
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        self.run_job(args)
+    
+    def emit(self, event: Dict[str, Any]):
+        """Stream one event line; raises if the client has gone away, which stops the job"""
+        self.wfile.write((json.dumps(event) + "\n").encode('utf-8'))
+        self.wfile.flush()
+    
+    def run_job(self, args: argparse.Namespace):
+        holder = self.server.holder
+        if holder.job_lock.locked():
+            self.emit({'event': 'log', 'message': "Waiting for the running job to finish"})
+        with holder.job_lock:
+            try:
+                loaded = holder.model is not None and (holder.model_name, holder.cpu_precision) == (args.model_name, args.cpu_precision)
+                self.emit({'event': 'log', 'message': f"Model {'resident' if loaded else 'loading'}: {args.model_name}"})
+                summary = caption_pipeline.run_caption_job(args, lambda: holder.get(args.model_name, args.cpu_precision), self.emit)
+                self.emit({'event': 'done', 'summary': summary})
+            except (BrokenPipeError, ConnectionResetError):
+                print("Client disconnected, job stopped", file=sys.stderr)
+            except Exception as e:
+                try:
+                    self.emit({'event': 'error', 'message': str(e)})
+                except OSError:
+                    pass
+            finally:
+                holder.jobs_run += 1
+                holder.last_used = time.monotonic()
+    
+    def log_message(self, format: str, *args: Any):
+        print(f"[{self.address_string()}] {format % args}", file=sys.stderr)
+
+
+def main():
+    default_port = int(DEFAULT_DAEMON_URL.rsplit(':', 1)[1])
+    parser = argparse.ArgumentParser(description="Keep Qwen2.5-VL loaded and caption images on request")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on (keep it local)")
+    parser.add_argument("--port", type=int, default=default_port, help="Port to listen on")
+    parser.add_argument("--idle_timeout", type=float, default=900.0, help="Seconds without a job before the model is unloaded (0 = never)")
+    parser.add_argument("--preload", type=str, default=None, help="Model to load at startup instead of on the first job")
+    parser.add_argument("--cpu_precision", choices=caption_pipeline.CPU_PRECISIONS, default=JOB_DEFAULTS['cpu_precision'],
+                        help="CPU precision of the --preload model (jobs may ask for another)")
+    args = parser.parse_args()
+    
+    holder = ModelHolder(args.idle_timeout)
+    if args.preload:
+        with holder.job_lock:
+            holder.get(args.preload, args.cpu_precision)
+    if args.idle_timeout > 0:
+        threading.Thread(target=holder.unload_when_idle, daemon=True).start()
+    
+    server = ThreadingHTTPServer((args.host, args.port), CaptionRequestHandler)
+    server.holder = holder
+    print(f"Caption daemon listening on http://{args.host}:{args.port} (idle timeout {args.idle_timeout:.0f}s)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    print("Caption daemon stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,994 @@
+"""
+Qwen2.5-VL captioning pipeline shared by generate_captions_qwen.py and caption_daemon.py.
+Holds batching, prefetching, the resume manifest, model loading and CPU worker sharding.
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from PIL import Image
+import torch
+import torch.multiprocessing
+from transformers import LogitsProcessor, LogitsProcessorList
+try:
+    from transformers import Qwen2_5_VLForConditionalGeneration, AutoProcessor
+except ImportError:
+    # Fallback for older transformers versions
+    from transformers import AutoModelForCausalLM, AutoProcessor
+    Qwen2_5_VLForConditionalGeneration = None
+
+CAPTION_PROMPT = """# Image Annotator
+You are a professional image annotator. Please complete the following task based on the input image.
+## Create Image Caption
+1. Write the caption using natural, descriptive text without structured formats or rich text.
+2. Enrich caption details by including: object attributes, vision relations between objects, and environmental details.
+3. Identify the text visible in the image, without translation or explanation, and highlight it in the caption with quotation marks.
+4. Maintain authenticity and accuracy, avoid generalizations."""
+
+# Qwen2.5-VL resizes images to multiples of 28 px; each 28x28 block is one vision token
+VISION_TOKEN_PIXELS = 28
+DEFAULT_MIN_PIXELS = 56 * 56
+DEFAULT_MAX_PIXELS = 28 * 28 * 16384
+
+# Model precisions for CPU inference (see apply_cpu_precision)
+CPU_PRECISIONS = ('fp32', 'bf16', 'int8-dynamic')
+
+# The processor's fast tokenizer fails with "Already borrowed" when two
+# threads use it at once, so prefetch threads and the generating thread
+# take turns on it
+PROCESSOR_LOCK = threading.Lock()
+
+
+def smart_resize(width: int, height: int, min_pixels: int = DEFAULT_MIN_PIXELS, max_pixels: int = DEFAULT_MAX_PIXELS) -> Tuple[int, int]:
+    """Size the Qwen2.5-VL processor resizes an image to (its smart_resize)"""
+    factor = VISION_TOKEN_PIXELS
+    h_bar = max(factor, round(height / factor) * factor)
+    w_bar = max(factor, round(width / factor) * factor)
+    if h_bar * w_bar > max_pixels:
+        beta = math.sqrt(height * width / max_pixels)
+        h_bar = max(factor, math.floor(height / beta / factor) * factor)
+        w_bar = max(factor, math.floor(width / beta / factor) * factor)
+    elif h_bar * w_bar < min_pixels:
+        beta = math.sqrt(min_pixels / (height * width))
+        h_bar = math.ceil(height * beta / factor) * factor
+        w_bar = math.ceil(width * beta / factor) * factor
+    return w_bar, h_bar
+
+
+def vision_token_count(width: int, height: int, min_pixels: int = DEFAULT_MIN_PIXELS, max_pixels: int = DEFAULT_MAX_PIXELS) -> int:
+    """Number of vision tokens the Qwen2.5-VL processor produces for an image"""
+    w_bar, h_bar = smart_resize(width, height, min_pixels, max_pixels)
+    return (h_bar // VISION_TOKEN_PIXELS) * (w_bar // VISION_TOKEN_PIXELS)
+
+
+def pixel_budget(processor, min_pixels: Optional[int] = None, max_pixels: Optional[int] = None) -> Tuple[int, int]:
+    """Pixel limits for an image: the given ones, else the processor's, else Qwen2.5-VL's defaults"""
+    image_processor = getattr(processor, 'image_processor', None)
+    return (
+        min_pixels or getattr(image_processor, 'min_pixels', None) or DEFAULT_MIN_PIXELS,
+        max_pixels or getattr(image_processor, 'max_pixels', None) or DEFAULT_MAX_PIXELS
+    )
+
+
+def image_token_counts(
+    image_files: List[Path],
+    processor,
+    min_pixels: Optional[int] = None,
+    max_pixels: Optional[int] = None
+) -> Dict[Path, Tuple[int, int]]:
+    """Vision tokens per image at the processor's own limits and within the pixel budget
+    
+    Only image headers are read. Unreadable images count as 0 tokens; they
+    fail on their own later, without slowing a batch.
+    """
+    full_limits = pixel_budget(processor)
+    budget_limits = pixel_budget(processor, min_pixels, max_pixels)
+    counts = {}
+    for image_path in image_files:
+        try:
+            with Image.open(image_path) as image:
+                counts[image_path] = (
+                    vision_token_count(image.width, image.height, *full_limits),
+                    vision_token_count(image.width, image.height, *budget_limits)
+                )
+        except Exception:
+            counts[image_path] = (0, 0)
+    return counts
+
+
+def make_batches(image_files: List[Path], batch_size: int, token_counts: Dict[Path, int]) -> List[List[Path]]:
+    """Group images of similar vision-token count so batches need little padding
+    
+    Every image's placeholder tokens are part of the text sequence, so a
+    batch is padded to its largest image. Sorting by token count (from
+    image_token_counts) before chunking keeps small images out of batches
+    with large ones.
+    """
+    ordered = sorted(image_files, key=lambda image_path: token_counts.get(image_path, 0))
+    return [ordered[i:i + batch_size] for i in range(0, len(ordered), batch_size)]
+
+
+def load_image(image_path: Path, min_pixels: Optional[int] = None, max_pixels: Optional[int] = None):
+    """Open an image as RGB, already at its processor size when a pixel budget is given
+    
+    JPEGs are decoded in draft mode, which lets libjpeg decode at 1/2, 1/4
+    or 1/8 scale and skip most of the work for large photos; the draft is
+    never smaller than the target, so only a final bicubic resize follows.
+    Without a budget the processor does the resizing, as before.
+    """
+    image = Image.open(image_path)
+    if min_pixels is None and max_pixels is None:
+        return image.convert("RGB")
+    size = smart_resize(image.width, image.height, min_pixels or DEFAULT_MIN_PIXELS, max_pixels or DEFAULT_MAX_PIXELS)
+    if image.format == "JPEG" and size[0] < image.width:
+        image.draft("RGB", size)
+    image = image.convert("RGB")
+    if image.size != size:
+        image = image.resize(size, Image.BICUBIC)
+    return image
+
+
+def build_messages(image) -> list:
+    """Chat messages asking for a caption of one image"""
+    return [
+        {
+            "role": "user",
+            "content": [
+                {"type": "image", "image": image},
+                {"type": "text", "text": CAPTION_PROMPT},
+            ],
+        }
+    ]
+
+
+def finalize_caption(caption_text: str, trigger_word: str) -> str:
+    """Strip a decoded caption and make sure it contains the trigger word"""
+    caption_text = caption_text.strip()
+    if trigger_word.lower() not in caption_text.lower():
+        caption_text = f"{trigger_word}, {caption_text}".strip()
+    return caption_text
+
+
+def preprocess_images(images: list, processor):
+    """Chat template and processor for a batch, producing CPU tensors
+    
+    Prompts are left-padded (the tokenizer's padding_side is set in main)
+    so every sequence ends where generation starts.
+    """
+    with PROCESSOR_LOCK:
+        texts = [processor.apply_chat_template(build_messages(image), tokenize=False, add_generation_prompt=True) for image in images]
+        # Process images directly without process_vision_info (for compatibility)
+        return processor(
+            text=texts,
+            images=images,
+            padding=True,
+            return_tensors="pt"
+        )
+
+
+class FirstTokenTimer(LogitsProcessor):
+    """Notes when generate produces its first logits, i.e. when prefill ends"""
+    
+    def __init__(self):
+        self.first_token: Optional[float] = None
+    
+    def __call__(self, input_ids, scores):
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+        return scores
+
+
+def generate_from_inputs(
+    inputs,
+    model,
+    processor,
+    device,
+    trigger_word: str,
+    max_new_tokens: int = 256,
+    timing: Optional[Dict[str, Any]] = None
+) -> List[str]:
+    """Run generate on preprocessed inputs and decode each item's new tokens
+    
+    If timing is given it receives the padded prompt length, the prefill
+    and token-decode seconds of the call and each item's generated tokens.
+    """
+    inputs = inputs.to(device)
+    pad_token_id = processor.tokenizer.pad_token_id
+    if pad_token_id is None:
+        pad_token_id = processor.tokenizer.eos_token_id
+    timer = FirstTokenTimer()
+    started = time.perf_counter()
+    with torch.inference_mode():
+        generated_ids = model.generate(
+            **inputs,
+            max_new_tokens=max_new_tokens,
+            pad_token_id=pad_token_id,
+            logits_processor=LogitsProcessorList([timer])
+        )
+    finished = time.perf_counter()
+    
+    # With left padding every prompt ends at the same position
+    prompt_length = inputs.input_ids.shape[1]
+    new_ids = generated_ids[:, prompt_length:]
+    if timing is not None:
+        first_token = timer.first_token or finished
+        timing.update({
+            'prompt_tokens': int(prompt_length),
+            'prefill_seconds': first_token - started,
+            'token_decode_seconds': finished - first_token,
+            # Finished sequences are padded to the longest one
+            'new_tokens': [int((row != pad_token_id).sum()) for row in new_ids]
+        })
+    with PROCESSOR_LOCK:
+        captions = processor.batch_decode(new_ids, skip_special_tokens=True, clean_up_tokenization_spaces=False)
+    return [finalize_caption(caption, trigger_word) for caption in captions]
+
+
+class PreparedBatch(NamedTuple):
+    """A batch after decoding and preprocessing, ready for generate"""
+    paths: List[Path]
+    loaded: List[Tuple[int, Any]]  # (index into paths, RGB image) for images that opened
+    inputs: Any  # processor output, or None if there was nothing to process or it failed
+    error: Optional[str]
+    seconds: float
+    decode_seconds: List[Optional[float]]  # per path; None if the image did not open
+    preprocess_seconds: float
+
+
+def prepare_batch(
+    image_paths: List[Path],
+    processor,
+    min_pixels: Optional[int] = None,
+    max_pixels: Optional[int] = None
+) -> PreparedBatch:
+    """Decode and preprocess a batch; safe to run in a worker thread"""
+    started = time.perf_counter()
+    loaded = []
+    decode_seconds: List[Optional[float]] = [None] * len(image_paths)
+    for index, image_path in enumerate(image_paths):
+        decoding = time.perf_counter()
+        try:
+            loaded.append((index, load_image(image_path, min_pixels, max_pixels)))
+            decode_seconds[index] = time.perf_counter() - decoding
+        except Exception as e:
+            print(f"Error processing {image_path}: {e}", file=sys.stderr)
+    
+    inputs = None
+    error = None
+    preprocessing = time.perf_counter()
+    if loaded:
+        try:
+            inputs = preprocess_images([image for _, image in loaded], processor)
+        except Exception as e:
+            error = str(e)
+    finished = time.perf_counter()
+    return PreparedBatch(image_paths, loaded, inputs, error, finished - started, decode_seconds, finished - preprocessing)
+
+
+def caption_prepared(
+    batch: PreparedBatch,
+    model,
+    processor,
+    device,
+    trigger_word: str,
+    max_new_tokens: int = 256,
+    timings: Optional[List[Dict[str, Any]]] = None
+) -> Tuple[List[str], List[bool]]:
+    """Caption a prepared batch, isolating failures to the images that cause them
+    
+    Returns the captions and, per path, whether that image failed. A failed
+    image (unreadable, or failing on its own) gets the bare trigger word.
+    If batched preprocessing or generation fails, the batch is retried one
+    image at a time so a single bad image does not cost the others their
+    captions. timings, one dict per path, receives each captioned image's
+    generated tokens and the timing dict of the generate call that produced it.
+    """
+    captions = [trigger_word] * len(batch.paths)
+    failed = [True] * len(batch.paths)
+    if not batch.loaded:
+        return captions, failed
+    
+    error = batch.error
+    if batch.inputs is not None:
+        try:
+            call: Dict[str, Any] = {'batch_size': len(batch.loaded)}
+            results = generate_from_inputs(batch.inputs, model, processor, device, trigger_word, max_new_tokens, call)
+            for item, ((index, _), caption) in enumerate(zip(batch.loaded, results)):
+                captions[index] = caption
+                failed[index] = False
+                if timings is not None:
+                    timings[index].update({'call': call, 'new_tokens': call['new_tokens'][item]})
+            return captions, failed
+        except Exception as e:
+            error = str(e)
+    
+    if len(batch.loaded) == 1:
+        print(f"Error processing {batch.paths[batch.loaded[0][0]]}: {error}", file=sys.stderr)
+        return captions, failed
+    print(f"Batch of {len(batch.loaded)} failed ({error}), retrying images one at a time", file=sys.stderr)
+    
+    for index, image in batch.loaded:
+        try:
+            call = {'batch_size': 1}
+            preprocessing = time.perf_counter()
+            inputs = preprocess_images([image], processor)
+            call['preprocess_seconds'] = time.perf_counter() - preprocessing
+            captions[index] = generate_from_inputs(inputs, model, processor, device, trigger_word, max_new_tokens, call)[0]
+            failed[index] = False
+            if timings is not None:
+                timings[index].update({'call': call, 'new_tokens': call['new_tokens'][0]})
+        except Exception as e:
+            print(f"Error processing {batch.paths[index]}: {e}", file=sys.stderr)
+    return captions, failed
+
+
+def caption_batch(
+    image_paths: List[Path],
+    model,
+    processor,
+    device,
+    trigger_word: str,
+    max_new_tokens: int = 256,
+    min_pixels: Optional[int] = None,
+    max_pixels: Optional[int] = None
+) -> List[str]:
+    """Decode, preprocess and caption a batch of image files (failed images get the trigger word)"""
+    batch = prepare_batch(image_paths, processor, min_pixels, max_pixels)
+    return caption_prepared(batch, model, processor, device, trigger_word, max_new_tokens)[0]
+
+
+def generate_caption(
+    image_path: str,
+    model,
+    processor,
+    device,
+    trigger_word: str = "example_celebrity",
+    max_new_tokens: int = 256,
+    min_pixels: Optional[int] = None,
+    max_pixels: Optional[int] = None
+):
+    """Generate a caption for a single image."""
+    return caption_batch([Path(image_path)], model, processor, device, trigger_word, max_new_tokens, min_pixels, max_pixels)[0]
+
+
+def prefetch_batches(
+    batches: Iterable[List[Path]],
+    processor,
+    workers: int,
+    depth: int,
+    min_pixels: Optional[int] = None,
+    max_pixels: Optional[int] = None
+) -> Iterator[PreparedBatch]:
+    """Yield prepared batches in order while the next depth are prepared in background threads
+    
+    At most depth batches are decoded ahead, which bounds the memory held
+    by images waiting for the model. PIL decoding releases the GIL for most
+    of its time, so threads are enough to keep it off the generating
+    thread. The threads share one processor, so its calls are serialized
+    by PROCESSOR_LOCK while decoding runs in parallel.
+    """
+    if depth <= 0:
+        for batch in batches:
+            yield prepare_batch(batch, processor, min_pixels, max_pixels)
+        return
+    
+    remaining = iter(batches)
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="caption-prep") as pool:
+        pending = deque(pool.submit(prepare_batch, batch, processor, min_pixels, max_pixels) for batch in itertools.islice(remaining, depth))
+        while pending:
+            future = pending.popleft()
+            following = next(remaining, None)
+            if following is not None:
+                pending.append(pool.submit(prepare_batch, following, processor, min_pixels, max_pixels))
+            yield future.result()
+
+
+class CaptionWriter:
+    """Writes caption files on a background thread so generation never waits on disk"""
+    
+    def __init__(self):
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="caption-write")
+        self._pending = []
+        self.failed = 0
+    
+    def write(self, image_path: Path, caption: str):
+        """Queue a caption for the .txt file next to image_path"""
+        self._pending.append(self._pool.submit(image_path.with_suffix('.txt').write_text, caption, encoding='utf-8'))
+        # Drop futures that are done so a long run does not accumulate them
+        if len(self._pending) > 64:
+            self._collect(wait=False)
+    
+    def _collect(self, wait: bool):
+        """Report write errors of finished futures"""
+        still_pending = []
+        for future in self._pending:
+            if not wait and not future.done():
+                still_pending.append(future)
+                continue
+            try:
+                future.result()
+            except OSError as e:
+                self.failed += 1
+                print(f"Error writing caption: {e}", file=sys.stderr)
+        self._pending = still_pending
+    
+    def close(self):
+        """Wait for every queued write"""
+        self._collect(wait=True)
+        self._pool.shutdown()
+
+
+MANIFEST_NAME = ".caption_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CaptionManifest:
+    """Captions already generated, keyed by image content and caption settings
+    
+    Captions are stored under "<settings>:<sha256>", where settings hashes
+    the model name, prompt and trigger word, so changing any of them
+    re-captions while switching back reuses earlier results. File hashes
+    are cached by size and mtime so unchanged images are not re-read.
+    """
+    
+    def __init__(self, path: Path, model_name: str, prompt: str, trigger_word: str):
+        self.path = path
+        self.settings = hashlib.sha256(
+            json.dumps([model_name, prompt, trigger_word]).encode('utf-8')
+        ).hexdigest()[:16]
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.captions: Dict[str, str] = {}
+        self.dirty = False
+        self._saved_at = time.monotonic()
+        
+        if path.exists():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == MANIFEST_VERSION:
+                    self.files = data.get('files', {})
+                    self.captions = data.get('captions', {})
+            except (OSError, ValueError) as e:
+                print(f"Warning: ignoring unreadable manifest {path}: {e}", file=sys.stderr)
+    
+    def content_hash(self, image_path: Path) -> str:
+        """Content hash of an image, reusing the stored hash if the file is unchanged"""
+        stat = image_path.stat()
+        name = os.path.relpath(image_path, self.path.parent)
+        cached = self.files.get(name)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return cached['sha256']
+        
+        digest = file_digest(image_path)
+        self.files[name] = {'sha256': digest, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        self.dirty = True
+        return digest
+    
+    def get(self, digest: str) -> Optional[str]:
+        """Caption generated earlier for this content and these settings"""
+        return self.captions.get(f"{self.settings}:{digest}")
+    
+    def put(self, digest: str, caption: str):
+        """Record a generated caption"""
+        self.captions[f"{self.settings}:{digest}"] = caption
+        self.dirty = True
+    
+    def checkpoint(self, interval: float):
+        """Save if there are changes and interval seconds have passed since the last save"""
+        if self.dirty and time.monotonic() - self._saved_at >= interval:
+            self.save()
+    
+    def save(self):
+        """Atomically write the manifest"""
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': self.files, 'captions': self.captions}, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+        self._saved_at = time.monotonic()
+
+
+def plan_captions(
+    image_files: List[Path],
+    manifest: Optional[CaptionManifest],
+    writer: 'CaptionWriter',
+    force: bool = False
+) -> Tuple[Dict[Path, List[Path]], Dict[Path, str], int]:
+    """Work out which images need the model
+    
+    Returns (representative image -> every image with the same content,
+    representative -> content hash, number of images answered from the
+    manifest). Without a manifest every image is its own group; with force
+    the manifest only groups duplicates. Captions
+    found in the manifest are written only where the .txt file is missing,
+    so hand-edited captions survive.
+    """
+    if manifest is None:
+        return {image_path: [image_path] for image_path in image_files}, {}, 0
+    
+    groups: Dict[str, List[Path]] = {}
+    for image_path in image_files:
+        try:
+            groups.setdefault(manifest.content_hash(image_path), []).append(image_path)
+        except OSError as e:
+            print(f"Error reading {image_path}: {e}", file=sys.stderr)
+    
+    pending: Dict[Path, List[Path]] = {}
+    digests: Dict[Path, str] = {}
+    reused = 0
+    for digest, paths in groups.items():
+        caption = None if force else manifest.get(digest)
+        if caption is None:
+            pending[paths[0]] = paths
+            digests[paths[0]] = digest
+            continue
+        for image_path in paths:
+            if not image_path.with_suffix('.txt').exists():
+                writer.write(image_path, caption)
+        reused += len(paths)
+    return pending, digests, reused
+
+
+def apply_cpu_precision(model, cpu_precision: str):
+    """Convert a float32 CPU model to the requested precision
+    
+    bf16 halves the weights and uses the CPU's bf16 matmuls where it has
+    them. int8-dynamic stores every nn.Linear weight as int8 and quantizes
+    activations on the fly, so the matmuls run in int8 while everything
+    else stays float32.
+    """
+    if cpu_precision == 'bf16':
+        return model.to(torch.bfloat16)
+    if cpu_precision == 'int8-dynamic':
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def load_model(model_name: str, device, low_cpu_mem_usage: bool = False, cpu_precision: str = 'fp32'):
+    """Load the Qwen2.5-VL processor and model, raising RuntimeError on failure
+    
+    low_cpu_mem_usage skips the randomly initialised copy of the weights
+    and, for safetensors checkpoints, maps the file instead of reading it.
+    cpu_precision (one of CPU_PRECISIONS) applies when device is the CPU.
+    """
+    print(f"Loading model: {model_name}")
+    print("This may take a few minutes (downloading ~14GB if not cached)...", flush=True)
+    sys.stdout.flush()
+    try:
+        print("Loading processor...", flush=True)
+        processor = AutoProcessor.from_pretrained(model_name)
+        print("[OK] Processor loaded. Loading model weights (~14GB)...", flush=True)
+        print("This can take 5-10 minutes on first run...", flush=True)
+        sys.stdout.flush()
+        
+        if device.type == "cuda":
+            torch_dtype = torch.bfloat16
+        else:
+            # bf16 loads straight into bf16; int8-dynamic quantizes float32 weights
+            torch_dtype = torch.bfloat16 if cpu_precision == 'bf16' else torch.float32
+        
+        # Use trust_remote_code for Qwen models
+        if Qwen2_5_VLForConditionalGeneration is not None:
+            model = Qwen2_5_VLForConditionalGeneration.from_pretrained(
+                model_name,
+                torch_dtype=torch_dtype,
+                device_map="auto" if device.type == "cuda" else None,
+                low_cpu_mem_usage=low_cpu_mem_usage or None,
+                trust_remote_code=True
+            )
+        else:
+            # Fallback for older transformers versions
+            model = AutoModelForCausalLM.from_pretrained(
+                model_name,
+                torch_dtype=torch_dtype,
+                device_map="auto" if device.type == "cuda" else None,
+                low_cpu_mem_usage=low_cpu_mem_usage or None,
+                trust_remote_code=True
+            )
+        if device.type == "cpu":
+            model = apply_cpu_precision(model.to(device), cpu_precision)
+            if cpu_precision != 'fp32':
+                print(f"[OK] CPU precision: {cpu_precision}", flush=True)
+        model.eval()
+        print("[OK] Model loaded successfully!")
+        sys.stdout.flush()
+    except Exception as e:
+        raise RuntimeError(f"Error loading model: {e}") from e
+    
+    # Batched prompts must end where generation starts
+    processor.tokenizer.padding_side = "left"
+    return model, processor
+
+
+def caption_in_process(
+    batches: Iterable[List[Path]],
+    model,
+    processor,
+    device,
+    args: argparse.Namespace,
+    on_batch: Callable[[List[Path], List[str], List[bool]], None]
+) -> Dict[str, float]:
+    """Caption batches in this process, prefetching the next ones while each generates
+    
+    on_batch receives every finished batch's paths, captions and failure
+    flags (see caption_prepared). Returns
+    timing totals for the pipeline summary, with the per-image records
+    (see image_records) under 'telemetry'.
+    """
+    stats = {
+        'images': 0, 'prepare_seconds': 0.0, 'wait_seconds': 0.0, 'generate_seconds': 0.0,
+        'prefill_seconds': 0.0, 'token_decode_seconds': 0.0, 'new_tokens': 0, 'telemetry': []
+    }
+    started = time.perf_counter()
+    prepared_batches = prefetch_batches(batches, processor, args.decode_workers, args.prefetch, args.min_pixels, args.max_pixels)
+    while True:
+        waited = time.perf_counter()
+        batch = next(prepared_batches, None)
+        stats['wait_seconds'] += time.perf_counter() - waited
+        if batch is None:
+            break
+        stats['prepare_seconds'] += batch.seconds
+        
+        generating = time.perf_counter()
+        timings: List[Dict[str, Any]] = [{} for _ in batch.paths]
+        captions, failed = caption_prepared(batch, model, processor, device, args.trigger_word, args.max_new_tokens, timings)
+        stats['generate_seconds'] += time.perf_counter() - generating
+        stats['images'] += len(batch.paths)
+        
+        calls = {id(timing['call']): timing['call'] for timing in timings if 'call' in timing}
+        stats['prefill_seconds'] += sum(call['prefill_seconds'] for call in calls.values())
+        stats['token_decode_seconds'] += sum(call['token_decode_seconds'] for call in calls.values())
+        stats['new_tokens'] += sum(timing.get('new_tokens', 0) for timing in timings)
+        stats['telemetry'].extend(image_records(batch, timings))
+        on_batch(batch.paths, captions, failed)
+    stats['wall_seconds'] = time.perf_counter() - started
+    stats['peak_rss_mb'] = peak_rss_mb()
+    return stats
+
+
+def image_records(batch: PreparedBatch, timings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Per-image telemetry of a captioned batch
+    
+    Preprocess, prefill and token-decode times belong to the processor or
+    generate call that handled the image, so images captioned together
+    share them; tokens_per_second is that call's throughput.
+    """
+    peak = peak_rss_mb()
+    records = []
+    for index, image_path in enumerate(batch.paths):
+        record: Dict[str, Any] = {
+            'image': str(image_path),
+            'image_decode_seconds': batch.decode_seconds[index],
+            'preprocess_seconds': batch.preprocess_seconds,
+            'peak_rss_mb': peak
+        }
+        call = timings[index].get('call')
+        if call is None:
+            record['failed'] = True
+        else:
+            decode = call['token_decode_seconds']
+            record.update({
+                'batch_size': call['batch_size'],
+                'preprocess_seconds': call.get('preprocess_seconds', batch.preprocess_seconds),
+                'prompt_tokens': call['prompt_tokens'],
+                'prefill_seconds': call['prefill_seconds'],
+                'new_tokens': timings[index]['new_tokens'],
+                'token_decode_seconds': decode,
+                'tokens_per_second': sum(call['new_tokens']) / decode if decode > 0 else None
+            })
+        records.append(record)
+    return records
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process in MB, or None where it cannot be read"""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return round(peak / 2**20 if sys.platform == 'darwin' else peak / 1024, 1)
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+        
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)
+            ]
+        
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        get_info = ctypes.windll.psapi.GetProcessMemoryInfo
+        get_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(ProcessMemoryCounters), wintypes.DWORD]
+        if get_info(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+            return round(counters.PeakWorkingSetSize / 2**20, 1)
+    return None
+
+
+def split_cores(workers: int) -> List[List[int]]:
+    """Split the cores this process may use into one contiguous set per worker"""
+    if hasattr(os, 'sched_getaffinity'):
+        cores = sorted(os.sched_getaffinity(0))
+    else:
+        cores = list(range(os.cpu_count() or 1))
+    per_worker = max(1, len(cores) // workers)
+    return [cores[i * per_worker:(i + 1) * per_worker] or cores[-per_worker:] for i in range(workers)]
+
+
+def caption_worker(worker_id: int, cores: List[int], args: argparse.Namespace, tasks, results, shared_model):
+    """Worker process: caption batches from the task queue and report them to the parent
+    
+    The worker is pinned to its core set (on Linux) and runs torch with one
+    intra-op thread per core, so workers do not compete for cores.
+    """
+    try:
+        if hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, set(cores))
+        torch.set_num_threads(len(cores))
+        device = torch.device("cpu")
+        if shared_model is not None:
+            model, processor = shared_model
+        else:
+            model, processor = load_model(args.model_name, device, low_cpu_mem_usage=args.weights == 'mmap', cpu_precision=args.cpu_precision)
+        
+        def report(paths: List[Path], captions: List[str], failed: List[bool]):
+            results.put(('batch', worker_id, [str(path) for path in paths], captions, failed))
+        
+        batches = ([Path(path) for path in batch] for batch in iter(tasks.get, None))
+        stats = caption_in_process(batches, model, processor, device, args, report)
+        results.put(('done', worker_id, stats))
+    except BaseException as e:
+        results.put(('error', worker_id, f"{type(e).__name__}: {e}"))
+
+
+def caption_with_workers(
+    batches: List[List[Path]],
+    args: argparse.Namespace,
+    on_batch: Callable[[List[Path], List[str], List[bool]], None]
+) -> Dict[int, Dict[str, Any]]:
+    """Caption batches across args.workers CPU processes and merge their progress
+    
+    Workers pull batches from one queue, so a worker that drew large images
+    does not hold up the others. The parent alone writes captions and the
+    manifest. With --weights shared the model is loaded once here and its
+    tensors moved to shared memory before the workers start; with mmap
+    each worker maps the checkpoint itself (the pages are shared while the
+    weights stay in the checkpoint's dtype); private loads a full copy each.
+    """
+    shared_model = None
+    if args.weights == 'shared':
+        model, processor = load_model(args.model_name, torch.device("cpu"), low_cpu_mem_usage=True, cpu_precision=args.cpu_precision)
+        # int8-dynamic packed weights are not tensors, so each worker gets its own (small) copy of those
+        model.share_memory()
+        shared_model = (model, processor)
+    
+    context = torch.multiprocessing.get_context()
+    tasks = context.Queue()
+    results = context.Queue()
+    for batch in batches:
+        tasks.put([str(path) for path in batch])
+    core_sets = split_cores(args.workers)
+    for _ in core_sets:
+        tasks.put(None)
+    
+    processes = []
+    for worker_id, cores in enumerate(core_sets):
+        process = context.Process(
+            target=caption_worker,
+            args=(worker_id, cores, args, tasks, results, shared_model),
+            daemon=True
+        )
+        process.start()
+        processes.append(process)
+    print(f"Started {len(processes)} workers on cores {core_sets}", file=sys.stderr)
+    
+    summary: Dict[int, Dict[str, Any]] = {worker_id: {'cores': cores, 'images': 0} for worker_id, cores in enumerate(core_sets)}
+    running = set(range(len(processes)))
+    while running:
+        try:
+            message = results.get(timeout=1.0)
+        except queue.Empty:
+            # A worker killed outright (e.g. out of memory) never reports back
+            for worker_id in list(running):
+                if not processes[worker_id].is_alive():
+                    summary[worker_id]['error'] = f"exited with code {processes[worker_id].exitcode}"
+                    running.discard(worker_id)
+            continue
+        
+        kind, worker_id = message[0], message[1]
+        if kind == 'batch':
+            paths, captions, failed = [Path(path) for path in message[2]], message[3], message[4]
+            on_batch(paths, captions, failed)
+            summary[worker_id]['images'] += len(paths)
+        elif kind == 'done':
+            summary[worker_id].update(message[2])
+            running.discard(worker_id)
+        else:
+            summary[worker_id]['error'] = message[2]
+            running.discard(worker_id)
+            print(f"Worker {worker_id} failed: {message[2]}", file=sys.stderr)
+    
+    for process in processes:
+        process.join(timeout=10)
+    return summary
+
+
+def report_vision_tokens(counts: Dict[Path, Tuple[int, int]], emit: Callable[[Dict[str, Any]], None]) -> Dict[str, int]:
+    """Log each image the pixel budget reduces and the overall token saving
+    
+    counts maps images to (tokens at full resolution, tokens within the
+    budget) as returned by image_token_counts. Prefill work on the vision
+    tokens shrinks at least in proportion to the token count.
+    """
+    reduced = 0
+    for image_path, (full, budget) in counts.items():
+        if budget != full:
+            reduced += 1
+            emit({'event': 'log', 'message': f"{image_path.name}: {full} -> {budget} vision tokens"})
+    full_total = sum(full for full, _ in counts.values())
+    budget_total = sum(budget for _, budget in counts.values())
+    message = f"Vision tokens: {budget_total} for {len(counts)} images"
+    if reduced:
+        message += (f" ({full_total} at full resolution; {reduced} images reduced, "
+                    f"{full_total / max(budget_total, 1):.1f}x fewer vision tokens to prefill)")
+    emit({'event': 'log', 'message': message})
+    return {'full': full_total, 'budget': budget_total, 'reduced': reduced}
+
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.avif'}
+
+
+def find_images(args: argparse.Namespace) -> Tuple[List[Path], Path]:
+    """Images of a job (a directory or a file list) and the directory holding its manifest"""
+    if args.files:
+        image_files = sorted(Path(path).resolve() for path in args.files)
+        manifest_dir = Path(os.path.commonpath([str(path.parent) for path in image_files]))
+        return image_files, manifest_dir
+    image_dir = Path(args.image_dir)
+    return sorted(f for f in image_dir.iterdir() if f.suffix.lower() in IMAGE_EXTENSIONS), image_dir
+
+
+def run_caption_job(
+    args: argparse.Namespace,
+    get_model: Callable[[], Tuple[Any, Any, Any]],
+    emit: Callable[[Dict[str, Any]], None]
+) -> Dict[str, Any]:
+    """Caption one directory or file list, reporting progress as events
+    
+    get_model is only called when something needs captioning and returns
+    (model, processor, device); the daemon hands out its resident model.
+    emit receives "log", "start" and "progress" events. Returns a summary
+    that the caller reports as the final event.
+    """
+    if args.min_pixels and args.max_pixels and args.min_pixels > args.max_pixels:
+        raise ValueError(f"min_pixels ({args.min_pixels}) is larger than max_pixels ({args.max_pixels})")
+    image_files, manifest_dir = find_images(args)
+    emit({'event': 'log', 'message': f"Found {len(image_files)} images"})
+    if not image_files:
+        raise ValueError("No images found")
+    
+    # Skip images captioned by an earlier run and caption duplicates once
+    manifest = None
+    if not args.no_manifest:
+        manifest_path = Path(args.manifest) if args.manifest else manifest_dir / MANIFEST_NAME
+        manifest = CaptionManifest(manifest_path, args.model_name, CAPTION_PROMPT, args.trigger_word)
+    writer = CaptionWriter()
+    pending, digests, reused = plan_captions(image_files, manifest, writer, args.force)
+    summary: Dict[str, Any] = {
+        'found': len(image_files),
+        'reused': reused,
+        'pending': len(pending),
+        'duplicates': sum(len(paths) - 1 for paths in pending.values()),
+        'captioned': 0,
+        'failed': 0
+    }
+    emit({'event': 'start', **summary})
+    
+    def save_batch(paths: List[Path], captions: List[str], failed: List[bool]):
+        """Write a finished batch's captions (duplicates too) and record them"""
+        for image_path, caption, image_failed in zip(paths, captions, failed):
+            for target in pending[image_path]:
+                writer.write(target, caption)
+            # Failed images are left out of the manifest so the next run retries them
+            if image_failed:
+                summary['failed'] += 1
+            elif manifest is not None:
+                manifest.put(digests[image_path], caption)
+        if manifest is not None:
+            manifest.checkpoint(args.checkpoint_seconds)
+        summary['captioned'] += len(paths)
+        emit({'event': 'progress', 'done': summary['captioned'], 'total': len(pending), 'last': captions[-1][:80]})
+    
+    def plan_batches(processor) -> List[List[Path]]:
+        """Resolution-bucketed batches of the pending images, logging their vision tokens"""
+        counts = image_token_counts(list(pending), processor, args.min_pixels, args.max_pixels)
+        summary['vision_tokens'] = report_vision_tokens(counts, emit)
+        return make_batches(list(pending), max(1, args.batch_size), {path: budget for path, (_, budget) in counts.items()})
+    
+    started = time.perf_counter()
+    try:
+        if pending and args.workers > 1:
+            # The model loads in the workers, so bucket with Qwen2.5-VL's default pixel limits
+            batches = plan_batches(None)
+            emit({'event': 'log', 'message': f"Processing {len(pending)} images in {len(batches)} batches on {args.workers} CPU workers"})
+            summary['workers'] = caption_with_workers(batches, args, save_batch)
+        elif pending:
+            model, processor, device = get_model()
+            if device.type == "cpu" and args.threads:
+                torch.set_num_threads(args.threads)
+            # Process images in resolution-bucketed batches; the next
+            # batches are decoded while the current one generates
+            batches = plan_batches(processor)
+            emit({'event': 'log', 'message': f"Processing {len(pending)} images in {len(batches)} batches on {device}"})
+            summary['pipeline'] = caption_in_process(batches, model, processor, device, args, save_batch)
+    finally:
+        # Also on Ctrl+C or a dropped client, so the next run resumes after the last finished batch
+        writer.close()
+        if manifest is not None:
+            manifest.save()
+    
+    summary['write_errors'] = writer.failed
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+    
+    # Per-image records go to the report only; the summary keeps the totals
+    runs = list(summary['workers'].values()) if 'workers' in summary else [summary['pipeline']] if 'pipeline' in summary else []
+    records = [record for stats in runs for record in stats.pop('telemetry', [])]
+    summary['telemetry'] = telemetry_totals(runs)
+    if args.report:
+        write_report(Path(args.report), args, summary, records)
+        emit({'event': 'log', 'message': f"Telemetry report written to {args.report}"})
+    return summary
+
+
+def telemetry_totals(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Token throughput and peak memory over the caption_in_process runs of a job"""
+    new_tokens = sum(stats.get('new_tokens', 0) for stats in runs)
+    decode = sum(stats.get('token_decode_seconds', 0.0) for stats in runs)
+    peaks = [stats['peak_rss_mb'] for stats in runs if stats.get('peak_rss_mb') is not None]
+    peaks.append(peak_rss_mb())
+    return {
+        'new_tokens': new_tokens,
+        'prefill_seconds': round(sum(stats.get('prefill_seconds', 0.0) for stats in runs), 3),
+        'token_decode_seconds': round(decode, 3),
+        'tokens_per_second': round(new_tokens / decode, 2) if decode > 0 else None,
+        'peak_rss_mb': max((peak for peak in peaks if peak is not None), default=None)
+    }
+
+
+def write_report(path: Path, args: argparse.Namespace, summary: Dict[str, Any], records: List[Dict[str, Any]]):
+    """Write a job's settings, summary and per-image telemetry as JSON"""
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'settings': {name: value for name, value in vars(args).items() if name not in ('files', 'report')},
+        'summary': summary,
+        'images': records
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, default=str), encoding='utf-8')
@@ -0,0 +1,74 @@
+# Dataset Dedup - report or drop near-duplicate images before captioning and latent caching
+# Usage: .\tools\ai\musubi-tuner\scripts\dataset-dedup.ps1 -ImageDir "path/to/dataset" [-Threshold 6] [-Drop] [-Report "dedup.json"]
+
+param(
+    [Parameter(Mandatory=$true)]
+    [string]$ImageDir,
+    
+    [Parameter(Mandatory=$false)]
+    [int]$Threshold = 6,
+    
+    [Parameter(Mandatory=$false)]
+    [ValidateSet("phash", "dhash")]
+    [string]$Hash = "phash",
+    
+    [Parameter(Mandatory=$false)]
+    [switch]$Drop = $false,
+    
+    [Parameter(Mandatory=$false)]
+    [string]$Report
+)
+
+# Load configuration
+$ConfigPath = Join-Path $PSScriptRoot "..\..\..\..\.local\config.json"
+if (Test-Path $ConfigPath) {
+    $Config = Get-Content $ConfigPath | ConvertFrom-Json
+    $MusubiTunerPath = $Config.paths.musubi_tuner.installation_path
+    $PythonExe = $Config.paths.musubi_tuner.python_exe
+    if (-not $PythonExe -or -not (Test-Path $PythonExe)) {
+        $PythonExe = Join-Path $MusubiTunerPath "venv\Scripts\python.exe"
+    }
+} else {
+    Write-Warning ".local/config.json not found. Using default paths."
+    $MusubiTunerPath = "E:/path/to/musubi-tuner"
+    $PythonExe = Join-Path $MusubiTunerPath "venv\Scripts\python.exe"
+}
+
+$ScriptPath = Join-Path $PSScriptRoot "dedup_images.py"
+
+if (-not (Test-Path $PythonExe)) {
+    Write-Host "Error: Python executable not found at $PythonExe" -ForegroundColor Red
+    exit 1
+}
+
+if (-not (Test-Path -LiteralPath $ImageDir)) {
+    Write-Host "Error: Image directory not found at $ImageDir" -ForegroundColor Red
+    exit 1
+}
+
+$Arguments = @(
+    $ScriptPath
+    "--image_dir", $ImageDir
+    "--threshold", $Threshold
+    "--hash", $Hash
+)
+
+if ($Drop) {
+    $Arguments += "--drop"
+}
+
+if ($Report) {
+    $Arguments += "--report", $Report
+}
+
+Write-Host "Checking $ImageDir for near-duplicate images..." -ForegroundColor Cyan
+Write-Host "Command: $PythonExe $($Arguments -join ' ')" -ForegroundColor Gray
+
+& $PythonExe $Arguments
+
+if ($LASTEXITCODE -ne 0) {
+    Write-Host "Error: Near-duplicate check failed with exit code $LASTEXITCODE" -ForegroundColor Red
+    exit $LASTEXITCODE
+}
+
+Write-Host "Near-duplicate check completed!" -ForegroundColor Green
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Find near-duplicate images in a training dataset by perceptual hash.
+
+Run after copying images and before generate_captions_qwen.py and latent caching:
+near-identical frames otherwise cost caption time, cache space and training steps.
+Hashes are computed in parallel with vectorized NumPy and kept in an index next
+to the images, so later runs only hash new or changed files. Images within
+--threshold bits (Hamming distance) of each other form a cluster; the largest
+image of each cluster is kept and the rest are reported, or moved aside with --drop.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.avif'}
+INDEX_NAME = ".phash_index.json"
+DUPLICATES_DIR = "_near_duplicates"
+INDEX_VERSION = 1
+
+# Images hashed per worker task; each task decodes its images and hashes them as one array
+CHUNK_SIZE = 64
+# pHash: DCT of a 32x32 grayscale thumbnail, low 8x8 frequencies
+PHASH_SIZE = 32
+HASH_SIDE = 8
+
+_POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II matrix, so the 2-D DCT of X is M @ X @ M.T"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix.astype(np.float32)
+
+
+_DCT = _dct_matrix(PHASH_SIZE)
+
+
+def _pack_bits(bits: np.ndarray) -> np.ndarray:
+    """(n, 64) booleans to n uint64 hashes"""
+    return np.packbits(bits, axis=1).view('>u8').astype(np.uint64).ravel()
+
+
+def phash(thumbnails: np.ndarray) -> np.ndarray:
+    """Perceptual hashes of an (n, 32, 32) stack of grayscale thumbnails
+    
+    Each bit says whether one of the 8x8 lowest DCT frequencies is above
+    the image's median, which survives resizing, recompression and small
+    edits. The whole stack is transformed with two batched matmuls.
+    """
+    coefficients = (_DCT @ thumbnails @ _DCT.T)[:, :HASH_SIDE, :HASH_SIDE].reshape(len(thumbnails), -1)
+    medians = np.median(coefficients, axis=1, keepdims=True)
+    return _pack_bits(coefficients > medians)
+
+
+def dhash(thumbnails: np.ndarray) -> np.ndarray:
+    """Difference hashes of an (n, 8, 9) stack: is each pixel brighter than its left neighbour"""
+    return _pack_bits((thumbnails[:, :, 1:] > thumbnails[:, :, :-1]).reshape(len(thumbnails), -1))
+
+
+HASHES = {
+    'phash': (phash, (PHASH_SIZE, PHASH_SIZE)),
+    'dhash': (dhash, (HASH_SIDE + 1, HASH_SIDE)),
+}
+
+
+def hash_files(paths: List[str], kind: str) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+    """Worker task: decode a chunk of images to thumbnails and hash them together
+    
+    Returns (path, entry) per image, entry None for images that do not open.
+    """
+    function, size = HASHES[kind]
+    thumbnails = []
+    results = []
+    for path in paths:
+        try:
+            with Image.open(path) as image:
+                width, height = image.size
+                # JPEG draft decoding skips most of the work for a thumbnail
+                image.draft('L', (size[0] * 4, size[1] * 4))
+                thumbnail = image.convert('L').resize(size, Image.LANCZOS)
+            thumbnails.append(np.asarray(thumbnail, dtype=np.float32))
+            results.append((path, {'width': width, 'height': height}))
+        except Exception as e:
+            print(f"Error reading {path}: {e}", file=sys.stderr)
+            results.append((path, None))
+    
+    if thumbnails:
+        hashes = iter(function(np.stack(thumbnails)))
+        for _, entry in results:
+            if entry is not None:
+                entry['hash'] = f"{next(hashes):016x}"
+    return results
+
+
+def hamming(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Bitwise Hamming distance between broadcastable uint64 hash arrays"""
+    x = np.ascontiguousarray(np.bitwise_xor(a, b))
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(x)
+    return _POPCOUNT8[x.view(np.uint8)].reshape(*x.shape, 8).sum(axis=-1, dtype=np.uint8)
+
+
+def near_pairs(hashes: np.ndarray, threshold: int, block: int = 256) -> Iterator[Tuple[int, int, int]]:
+    """(i, j, distance) for every pair i < j within threshold bits
+    
+    Rows are compared a block at a time against everything after them, so
+    memory stays at block x n however large the dataset.
+    """
+    for start in range(0, len(hashes), block):
+        rows = hashes[start:start + block]
+        distances = hamming(rows[:, None], hashes[None, start:])
+        for i, j in zip(*np.nonzero(distances <= threshold)):
+            if start + i < start + j:
+                yield start + int(i), start + int(j), int(distances[i, j])
+
+
+def cluster(hashes: np.ndarray, threshold: int) -> List[List[int]]:
+    """Groups of two or more images linked by near-duplicate pairs (union-find)"""
+    parent = list(range(len(hashes)))
+    
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    for i, j, _ in near_pairs(hashes, threshold):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+    
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(hashes)):
+        groups.setdefault(find(i), []).append(i)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+class HashIndex:
+    """On-disk perceptual hashes keyed by file name, reused while size and mtime match"""
+    
+    def __init__(self, path: Path, kind: str):
+        self.path = path
+        self.kind = kind
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            data = json.loads(path.read_text(encoding='utf-8'))
+            if data.get('version') == INDEX_VERSION and data.get('hash') == kind:
+                self.entries = data.get('files', {})
+        except (OSError, ValueError):
+            pass
+    
+    def get(self, image_path: Path) -> Optional[Dict[str, Any]]:
+        """Indexed entry of an unchanged file"""
+        entry = self.entries.get(image_path.name)
+        stat = image_path.stat()
+        if entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+            return entry
+        return None
+    
+    def put(self, image_path: Path, entry: Dict[str, Any]) -> Dict[str, Any]:
+        stat = image_path.stat()
+        self.entries[image_path.name] = {**entry, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        return self.entries[image_path.name]
+    
+    def save(self, names: List[str]):
+        """Write the index, keeping only files still present"""
+        files = {name: self.entries[name] for name in names if name in self.entries}
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(json.dumps({'version': INDEX_VERSION, 'hash': self.kind, 'files': files}), encoding='utf-8')
+        os.replace(tmp, self.path)
+
+
+def hash_images(image_files: List[Path], index: HashIndex, workers: int) -> Dict[Path, Dict[str, Any]]:
+    """Hash entries for every image, hashing only those the index does not cover"""
+    entries = {}
+    missing = []
+    for image_path in image_files:
+        entry = index.get(image_path)
+        if entry is not None and 'hash' in entry:
+            entries[image_path] = entry
+        else:
+            missing.append(str(image_path))
+    print(f"{len(entries)} hashes reused from the index, {len(missing)} to compute", file=sys.stderr)
+    
+    chunks = [missing[i:i + CHUNK_SIZE] for i in range(0, len(missing), CHUNK_SIZE)]
+    if chunks:
+        with ProcessPoolExecutor(max_workers=max(1, min(workers, len(chunks)))) as pool:
+            for results in pool.map(hash_files, chunks, [index.kind] * len(chunks)):
+                for path, entry in results:
+                    if entry is not None:
+                        entries[Path(path)] = index.put(Path(path), entry)
+    return entries
+
+
+def find_duplicates(entries: Dict[Path, Dict[str, Any]], threshold: int) -> List[Dict[str, Any]]:
+    """Near-duplicate clusters with the image to keep and the ones to drop
+    
+    The kept image is the one with the most pixels, then the largest file,
+    then the first name, so the best copy of a frame survives.
+    """
+    paths = sorted(entries)
+    hashes = np.array([int(entries[path]['hash'], 16) for path in paths], dtype=np.uint64)
+    clusters = []
+    for members in cluster(hashes, threshold):
+        ranked = sorted(
+            members,
+            key=lambda i: (-entries[paths[i]]['width'] * entries[paths[i]]['height'], -entries[paths[i]]['size'], paths[i].name)
+        )
+        keep = ranked[0]
+        distances = hamming(hashes[keep], hashes[ranked[1:]])
+        clusters.append({
+            'keep': paths[keep].name,
+            'duplicates': [{'image': paths[i].name, 'distance': int(d)} for i, d in zip(ranked[1:], distances)]
+        })
+    clusters.sort(key=lambda item: item['keep'])
+    return clusters
+
+
+def drop_duplicates(image_dir: Path, clusters: List[Dict[str, Any]], target: Path) -> int:
+    """Move duplicates and their caption files to target; returns the images moved"""
+    target.mkdir(parents=True, exist_ok=True)
+    moved = 0
+    for item in clusters:
+        for duplicate in item['duplicates']:
+            image_path = image_dir / duplicate['image']
+            for path in (image_path, image_path.with_suffix('.txt')):
+                if path.exists():
+                    shutil.move(str(path), str(target / path.name))
+            moved += 1
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report or drop near-duplicate images by perceptual hash")
+    parser.add_argument("--image_dir", type=str, required=True, help="Directory containing images")
+    parser.add_argument("--threshold", type=int, default=6, help="Maximum Hamming distance (of 64 bits) for near-duplicates; 0 = identical hashes only")
+    parser.add_argument("--hash", choices=sorted(HASHES), default="phash", help="Perceptual hash (phash is robust to resizing and recompression; dhash is faster)")
+    parser.add_argument("--workers", type=int, default=len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1, help="Processes computing hashes (default: the cores this process may use)")
+    parser.add_argument("--index", type=str, default=None, help=f"Hash index for incremental runs (default: {INDEX_NAME} next to the images)")
+    parser.add_argument("--report", type=str, default=None, help="Write the clusters to this JSON file")
+    parser.add_argument("--drop", action="store_true", help="Move duplicates (and their .txt captions) out of the dataset")
+    parser.add_argument("--duplicates_dir", type=str, default=None, help=f"Where --drop moves duplicates (default: {DUPLICATES_DIR} inside image_dir)")
+    args = parser.parse_args()
+    
+    image_dir = Path(args.image_dir)
+    if not image_dir.is_dir():
+        print(f"Error: {image_dir} is not a directory", file=sys.stderr)
+        sys.exit(1)
+    image_files = sorted(f for f in image_dir.iterdir() if f.is_file() and f.suffix.lower() in IMAGE_EXTENSIONS)
+    print(f"Found {len(image_files)} images in {image_dir}")
+    
+    started = time.perf_counter()
+    index = HashIndex(Path(args.index) if args.index else image_dir / INDEX_NAME, args.hash)
+    entries = hash_images(image_files, index, args.workers)
+    clusters = find_duplicates(entries, args.threshold)
+    seconds = time.perf_counter() - started
+    
+    duplicates = sum(len(item['duplicates']) for item in clusters)
+    for item in clusters:
+        others = ", ".join(f"{d['image']} ({d['distance']})" for d in item['duplicates'])
+        print(f"  keep {item['keep']}: {others}")
+    print(f"{duplicates} near-duplicates in {len(clusters)} clusters (threshold {args.threshold}, {seconds:.1f}s)")
+    
+    if args.report:
+        Path(args.report).write_text(json.dumps({
+            'image_dir': str(image_dir.resolve()),
+            'hash': args.hash,
+            'threshold': args.threshold,
+            'images': len(image_files),
+            'clusters': clusters
+        }, indent=2), encoding='utf-8')
+    
+    remaining = [path.name for path in image_files]
+    if args.drop and duplicates:
+        target = Path(args.duplicates_dir) if args.duplicates_dir else image_dir / DUPLICATES_DIR
+        moved = drop_duplicates(image_dir, clusters, target)
+        dropped = {d['image'] for item in clusters for d in item['duplicates']}
+        remaining = [name for name in remaining if name not in dropped]
+        print(f"[OK] Moved {moved} near-duplicates to {target}")
+    index.save(remaining)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,160 +2,223 @@
 """
 Generate detailed captions for images using Qwen2.5-VL model via transformers library.
 This script works with the HuggingFace cache format.
+
+When a caption daemon (caption_daemon.py) is running, the job is sent to it so the
+model does not have to be loaded again; otherwise the images are captioned here.
 """
 
 import argparse
+import json
+import os
 import sys
+import urllib.error
+import urllib.request
 from pathlib import Path
-from PIL import Image
-import torch
-try:
-    from transformers import Qwen2_5_VLForConditionalGeneration, AutoProcessor
-except ImportError:
-    # Fallback for older transformers versions
-    from transformers import AutoModelForCausalLM, AutoProcessor
-    Qwen2_5_VLForConditionalGeneration = None
+from typing import Any, Callable, Dict, Optional
 from tqdm import tqdm
 
-def generate_caption(image_path: str, model, processor, device, trigger_word: str = "example_celebrity"):
-    """Generate a caption for a single image."""
-    try:
-        # Load and process image
-        image = Image.open(image_path).convert("RGB")
-        
-        # Prepare messages
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "image", "image": image},
-                    {
-                        "type": "text",
-                        "text": """# Image Annotator
-You are a professional image annotator. Please complete the following task based on the input image.
-## Create Image Caption
-1. Write the caption using natural, descriptive text without structured formats or rich text.
-2. Enrich caption details by including: object attributes, vision relations between objects, and environmental details.
-3. Identify the text visible in the image, without translation or explanation, and highlight it in the caption with quotation marks.
-4. Maintain authenticity and accuracy, avoid generalizations."""
-                    },
-                ],
-            }
-        ]
-        
-        # Prepare inputs - use the same approach as the working caption script
-        text = processor.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
-        # Process images directly without process_vision_info (for compatibility)
-        inputs = processor(
-            text=[text],
-            images=[image],
-            padding=True,
-            return_tensors="pt"
-        ).to(device)
-        
-        # Generate caption
-        with torch.no_grad():
-            generated_ids = model.generate(
-                **inputs,
-                max_new_tokens=256,
-                pad_token_id=processor.tokenizer.eos_token_id
-            )
-        
-        generated_ids_trimmed = [out_ids[len(in_ids):] for in_ids, out_ids in zip(inputs.input_ids, generated_ids)]
-        caption = processor.batch_decode(generated_ids_trimmed, skip_special_tokens=True, clean_up_tokenization_spaces=False)
-        
-        # Clean up caption
-        caption_text = caption[0] if caption else ""
-        caption_text = caption_text.strip()
-        
-        # Ensure trigger word is present
-        if trigger_word.lower() not in caption_text.lower():
-            caption_text = f"{trigger_word}, {caption_text}".strip()
-        
-        return caption_text
-        
-    except Exception as e:
-        print(f"Error processing {image_path}: {e}", file=sys.stderr)
-        return trigger_word
+# caption_pipeline (torch, transformers) is imported only when captioning
+# locally, so handing a job to the daemon starts in well under a second
+DEFAULT_DAEMON_URL = "http://127.0.0.1:8766"
 
+# Job options and their defaults, shared by the command line and daemon requests
+JOB_DEFAULTS: Dict[str, Any] = {
+    'image_dir': None,
+    'files': None,
+    'model_name': "Qwen/Qwen2.5-VL-7B-Instruct",
+    'trigger_word': "example_celebrity",
+    'max_new_tokens': 256,
+    'min_pixels': None,
+    'max_pixels': None,
+    'batch_size': 1,
+    'prefetch': 2,
+    'decode_workers': 2,
+    'manifest': None,
+    'no_manifest': False,
+    'force': False,
+    'checkpoint_seconds': 30.0,
+    'workers': 1,
+    'weights': 'shared',
+    'cpu_precision': 'fp32',
+    'threads': 0,
+    'report': None,
+}
 
-def main():
+
+def build_parser() -> argparse.ArgumentParser:
+    """Command line arguments"""
     parser = argparse.ArgumentParser(description="Generate captions for images using Qwen2.5-VL")
-    parser.add_argument("--image_dir", type=str, required=True, help="Directory containing images")
-    parser.add_argument("--model_name", type=str, default="Qwen/Qwen2.5-VL-7B-Instruct", help="Model name or path")
-    parser.add_argument("--trigger_word", type=str, default="example_celebrity", help="Trigger word to include in captions")
-    parser.add_argument("--max_new_tokens", type=int, default=256, help="Maximum tokens to generate")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--image_dir", type=str, help="Directory containing images")
+    source.add_argument("--files", type=str, nargs="+", help="Image files to caption")
+    parser.add_argument("--model_name", type=str, default=JOB_DEFAULTS['model_name'], help="Model name or path")
+    parser.add_argument("--trigger_word", type=str, default=JOB_DEFAULTS['trigger_word'], help="Trigger word to include in captions")
+    parser.add_argument("--max_new_tokens", type=int, default=JOB_DEFAULTS['max_new_tokens'], help="Maximum tokens to generate")
+    parser.add_argument("--max_pixels", type=int, default=None,
+                        help="Pixel budget per image: larger images are shrunk before the model sees them (e.g. 1003520 = 1280 vision tokens)")
+    parser.add_argument("--min_pixels", type=int, default=None, help="Smaller images are enlarged to at least this many pixels")
+    parser.add_argument("--batch_size", type=int, default=JOB_DEFAULTS['batch_size'], help="Images per generate call (grouped by resolution)")
+    parser.add_argument("--prefetch", type=int, default=JOB_DEFAULTS['prefetch'], help="Batches decoded and preprocessed ahead of generation (0 = serial)")
+    parser.add_argument("--decode_workers", type=int, default=JOB_DEFAULTS['decode_workers'], help="Threads decoding and preprocessing prefetched batches")
+    parser.add_argument("--manifest", type=str, default=None, help="Caption manifest for resuming (default: .caption_manifest.json next to the images)")
+    parser.add_argument("--no_manifest", action="store_true", help="Caption every image and keep no manifest")
+    parser.add_argument("--force", action="store_true", help="Re-caption images the manifest already has captions for")
+    parser.add_argument("--checkpoint_seconds", type=float, default=JOB_DEFAULTS['checkpoint_seconds'], help="Minimum seconds between manifest saves while running")
+    parser.add_argument("--workers", type=int, default=JOB_DEFAULTS['workers'], help="CPU worker processes, each with its own core set (1 = caption in this process)")
+    parser.add_argument("--weights", choices=["shared", "mmap", "private"], default=JOB_DEFAULTS['weights'],
+                        help="How workers get the model: one copy in shared memory, mapped from the checkpoint, or a copy each")
+    parser.add_argument("--cpu_precision", choices=["fp32", "bf16", "int8-dynamic"], default=JOB_DEFAULTS['cpu_precision'],
+                        help="Model precision when running on CPU (int8-dynamic quantizes the linear layers)")
+    parser.add_argument("--threads", type=int, default=JOB_DEFAULTS['threads'], help="Intra-op CPU threads (0 = torch default; workers use their core count)")
+    parser.add_argument("--report", type=str, default=None,
+                        help="Write per-image timings (decode, preprocess, prefill, generated tokens, tokens/s, peak RSS) to this JSON file")
+    parser.add_argument("--daemon_url", type=str, default=os.environ.get("CAPTION_DAEMON_URL", DEFAULT_DAEMON_URL),
+                        help="Caption daemon to use when it is running (env CAPTION_DAEMON_URL)")
+    parser.add_argument("--no_daemon", action="store_true", help="Always caption in this process")
+    return parser
+
+
+def pipeline_summary(stats: Dict[str, float]) -> str:
+    """One line describing how well decoding overlapped with generation"""
+    # Preprocessing the generating thread did not have to wait for ran in parallel with generation
+    prepare = stats['prepare_seconds']
+    overlap = 1 - stats['wait_seconds'] / prepare if prepare > 0 else 0.0
+    return (
+        f"decode+preprocess {prepare:.1f}s, generate {stats['generate_seconds']:.1f}s, "
+        f"waited for input {stats['wait_seconds']:.1f}s, wall {stats['wall_seconds']:.1f}s "
+        f"({max(0.0, overlap) * 100:.0f}% of preprocessing overlapped with generation)"
+    )
+
+
+def format_worker_summary(summary: Dict[Any, Dict[str, Any]]) -> str:
+    """Per-worker throughput table (worker IDs may have become strings in JSON)"""
+    lines = [f"{'worker':>6}  {'cores':>9}  {'images':>6}  {'images/s':>8}  pipeline"]
+    for worker_id, stats in sorted(summary.items(), key=lambda item: int(item[0])):
+        cores = stats['cores']
+        core_range = f"{cores[0]}-{cores[-1]}" if len(cores) > 1 else str(cores[0])
+        wall = stats.get('wall_seconds')
+        rate = f"{stats['images'] / wall:8.2f}" if wall else f"{'-':>8}"
+        detail = stats.get('error') or (pipeline_summary(stats) if wall is not None else '')
+        lines.append(f"{worker_id:>6}  {core_range:>9}  {stats['images']:>6}  {rate}  {detail}")
+    return "\n".join(lines)
+
+
+class ProgressPrinter:
+    """Shows job events the same way whether the job runs here or in the daemon"""
     
-    args = parser.parse_args()
+    def __init__(self):
+        self.pbar = None
     
-    # Find images first
-    image_dir = Path(args.image_dir)
-    image_extensions = {'.jpg', '.jpeg', '.png', '.webp', '.avif'}
-    image_files = [f for f in image_dir.iterdir() if f.suffix.lower() in image_extensions]
+    def __call__(self, event: Dict[str, Any]):
+        kind = event['event']
+        if kind == 'log':
+            print(event['message'], file=sys.stderr)
+        elif kind == 'start':
+            print(
+                f"{event['reused']} images already captioned, {event['pending']} to caption"
+                + (f" ({event['duplicates']} duplicates will reuse their captions)" if event['duplicates'] else ""),
+                file=sys.stderr
+            )
+            if event['pending']:
+                self.pbar = tqdm(total=event['pending'], desc="Generating captions", unit="image")
+        elif kind == 'progress' and self.pbar is not None:
+            self.pbar.set_postfix({"last": event['last'][:50].replace('\n', ' ')})
+            self.pbar.update(event['done'] - self.pbar.n)
+    
+    def close(self):
+        if self.pbar is not None:
+            self.pbar.close()
+
+
+def job_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """Job options with absolute paths, as sent to the daemon"""
+    options = {name: getattr(args, name) for name in JOB_DEFAULTS}
+    if options['image_dir']:
+        options['image_dir'] = str(Path(options['image_dir']).resolve())
+    if options['files']:
+        options['files'] = [str(Path(path).resolve()) for path in options['files']]
+    for name in ('manifest', 'report'):
+        if options[name]:
+            options[name] = str(Path(options[name]).resolve())
+    return options
+
+
+def run_on_daemon(args: argparse.Namespace, show: Callable[[Dict[str, Any]], None]) -> Optional[Dict[str, Any]]:
+    """Send the job to a running daemon; None when there is no daemon to use"""
+    if args.no_daemon or args.workers > 1:
+        return None
+    url = args.daemon_url.rstrip('/')
+    try:
+        with urllib.request.urlopen(f"{url}/status", timeout=0.5) as response:
+            status = json.load(response)
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+    print(f"Using caption daemon at {url} (model {'loaded' if status.get('loaded') else 'not loaded yet'})", file=sys.stderr)
     
-    print(f"Found {len(image_files)} images", file=sys.stderr)
+    request = urllib.request.Request(
+        f"{url}/jobs",
+        data=json.dumps(job_options(args)).encode('utf-8'),
+        headers={'Content-Type': 'application/json'}
+    )
+    with urllib.request.urlopen(request) as response:
+        # One JSON event per line, ending with "done" or "error"
+        for line in response:
+            event = json.loads(line)
+            if event['event'] == 'done':
+                return event['summary']
+            if event['event'] == 'error':
+                raise RuntimeError(event['message'])
+            show(event)
+    raise RuntimeError("Caption daemon closed the connection before the job finished")
+
+
+def run_locally(args: argparse.Namespace, show: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+    """Load the model in this process (only if needed) and run the job"""
+    import torch
+    import caption_pipeline
     
-    if len(image_files) == 0:
-        print("Error: No images found in directory", file=sys.stderr)
-        sys.exit(1)
+    def get_model():
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        show({'event': 'log', 'message': f"Using device: {device}"})
+        model, processor = caption_pipeline.load_model(args.model_name, device, cpu_precision=args.cpu_precision)
+        return model, processor, device
     
-    # Set device
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    print(f"Using device: {device}", file=sys.stderr)
+    return caption_pipeline.run_caption_job(args, get_model, show)
+
+
+def main():
+    args = build_parser().parse_args()
     
-    # Load model and processor
-    print(f"Loading model: {args.model_name}")
-    print("This may take a few minutes (downloading ~14GB if not cached)...", flush=True)
-    sys.stdout.flush()
+    show = ProgressPrinter()
     try:
-        print("Loading processor...", flush=True)
-        processor = AutoProcessor.from_pretrained(args.model_name)
-        print("[OK] Processor loaded. Loading model weights (~14GB)...", flush=True)
-        print("This can take 5-10 minutes on first run...", flush=True)
-        sys.stdout.flush()
-        
-        # Use trust_remote_code for Qwen models
-        if Qwen2_5_VLForConditionalGeneration is not None:
-            model = Qwen2_5_VLForConditionalGeneration.from_pretrained(
-                args.model_name,
-                torch_dtype=torch.bfloat16 if device.type == "cuda" else torch.float32,
-                device_map="auto" if device.type == "cuda" else None,
-                trust_remote_code=True
-            )
-        else:
-            # Fallback for older transformers versions
-            model = AutoModelForCausalLM.from_pretrained(
-                args.model_name,
-                torch_dtype=torch.bfloat16 if device.type == "cuda" else torch.float32,
-                device_map="auto" if device.type == "cuda" else None,
-                trust_remote_code=True
-            )
-        if device.type == "cpu":
-            model = model.to(device)
-        model.eval()
-        print("[OK] Model loaded successfully!")
-        print(f"Starting to process {len(image_files)} images...\n", flush=True)
-        sys.stdout.flush()
-    except Exception as e:
-        print(f"Error loading model: {e}", file=sys.stderr)
+        summary = run_on_daemon(args, show)
+        if summary is None:
+            summary = run_locally(args, show)
+    except (RuntimeError, ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        show.close()
     
-    # Process each image with progress bar
-    print(f"\nProcessing {len(image_files)} images...\n")
-    with tqdm(total=len(image_files), desc="Generating captions", unit="image") as pbar:
-        for i, image_path in enumerate(image_files, 1):
-            pbar.set_description(f"Processing {image_path.name[:40]}...")
-            
-            caption = generate_caption(str(image_path), model, processor, device, args.trigger_word)
-            
-            # Save caption
-            caption_file = image_path.with_suffix('.txt')
-            with open(caption_file, 'w', encoding='utf-8') as f:
-                f.write(caption)
-            
-            pbar.set_postfix({"last": caption[:50].replace('\n', ' ')})
-            pbar.update(1)
-    
+    if not summary['pending']:
+        print("[OK] All captions are up to date")
+        return
+    if 'workers' in summary:
+        print(f"\n{format_worker_summary(summary['workers'])}")
+        print(f"Total: {summary['captioned']} images in {summary['seconds']:.1f}s "
+              f"({summary['captioned'] / max(summary['seconds'], 1e-9):.2f} images/s)")
+    elif 'pipeline' in summary:
+        print(f"\nPipeline: {pipeline_summary(summary['pipeline'])}")
+    telemetry = summary.get('telemetry') or {}
+    if telemetry.get('new_tokens'):
+        rate = f"{telemetry['tokens_per_second']:.1f}" if telemetry['tokens_per_second'] else "-"
+        peak = f"{telemetry['peak_rss_mb']:.0f} MB" if telemetry['peak_rss_mb'] is not None else "-"
+        print(f"Tokens: {telemetry['new_tokens']} generated at {rate} tokens/s, "
+              f"prefill {telemetry['prefill_seconds']:.1f}s, peak RSS {peak}")
+    if summary['failed']:
+        print(f"Warning: {summary['failed']} images could not be captioned (they will be retried next run)", file=sys.stderr)
+    if summary['write_errors']:
+        print(f"Warning: {summary['write_errors']} caption files could not be written", file=sys.stderr)
     
     print(f"\n{'='*60}")
     print("[OK] Caption generation completed!")
@@ -164,4 +227,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
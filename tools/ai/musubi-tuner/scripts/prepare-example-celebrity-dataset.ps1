@@ -14,6 +14,15 @@ param(
     [Parameter(Mandatory=$false)]
     [switch]$SkipCaptioning = $false,
     
+    [Parameter(Mandatory=$false)]
+    [switch]$SkipDedup = $false,  # Skip the near-duplicate check
+    
+    [Parameter(Mandatory=$false)]
+    [int]$DedupThreshold = 6,  # Max perceptual-hash distance (of 64 bits) treated as a near-duplicate
+    
+    [Parameter(Mandatory=$false)]
+    [switch]$DropDuplicates = $false,  # Move near-duplicates out of the dataset instead of only reporting them
+    
     [Parameter(Mandatory=$false)]
     [switch]$Fp8Vl = $false
 )
@@ -49,9 +58,36 @@ Write-Host "Image Directory: $ImageDir" -ForegroundColor Yellow
 Write-Host "Trigger Word: $TriggerWord" -ForegroundColor Yellow
 Write-Host ""
 
-# Step 1: Generate captions
+# Step 1: Find near-duplicate images (before spending caption and latent cache time on them)
+if (-not $SkipDedup) {
+    Write-Host "Step 1: Checking for near-duplicate images..." -ForegroundColor Cyan
+    
+    $DedupArgs = @(
+        (Join-Path $PSScriptRoot "dedup_images.py")
+        "--image_dir", $ImageDir
+        "--threshold", $DedupThreshold
+    )
+    
+    if ($DropDuplicates) {
+        $DedupArgs += "--drop"
+    }
+    
+    & $PythonExe $DedupArgs
+    
+    if ($LASTEXITCODE -ne 0) {
+        Write-Host "Warning: Near-duplicate check failed, continuing with all images" -ForegroundColor Yellow
+    } else {
+        Write-Host "Near-duplicate check completed!" -ForegroundColor Green
+    }
+    Write-Host ""
+} else {
+    Write-Host "Skipping near-duplicate check" -ForegroundColor Yellow
+    Write-Host ""
+}
+
+# Step 2: Generate captions
 if (-not $SkipCaptioning) {
-    Write-Host "Step 1: Generating captions with Qwen2.5-VL..." -ForegroundColor Cyan
+    Write-Host "Step 2: Generating captions with Qwen2.5-VL..." -ForegroundColor Cyan
     
     $CaptionArgs = @(
         $CaptionScript
@@ -77,9 +113,9 @@ if (-not $SkipCaptioning) {
     Write-Host "Skipping caption generation (using existing captions)" -ForegroundColor Yellow
 }
 
-# Step 2: Ensure trigger word is in each caption
+# Step 3: Ensure trigger word is in each caption
 Write-Host ""
-Write-Host "Step 2: Ensuring trigger word '$TriggerWord' is in all captions..." -ForegroundColor Cyan
+Write-Host "Step 3: Ensuring trigger word '$TriggerWord' is in all captions..." -ForegroundColor Cyan
 
 $ImageFiles = Get-ChildItem -Path $ImageDir -File | Where-Object { 
     $_.Extension -match '\.(jpg|jpeg|png|webp|avif)$' -and 
@@ -19,6 +19,15 @@ param(
     [Parameter(Mandatory=$false)]
     [switch]$SkipCaptioning = $false,
     
+    [Parameter(Mandatory=$false)]
+    [switch]$SkipDedup = $false,  # Skip the near-duplicate check
+    
+    [Parameter(Mandatory=$false)]
+    [int]$DedupThreshold = 6,  # Max perceptual-hash distance (of 64 bits) treated as a near-duplicate
+    
+    [Parameter(Mandatory=$false)]
+    [switch]$DropDuplicates = $false,  # Move near-duplicates out of the dataset instead of only reporting them
+    
     [Parameter(Mandatory=$false)]
     [switch]$Fp8Vl = $false,
     
@@ -145,9 +154,36 @@ if (-not $SkipCopy) {
     Write-Host ""
 }
 
-# Step 2: Generate captions
+# Step 2: Find near-duplicate images (before spending caption and latent cache time on them)
+if (-not $SkipDedup) {
+    Write-Host "Step 2: Checking for near-duplicate images..." -ForegroundColor Cyan
+    
+    $DedupArgs = @(
+        (Join-Path $PSScriptRoot "dedup_images.py")
+        "--image_dir", $TargetDir
+        "--threshold", $DedupThreshold
+    )
+    
+    if ($DropDuplicates) {
+        $DedupArgs += "--drop"
+    }
+    
+    & $PythonExe $DedupArgs
+    
+    if ($LASTEXITCODE -ne 0) {
+        Write-Host "Warning: Near-duplicate check failed, continuing with all images" -ForegroundColor Yellow
+    } else {
+        Write-Host "Near-duplicate check completed!" -ForegroundColor Green
+    }
+    Write-Host ""
+} else {
+    Write-Host "Skipping near-duplicate check" -ForegroundColor Yellow
+    Write-Host ""
+}
+
+# Step 3: Generate captions
 if (-not $SkipCaptioning) {
-    Write-Host "Step 2: Generating captions with Qwen2.5-VL..." -ForegroundColor Cyan
+    Write-Host "Step 3: Generating captions with Qwen2.5-VL..." -ForegroundColor Cyan
     
     if ($UseAltScript) {
         # Use alternative script that supports HuggingFace model IDs
@@ -187,8 +223,8 @@ if (-not $SkipCaptioning) {
     Write-Host ""
 }
 
-# Step 3: Ensure trigger word is in each caption
-Write-Host "Step 3: Ensuring trigger word '$TriggerWord' is in all captions..." -ForegroundColor Cyan
+# Step 4: Ensure trigger word is in each caption
+Write-Host "Step 4: Ensuring trigger word '$TriggerWord' is in all captions..." -ForegroundColor Cyan
 
 $ImageFiles = Get-ChildItem -Path $TargetDir -File | Where-Object { 
     $_.Extension -match '\.(jpg|jpeg|png|webp|avif)$' -and 
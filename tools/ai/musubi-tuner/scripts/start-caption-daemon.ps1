@@ -0,0 +1,114 @@
+# Start Caption Daemon - start caption_daemon.py in the background and return its URL and PID
+# Usage: .\tools\ai\musubi-tuner\scripts\start-caption-daemon.ps1 [-ModelName "Qwen/Qwen2.5-VL-7B-Instruct"] [-Port 8766] [-IdleTimeout 900] [-Stop]
+#
+# Unlike caption-daemon.ps1, which runs the daemon in the foreground until Ctrl+C, this script
+# returns as soon as the daemon answers, so it can run as an MCP operation. Prints one JSON line.
+
+param(
+    [Parameter(Mandatory=$false)]
+    [string]$ModelName,
+    
+    [Parameter(Mandatory=$false)]
+    [int]$Port = 8766,
+    
+    [Parameter(Mandatory=$false)]
+    [int]$IdleTimeout = 900,
+    
+    [Parameter(Mandatory=$false)]
+    [int]$StartTimeout = 60,
+    
+    [Parameter(Mandatory=$false)]
+    [switch]$Stop = $false
+)
+
+$Url = "http://127.0.0.1:$Port"
+
+function Get-DaemonStatus {
+    try {
+        return Invoke-RestMethod -Uri "$Url/status" -TimeoutSec 1
+    } catch {
+        return $null
+    }
+}
+
+if ($Stop) {
+    if (-not (Get-DaemonStatus)) {
+        Write-Output (@{ url = $Url; running = $false } | ConvertTo-Json -Compress)
+        exit 0
+    }
+    Invoke-RestMethod -Method Post -Uri "$Url/shutdown" -ContentType "application/json" -Body "{}" | Out-Null
+    Write-Output (@{ url = $Url; running = $false; stopped = $true } | ConvertTo-Json -Compress)
+    exit 0
+}
+
+$Status = Get-DaemonStatus
+if ($Status) {
+    Write-Output (@{ url = $Url; running = $true; already_running = $true; loaded = $Status.loaded } | ConvertTo-Json -Compress)
+    exit 0
+}
+
+# Load configuration
+$ConfigPath = Join-Path $PSScriptRoot "..\..\..\..\.local\config.json"
+if (Test-Path $ConfigPath) {
+    $Config = Get-Content $ConfigPath | ConvertFrom-Json
+    $MusubiTunerPath = $Config.paths.musubi_tuner.installation_path
+    $PythonExe = $Config.paths.musubi_tuner.python_exe
+    if (-not $PythonExe -or -not (Test-Path $PythonExe)) {
+        $PythonExe = Join-Path $MusubiTunerPath "venv\Scripts\python.exe"
+    }
+} else {
+    Write-Warning ".local/config.json not found. Using default paths."
+    $MusubiTunerPath = "E:/path/to/musubi-tuner"
+    $PythonExe = Join-Path $MusubiTunerPath "venv\Scripts\python.exe"
+}
+
+$ScriptPath = Join-Path $PSScriptRoot "caption_daemon.py"
+
+if (-not (Test-Path $PythonExe)) {
+    Write-Host "Error: Python executable not found at $PythonExe" -ForegroundColor Red
+    exit 1
+}
+
+$Arguments = @(
+    "`"$ScriptPath`""
+    "--port", $Port
+    "--idle_timeout", $IdleTimeout
+)
+
+if ($ModelName) {
+    $Arguments += "--preload", "`"$ModelName`""
+}
+
+# The daemon's output goes to log files, so it holds none of this script's pipes open
+$LogDir = Join-Path $PSScriptRoot "..\..\..\..\logs\caption-daemon"
+New-Item -ItemType Directory -Force -Path $LogDir | Out-Null
+$LogPath = Join-Path (Resolve-Path $LogDir) "caption-daemon-$Port.log"
+$ErrorLogPath = Join-Path (Resolve-Path $LogDir) "caption-daemon-$Port.err.log"
+
+$Process = Start-Process -FilePath $PythonExe -ArgumentList $Arguments -PassThru `
+    -RedirectStandardOutput $LogPath -RedirectStandardError $ErrorLogPath
+
+# With -ModelName the daemon loads the model before it listens, which can take a while
+$Deadline = (Get-Date).AddSeconds($StartTimeout)
+while ((Get-Date) -lt $Deadline -and -not $Process.HasExited) {
+    $Status = Get-DaemonStatus
+    if ($Status) {
+        break
+    }
+    Start-Sleep -Milliseconds 500
+}
+
+if ($Process.HasExited) {
+    Write-Host "Error: Caption daemon exited with code $($Process.ExitCode); see $ErrorLogPath" -ForegroundColor Red
+    Get-Content $ErrorLogPath -Tail 20 -ErrorAction SilentlyContinue
+    exit 1
+}
+
+Write-Output (@{
+    url = $Url
+    pid = $Process.Id
+    running = $true
+    ready = [bool]$Status
+    log = $LogPath
+    error_log = $ErrorLogPath
+} | ConvertTo-Json -Compress)
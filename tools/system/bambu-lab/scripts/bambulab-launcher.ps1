@@ -4,7 +4,8 @@
 param(
     [string]$BambuLabPath = "C:\Program Files\BambuStudio\BambuStudio.exe",
     [int[]]$AffinityCores = @(0..15),  # Use first 16 cores (0-15)
-    [switch]$CheckNvidiaSettings = $true
+    [switch]$CheckNvidiaSettings = $true,
+    [switch]$WaitForProcess = $false  # Wait until Bambu Lab is ready for input instead of a fixed delay
 )
 
 Write-Host "Bambu Lab Launcher with Auto-Fix" -ForegroundColor Cyan
@@ -35,8 +36,18 @@ try {
     $process = Start-Process -FilePath $BambuLabPath -PassThru
     Write-Host "[OK] Started Bambu Lab (PID: $($process.Id))" -ForegroundColor Green
     
-    # Wait a moment for process to initialize
-    Start-Sleep -Seconds 2
+    # Wait for process to initialize
+    if ($WaitForProcess) {
+        try {
+            $process.WaitForInputIdle(30000) | Out-Null
+        }
+        catch {
+            Start-Sleep -Seconds 2
+        }
+    }
+    else {
+        Start-Sleep -Seconds 2
+    }
     
     # Set CPU affinity
     Write-Host ""
@@ -4,10 +4,15 @@
 
 param(
     [string]$ProcessName = "BambuStudio",
+    [string]$BambuLabPath,  # Optional: target the executable at this path instead of ProcessName
     [int[]]$AffinityCores = @(0..15),  # Use first 16 cores (0-15), excluding hyperthreaded cores
     [switch]$WaitForProcess = $false
 )
 
+if ($BambuLabPath) {
+    $ProcessName = [System.IO.Path]::GetFileNameWithoutExtension($BambuLabPath)
+}
+
 Write-Host "Bambu Lab CPU Affinity Setter" -ForegroundColor Cyan
 Write-Host "================================" -ForegroundColor Cyan
 Write-Host ""
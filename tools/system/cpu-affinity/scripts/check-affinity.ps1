@@ -1,5 +1,14 @@
-# Check CPU Affinity for Bambu Studio
-$processes = Get-Process -Name bambu-studio -ErrorAction SilentlyContinue
+# Check CPU Affinity for Bambu Studio (or any process by name or ID)
+param(
+    [string]$ProcessName = "bambu-studio",
+    [int]$ProcessId = 0
+)
+
+if ($ProcessId) {
+    $processes = Get-Process -Id $ProcessId -ErrorAction SilentlyContinue
+} else {
+    $processes = Get-Process -Name $ProcessName -ErrorAction SilentlyContinue
+}
 if ($processes) {
     foreach ($proc in $processes) {
         Write-Host "PID: $($proc.Id)"
@@ -19,6 +28,10 @@ if ($processes) {
         Write-Host ""
     }
 } else {
-    Write-Host "No bambu-studio processes found"
+    if ($ProcessId) {
+        Write-Host "No process found with PID $ProcessId"
+    } else {
+        Write-Host "No $ProcessName processes found"
+    }
 }
 
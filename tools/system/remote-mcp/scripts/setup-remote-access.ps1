@@ -194,7 +194,7 @@ ssh -N -L `$config.local_port:localhost:`$config.remote_port `$config.ssh_user@`
     
     $mcpConfig.mcpServers["electric-sheep-remote"] = @{
         command = "python"
-        args = @("-m", "mcp.server.server")
+        args = @("mcp/start_server.py")
         cwd = $projectRoot
     }
     